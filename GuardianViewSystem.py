@@ -1,9 +1,7 @@
 import logging
 import time
-import cv2
-import firebase_admin
-from firebase_admin import credentials
 
+from Services.LoggingService import setup_logging
 from Services.FirebaseService  import FirebaseService
 from Services.VideoProcessingService import VideoProcessingService
 import os
@@ -44,7 +42,7 @@ def process_test_videos(video_processing_service, firebase_service):
 # otherwise it will run in the background and will not be able to show the analysis and we will use docker to run the application when we will have
 # streams from the cameras
 def main():
-    
+    setup_logging()
     video_processing_service, firebase_service = init_services()
     #proccess_test_videos(video_processing_service, firebase_service)
     live_activated = True
@@ -54,13 +52,17 @@ def main():
             time.sleep(1)
             if firebase_service.live_detection_active and not live_activated:
                 live_activated = True
-                video_processing_service.live_video_analysis()
+                try:
+                    video_processing_service.live_video_analysis()
+                except Exception:
+                    pass  # already logged and reported by the analysis; wait for the next isLive
             elif not firebase_service.live_detection_active and live_activated:
                 live_activated = False
                 firebase_service.stop_live_detection()
     except KeyboardInterrupt:
         logging.info("Shutting down...")
         firebase_service.stop_live_detection()
+        firebase_service.lease_service.stop()  # hand claimed videos back to the other workers
     
     
     
@@ -0,0 +1,125 @@
+import json
+import logging
+import threading
+import time
+from collections import deque
+
+from Services.PersistenceBackend import SERVER_TIMESTAMP
+
+
+class AlertBusFullError(Exception):
+    """Raised when a subscriber is added while the bus already has max_subscribers."""
+
+
+class Subscription:
+    """
+    One subscriber of the alert bus: its filters and a bounded buffer of matching events.
+    A subscriber that falls behind loses its oldest events rather than holding up the
+    analysis threads that publish them; take_dropped() tells it how many it missed.
+    """
+
+    def __init__(self, bus, severities=None, alert_types=None, camera_ids=None, buffer_size=100):
+        self.bus = bus
+        self.severities = severities
+        self.alert_types = alert_types
+        self.camera_ids = camera_ids
+        self.closed = False
+        self._events = deque(maxlen=buffer_size)
+        self._dropped = 0
+        self._cond = threading.Condition()
+
+    def matches(self, alert):
+        return ((self.severities is None or alert.get('severity') in self.severities)
+                and (self.alert_types is None or alert.get('alertType') in self.alert_types)
+                and (self.camera_ids is None or alert.get('cameraId') in self.camera_ids))
+
+    def offer(self, event):
+        """Buffer an event; returns True when the oldest buffered one had to make room for it."""
+        with self._cond:
+            full = len(self._events) == self._events.maxlen
+            self._dropped += int(full)
+            self._events.append(event)
+            self._cond.notify()
+            return full
+
+    def get(self, timeout=None):
+        """The next event, or None when none arrived within timeout or the subscription is closed."""
+        with self._cond:
+            if not self._events and not self.closed:
+                self._cond.wait(timeout)
+            return self._events.popleft() if self._events else None
+
+    def take_dropped(self):
+        with self._cond:
+            dropped, self._dropped = self._dropped, 0
+            return dropped
+
+    def close(self):
+        with self._cond:
+            self.closed = True
+            self._cond.notify_all()
+        self.bus.unsubscribe(self)
+
+
+class AlertBus:
+    """
+    In-process fan-out of new alerts to connected operator consoles (GET /alerts/stream),
+    so they don't have to wait for the alert to be written to and propagated by Firestore.
+    Events are numbered; the last `history` of them are kept so a console that reconnects
+    with its last event id gets what it missed in between.
+    """
+
+    def __init__(self, max_subscribers=100, buffer_size=100, history=200):
+        self.max_subscribers = max_subscribers
+        self.buffer_size = buffer_size
+        self._subscribers = []
+        self._history = deque(maxlen=history)
+        self._seq = 0
+        self._lock = threading.Lock()
+        self._stats = {"published": 0, "delivered": 0, "dropped": 0}
+
+    def subscribe(self, severities=None, alert_types=None, camera_ids=None, last_event_id=None):
+        subscription = Subscription(self, severities, alert_types, camera_ids, self.buffer_size)
+        with self._lock:
+            if len(self._subscribers) >= self.max_subscribers:
+                raise AlertBusFullError(f"Alert stream is limited to {self.max_subscribers} subscribers")
+            if last_event_id is not None:
+                for event in self._history:
+                    if event["id"] > last_event_id and subscription.matches(event["alert"]):
+                        subscription.offer(event)
+            self._subscribers.append(subscription)
+        logging.info(f"Alert stream subscriber added ({len(self._subscribers)} connected)")
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            if subscription not in self._subscribers:
+                return
+            self._subscribers.remove(subscription)
+        logging.info(f"Alert stream subscriber removed ({len(self._subscribers)} connected)")
+
+    def publish(self, alert, event_type="alert"):
+        """Hand an alert to every matching subscriber; returns how many got it."""
+        # The alert document's timestamp is only filled in by the database
+        alert = {key: time.time() if value is SERVER_TIMESTAMP else value for key, value in alert.items()}
+        with self._lock:
+            self._seq += 1
+            event = {"id": self._seq, "type": event_type, "alert": alert}
+            self._history.append(event)
+            subscribers = [subscription for subscription in self._subscribers if subscription.matches(alert)]
+            # Offered under the lock so every subscriber sees events in id order; offers never block
+            dropped = sum(subscription.offer(event) for subscription in subscribers)
+            self._stats["published"] += 1
+            self._stats["delivered"] += len(subscribers)
+            self._stats["dropped"] += dropped
+        return len(subscribers)
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats, subscribers=len(self._subscribers), last_event_id=self._seq)
+
+
+def format_sse(event_type, data, event_id=None):
+    """One server-sent event: optional id, event name and a single JSON data line."""
+    head = f"id: {event_id}\n" if event_id is not None else ""
+    return f"{head}event: {event_type}\ndata: {json.dumps(data, default=str)}\n\n"
@@ -0,0 +1,130 @@
+import base64
+import bisect
+import datetime
+import json
+import logging
+import threading
+
+from Services.SpatialIndex import GridIndex
+
+
+def to_epoch(value, default=None):
+    """Convert a Firestore/ISO/epoch timestamp to epoch seconds."""
+    if value is None:
+        return default
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, str):
+        try:
+            return float(value)
+        except ValueError:
+            value = datetime.datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=datetime.timezone.utc)
+    return value.timestamp()
+
+
+def encode_cursor(key):
+    return base64.urlsafe_b64encode(json.dumps(key).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        timestamp, alert_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return (float(timestamp), str(alert_id))
+    except Exception:
+        raise ValueError(f"Invalid cursor: {cursor}")
+
+
+class AlertCache:
+    """
+    In-process copy of the alerts collection, kept current by an on_snapshot listener.
+
+    Alerts are indexed newest-first by (-timestamp, id) so filtered, cursor-paginated
+    reads are served from memory without touching the database, and by position on a
+    grid for "alerts near this point" queries.
+    """
+
+    def __init__(self, max_size=20000):
+        self.max_size = max_size
+        self.ready = False
+        self._alerts = {}
+        self._keys = []
+        self._positions = GridIndex(cell_size_m=500.0)
+        self._lock = threading.Lock()
+
+    def on_snapshot(self, doc_snapshot, changes, read_time):
+        read_epoch = to_epoch(read_time)
+        with self._lock:
+            for change in changes:
+                alert_id = change.document.id
+                self._remove(alert_id)
+                if change.type.name != 'REMOVED':
+                    alert = change.document.to_dict()
+                    alert['id'] = alert_id
+                    # Server timestamps are still pending on the first local event; use the read time.
+                    self._insert(alert_id, alert, to_epoch(alert.get('timestamp'), read_epoch))
+            while len(self._keys) > self.max_size:
+                self._remove(self._keys[-1][1])
+            if not self.ready:
+                logging.info("Alert cache loaded with %d alerts", len(self._keys))
+            self.ready = True
+
+    def query(self, severities=None, alert_types=None, since=None, until=None, cursor=None, limit=50):
+        """Return (alerts, next_cursor), newest first; next_cursor is None on the last page."""
+        with self._lock:
+            start = 0
+            if until is not None:
+                start = bisect.bisect_left(self._keys, (-until, ""))
+            if cursor is not None:
+                start = max(start, bisect.bisect_right(self._keys, decode_cursor(cursor)))
+
+            page = []
+            last_key = None
+            for index in range(start, len(self._keys)):
+                key = self._keys[index]
+                if since is not None and -key[0] < since:
+                    break
+                alert = self._alerts[key[1]][1]
+                if severities and alert.get('severity') not in severities:
+                    continue
+                if alert_types and alert.get('alertType') not in alert_types:
+                    continue
+                if len(page) == limit:
+                    return page, encode_cursor(last_key)
+                page.append(dict(alert, timestamp=datetime.datetime.fromtimestamp(-key[0], datetime.timezone.utc).isoformat()))
+                last_key = key
+            return page, None
+
+    def near(self, lat, lon, radius_m, since=None, limit=50):
+        """Alerts within radius_m of the point, nearest first, each with its distance_m."""
+        with self._lock:
+            found = []
+            for alert_id, distance in self._positions.near(lat, lon, radius_m):
+                key, alert = self._alerts[alert_id]
+                if since is not None and -key[0] < since:
+                    continue
+                found.append(dict(alert, distance_m=round(distance, 1),
+                                  timestamp=datetime.datetime.fromtimestamp(-key[0], datetime.timezone.utc).isoformat()))
+                if len(found) == limit:
+                    break
+            return found
+
+    def __len__(self):
+        return len(self._keys)
+
+    def _insert(self, alert_id, alert, timestamp):
+        key = (-timestamp, alert_id)
+        bisect.insort(self._keys, key)
+        self._alerts[alert_id] = (key, alert)
+        lat, lon = alert.get('latitude'), alert.get('longitude')
+        if isinstance(lat, (int, float)) and isinstance(lon, (int, float)):
+            self._positions.insert(alert_id, float(lat), float(lon))
+
+    def _remove(self, alert_id):
+        self._positions.remove(alert_id)
+        entry = self._alerts.pop(alert_id, None)
+        if entry is not None:
+            index = bisect.bisect_left(self._keys, entry[0])
+            del self._keys[index]
@@ -0,0 +1,107 @@
+import logging
+import math
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+from Services.SpatialIndex import distance_m
+
+
+def crop_detection(image, bbox, margin=0.1):
+    """Crop the detection box (xyxy) out of an image, padded by margin of the box size."""
+    height, width = image.shape[:2]
+    x1, y1, x2, y2 = (float(v) for v in bbox[:4])
+    pad_x, pad_y = (x2 - x1) * margin, (y2 - y1) * margin
+    x1, y1 = max(0, int(x1 - pad_x)), max(0, int(y1 - pad_y))
+    x2, y2 = min(width, int(math.ceil(x2 + pad_x))), min(height, int(math.ceil(y2 + pad_y)))
+    if x2 <= x1 or y2 <= y1:
+        return image
+    return image[y1:y2, x1:x2]
+
+
+def dhash(image, hash_size=8):
+    """
+    Difference hash of an image as a hash_size*hash_size bit integer. The image is reduced
+    to a (hash_size, hash_size + 1) grid of block means and each bit records whether a block
+    is brighter than its left neighbour, so it survives rescaling and recompression.
+    """
+    gray = np.asarray(image, dtype=np.float32)
+    if gray.ndim == 3:
+        gray = gray.mean(axis=2)
+    # Tiny crops are upsampled so every grid cell covers at least one pixel
+    gray = np.repeat(gray, -(-hash_size // gray.shape[0]), axis=0)
+    gray = np.repeat(gray, -(-(hash_size + 1) // gray.shape[1]), axis=1)
+
+    rows = np.linspace(0, gray.shape[0], hash_size + 1).astype(int)
+    cols = np.linspace(0, gray.shape[1], hash_size + 2).astype(int)
+    sums = np.add.reduceat(np.add.reduceat(gray, rows[:-1], axis=0), cols[:-1], axis=1)
+    means = sums / np.outer(np.diff(rows), np.diff(cols))
+    bits = (means[:, 1:] > means[:, :-1]).flatten()
+    return int.from_bytes(np.packbits(bits).tobytes(), 'big')
+
+
+def hamming(a, b):
+    return bin(a ^ b).count('1')
+
+
+class AlertDeduplicator:
+    """
+    Recent-alert index used to fold near-duplicate detections into an existing alert.
+
+    A detection is a duplicate of a recent alert when it has the same class, happened
+    within time_window seconds of it, at most max_distance_m away, and its crop's
+    perceptual hash is within max_hamming bits. A located and an unlocated detection are
+    never duplicates; two unlocated ones only when they come from the same source. Entries
+    are kept per class and expire with the time window; the index is per process.
+    """
+
+    def __init__(self, time_window=120.0, max_distance_m=150.0, max_hamming=10, max_entries=1000):
+        self.time_window = time_window
+        self.max_distance_m = max_distance_m
+        self.max_hamming = max_hamming
+        self.max_entries = max_entries
+        self._recent = {}  # class_name -> deque of (timestamp, alert_id, phash, lat, lon, source)
+        self._lock = threading.Lock()
+        self._stats = {"checked": 0, "duplicates": 0}
+
+    def find_duplicate(self, class_name, phash, lat=None, lon=None, now=None, source=None):
+        """Return the id of a recent alert this detection duplicates, or None."""
+        now = now if now is not None else time.time()
+        with self._lock:
+            self._stats["checked"] += 1
+            entries = self._expire(class_name, now)
+            # Newest first: a re-detection most likely belongs to the latest alert
+            located = None not in (lat, lon)
+            for timestamp, alert_id, other_hash, other_lat, other_lon, other_source in reversed(entries):
+                if hamming(phash, other_hash) > self.max_hamming:
+                    continue
+                if located != (None not in (other_lat, other_lon)):
+                    continue
+                if located and distance_m(lat, lon, other_lat, other_lon) > self.max_distance_m:
+                    continue
+                if not located and source != other_source:
+                    continue
+                self._stats["duplicates"] += 1
+                logging.info("Detection of %s duplicates alert %s", class_name, alert_id)
+                return alert_id
+        return None
+
+    def remember(self, alert_id, class_name, phash, lat=None, lon=None, now=None, source=None):
+        now = now if now is not None else time.time()
+        with self._lock:
+            entries = self._recent.setdefault(class_name, deque(maxlen=self.max_entries))
+            entries.append((now, alert_id, phash, lat, lon, source))
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats, indexed=sum(len(entries) for entries in self._recent.values()))
+
+    def _expire(self, class_name, now):
+        entries = self._recent.get(class_name)
+        if entries is None:
+            return ()
+        while entries and now - entries[0][0] > self.time_window:
+            entries.popleft()
+        return entries
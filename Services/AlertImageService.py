@@ -0,0 +1,27 @@
+from Services.AlertDeduplicationService import crop_detection
+
+
+# Variants stored with every alert: alert document field -> blob name suffix
+IMAGE_VARIANTS = {"imageUrl": "", "thumbnailUrl": "_thumb", "cropUrl": "_crop"}
+
+
+def encode_alert_images(annotated, bbox, thumbnail_width=320, quality=85):
+    """
+    JPEG-encode the full annotated frame, a small thumbnail for alert lists and a crop of
+    the detection, all from the one in-memory rendering. Returns alert field -> JPEG bytes.
+    """
+    import cv2
+
+    height, width = annotated.shape[:2]
+    scale = min(1.0, thumbnail_width / float(width))
+    thumbnail = cv2.resize(annotated, (max(1, int(width * scale)), max(1, int(height * scale))),
+                           interpolation=cv2.INTER_AREA)
+    params = [int(cv2.IMWRITE_JPEG_QUALITY), quality]
+    images = {}
+    for field, image in (("imageUrl", annotated), ("thumbnailUrl", thumbnail),
+                         ("cropUrl", crop_detection(annotated, bbox))):
+        ok, encoded = cv2.imencode(".jpg", image, params)
+        if not ok:
+            raise ValueError(f"Could not encode {field} image")
+        images[field] = encoded.tobytes()
+    return images
@@ -1,9 +1,19 @@
 import datetime
-import json
 import logging
-import random
+import os
 import uuid
-from google.cloud import firestore
+from Services.PersistenceBackend import SERVER_TIMESTAMP
+from Services.CameraRegistryService import CameraRegistry
+
+# Location used when the source has no registered camera (live streams, empty registry)
+DEFAULT_LOCATION = {"name": "Afeka College", "lon": 34.8175, "lat": 32.1134}
+
+# Alert severities from least to most severe
+SEVERITY_LEVELS = ("Resolved", "Low", "Medium", "High", "Emergency")
+
+
+def severity_rank(severity):
+    return SEVERITY_LEVELS.index(severity) if severity in SEVERITY_LEVELS else -1
 
 # JSON data
 json_data = '''
@@ -34,33 +44,6 @@ json_data = '''
 }
 '''
 
-class LocationSelector:
-    _instance = None
-
-    def __new__(cls, *args, **kwargs):
-        if cls._instance is None:
-            cls._instance = super(LocationSelector, cls).__new__(cls)
-        return cls._instance
-
-    def __init__(self, json_data):
-        if not hasattr(self, 'initialized'):
-            self.original_data = json.loads(json_data)
-            self.reset()
-            self.initialized = True
-
-    def reset(self):
-        self.available_coordinates = self.original_data['coordinates'].copy()
-
-    def select_random_location(self):
-        if not self.available_coordinates:
-            print("All locations have been selected. Resetting the list.")
-            self.reset()
-
-        selected = random.choice(self.available_coordinates)
-        self.available_coordinates = [coord for coord in self.available_coordinates if coord['id'] != selected['id']]
-        logging.info(f"Selected random location: {selected}")
-        return selected
-
 class AlertManagementService:
     _instance = None
 
@@ -71,18 +54,32 @@ class AlertManagementService:
 
     def __init__(self):
         if not hasattr(self, 'initialized'):
-            self.selector = LocationSelector(json_data)
+            # Camera positions by source id (CAMERA_REGISTRY_PATH, or the demo locations above)
+            self.cameras = CameraRegistry.from_env(json_data)
             self.initialized = True
 
-    def generate_alert(self, class_name, conf, image_url, source, video_path=None, severity="Low"):
+    def camera_location(self, source, camera_id=None):
+        """Location of the registered camera the detection came from, or None when it is unknown."""
+        camera = self.cameras.get(camera_id)
+        if camera is None and source == 'live_video':
+            camera = self.cameras.get(os.getenv("LIVE_CAMERA_ID"))
+        return camera.location() if camera is not None else None
+
+    def resolve_location(self, source, camera_id=None):
+        # Determine location based on the camera the detection came from
+        location = self.camera_location(source, camera_id)
+        if location is not None:
+            return location
+        if source == 'live_video':
+            return DEFAULT_LOCATION
+        return self.cameras.demo_location() or DEFAULT_LOCATION
+
+    def generate_alert(self, class_name, conf, image_url, source, video_path=None, severity="Low", location=None, image_urls=None, camera_id=None):
         # Generate a unique ID for the alert
         alert_id = str(uuid.uuid4())
 
-        # Determine location based on source
-        if source == 'live_video':
-            location = {"name": "Afeka College", "lon": 34.8175, "lat": 32.1134}
-        else:
-            location = self.selector.select_random_location()
+        if location is None:
+            location = self.resolve_location(source, camera_id)
 
         # Create alert data
         alert_data = {
@@ -96,10 +93,13 @@ class AlertManagementService:
             "longitude": location["lon"],
             "latitude": location["lat"],
             "location": location["name"],
+            "cameraId": None if camera_id is None else str(camera_id),
             "confidence": conf,
-            "timestamp": firestore.SERVER_TIMESTAMP,
+            "timestamp": SERVER_TIMESTAMP,
             "isConfirmed": False
         }
+        # Thumbnail and crop variants next to the full image
+        alert_data.update(image_urls or {})
 
         logging.info(f"Alert created: {alert_data}")
         return alert_data
@@ -0,0 +1,112 @@
+import logging
+import threading
+import time
+from collections import deque
+
+from Services.JobService import JobQueueFullError
+
+
+class BacklogService:
+    """
+    Feeds uploaded videos into the JobService at a controlled rate.
+
+    On startup it pages through unprocessed videos with a bounded cursor (the next page is
+    only read once the feed has drained), then hands over to the incremental listener.
+    Both paths go through one feed, so a restart after an outage never starts every
+    pending video at once.
+    """
+
+    def __init__(self, backend, job_service, process_fn, page_size=20, submit_rate=1.0):
+        self.backend = backend
+        self.job_service = job_service
+        self.process_fn = process_fn
+        self.page_size = page_size
+        self.min_submit_interval = 1.0 / submit_rate if submit_rate > 0 else 0
+        self.caught_up = threading.Event()
+        self._feed = deque()
+        self._seen = set()
+        self._lock = threading.Condition()
+        self._stats = {"reconciled": 0, "listened": 0, "reclaimed": 0, "submitted": 0}
+        self._feeder = threading.Thread(target=self._feed_loop, name="BacklogFeeder", daemon=True)
+
+    def start(self, on_caught_up):
+        """Reconcile the backlog in the background, then call on_caught_up (attach the listener)."""
+        self._feeder.start()
+
+        def run():
+            try:
+                self._reconcile()
+            except Exception as e:
+                logging.error(f"Backlog reconciliation failed, falling back to the listener: {str(e)}")
+            self.caught_up.set()
+            on_caught_up()
+
+        threading.Thread(target=run, name="BacklogReconciler", daemon=True).start()
+
+    def enqueue(self, video_id, video_data, origin="listened"):
+        """Queue a video once; returns False if it was already queued or submitted."""
+        with self._lock:
+            if video_id in self._seen:
+                return False
+            self._seen.add(video_id)
+            self._feed.append((video_id, video_data))
+            self._stats[origin] += 1
+            self._lock.notify_all()
+        return True
+
+    def requeue(self, video_id, video_data):
+        """Queue a video again, e.g. one reclaimed from a dead worker; False if it is still waiting in the feed."""
+        with self._lock:
+            if any(queued_id == video_id for queued_id, _ in self._feed):
+                return False
+            self._seen.discard(video_id)
+        return self.enqueue(video_id, video_data, origin="reclaimed")
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats, pending=len(self._feed), caught_up=self.caught_up.is_set())
+
+    def _reconcile(self):
+        logging.info("Reconciling unprocessed videos in pages of %d", self.page_size)
+        cursor = None
+        while True:
+            page = self.backend.query_documents("videos_from_user", filters=[("processed", "==", False)],
+                                                limit=self.page_size, start_after=cursor)
+            for doc in page:
+                self.enqueue(doc.id, doc.to_dict(), origin="reconciled")
+            if len(page) < self.page_size:
+                break
+            cursor = page[-1]
+            # Bounded read-ahead: wait until the feed has drained before reading the next page
+            with self._lock:
+                while len(self._feed) >= self.page_size:
+                    self._lock.wait()
+        logging.info("Backlog reconciliation done: %d videos queued", self._stats["reconciled"])
+
+    def _feed_loop(self):
+        last_submit = 0.0
+        while True:
+            with self._lock:
+                while not self._feed:
+                    self._lock.wait()
+                video_id, video_data = self._feed[0]
+
+            delay = last_submit + self.min_submit_interval - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            # Only use idle workers; the job queue is left to the REST endpoints
+            if not self.job_service.has_free_worker():
+                time.sleep(max(self.min_submit_interval, 0.25))
+                continue
+            try:
+                self.job_service.submit('upload', lambda job, v=video_id, d=video_data: self.process_fn(v, d, job),
+                                        {"video_id": video_id})
+            except JobQueueFullError:
+                time.sleep(max(self.min_submit_interval, 0.25))  # workers are saturated; try again shortly
+                continue
+            last_submit = time.monotonic()
+
+            with self._lock:
+                self._feed.popleft()
+                self._stats["submitted"] += 1
+                self._lock.notify_all()
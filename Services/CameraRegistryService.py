@@ -0,0 +1,103 @@
+import json
+import logging
+import os
+import random
+import threading
+from dataclasses import dataclass
+
+from Services.SpatialIndex import GridIndex
+
+
+@dataclass(frozen=True)
+class Camera:
+    id: str
+    name: str
+    lat: float
+    lon: float
+
+    def location(self):
+        return {"name": self.name, "lat": self.lat, "lon": self.lon}
+
+    def to_dict(self):
+        return {"id": self.id, "name": self.name, "lat": self.lat, "lon": self.lon}
+
+
+class CameraRegistry:
+    """
+    Camera positions keyed by source id, with a grid index over them for "near this
+    point" queries. Lookups by id are a dict access; ids are compared as strings so a
+    camera registered as "2" also matches the integer source 2.
+    """
+
+    def __init__(self, cameras=(), cell_size_m=1000.0):
+        self._cameras = {}
+        self._index = GridIndex(cell_size_m)
+        self._lock = threading.Lock()
+        self._demo_order = []
+        for camera in cameras:
+            self.register(camera)
+
+    @classmethod
+    def from_json(cls, data):
+        """Build from {"cameras": [{"id", "name", "lat", "lon"}, ...]} ("coordinates" is accepted too)."""
+        if isinstance(data, str):
+            data = json.loads(data)
+        entries = data.get("cameras", data.get("coordinates", []))
+        return cls(Camera(str(entry["id"]), entry.get("name", str(entry["id"])), float(entry["lat"]), float(entry["lon"]))
+                   for entry in entries)
+
+    @classmethod
+    def from_env(cls, default_json):
+        path = os.getenv("CAMERA_REGISTRY_PATH")
+        if not path:
+            return cls.from_json(default_json)
+        with open(path) as registry_file:
+            registry = cls.from_json(json.load(registry_file))
+        logging.info("Loaded %d cameras from %s", len(registry), path)
+        return registry
+
+    def register(self, camera):
+        with self._lock:
+            self._cameras[camera.id] = camera
+            self._index.insert(camera.id, camera.lat, camera.lon)
+            self._demo_order = []
+
+    def remove(self, camera_id):
+        with self._lock:
+            camera = self._cameras.pop(str(camera_id), None)
+            self._index.remove(str(camera_id))
+            self._demo_order = []
+            return camera
+
+    def get(self, camera_id):
+        if camera_id is None:
+            return None
+        return self._cameras.get(str(camera_id))
+
+    def cameras(self):
+        with self._lock:
+            return list(self._cameras.values())
+
+    def near(self, lat, lon, radius_m, limit=None):
+        """Cameras within radius_m of the point as (camera, distance_m), nearest first."""
+        with self._lock:
+            return [(self._cameras[camera_id], distance)
+                    for camera_id, distance in self._index.near(lat, lon, radius_m, limit)]
+
+    def demo_location(self):
+        """
+        Location for uploads that name no camera: every registered camera once in random
+        order, then a new round.
+        """
+        with self._lock:
+            if not self._demo_order:
+                self._demo_order = list(self._cameras.values())
+                random.shuffle(self._demo_order)
+            if not self._demo_order:
+                return None
+            camera = self._demo_order.pop()
+        logging.info(f"Selected random location: {camera}")
+        return camera.location()
+
+    def __len__(self):
+        return len(self._cameras)
@@ -0,0 +1,52 @@
+import logging
+import threading
+
+import numpy as np
+
+
+class CascadeDetector:
+    """
+    Two-stage detection: the small model screens every frame, and only frames with a
+    threat candidate whose confidence falls in the uncertainty band [low, high) are
+    re-scored by the medium model, whose result (and therefore confidence and severity)
+    replaces the screening result. Frames with no candidates, or only confident ones,
+    never reach the medium model.
+    """
+
+    def __init__(self, screen_model, confirm_model, band=(0.3, 0.8), threat_classes=(0, 1)):
+        self.screen_model = screen_model
+        self.confirm_model = confirm_model
+        self.low, self.high = band
+        self.threat_classes = list(threat_classes)
+        self._lock = threading.Lock()
+        self._stats = {"frames": 0, "escalated": 0, "screen_only": 0}
+
+    def predict(self, frame, conf, path="", imgsz=640):
+        # Screen below the alert threshold so borderline objects get a second opinion
+        screen = self.screen_model.predict(frame, conf=min(conf, self.low), imgsz=imgsz, verbose=False)[0]
+        if not self.is_uncertain(screen):
+            self._count("screen_only")
+            return screen
+        self._count("escalated")
+        return self.confirm_model.predict(frame, conf=min(conf, self.low), imgsz=imgsz, verbose=False)[0]
+
+    def is_uncertain(self, result):
+        if result.boxes is None or len(result.boxes) == 0:
+            return False
+        data = result.boxes.data.cpu().numpy()
+        threats = data[np.isin(data[:, 5], self.threat_classes)]
+        return bool(((threats[:, 4] >= self.low) & (threats[:, 4] < self.high)).any())
+
+    def _count(self, outcome):
+        with self._lock:
+            self._stats["frames"] += 1
+            self._stats[outcome] += 1
+            if self._stats["frames"] % 1000 == 0:
+                logging.info("Cascade escalated %d of %d frames to the confirming model",
+                             self._stats["escalated"], self._stats["frames"])
+
+    def stats(self):
+        with self._lock:
+            frames = self._stats["frames"]
+            return dict(self._stats, band=[self.low, self.high],
+                        escalation_rate=round(self._stats["escalated"] / frames, 4) if frames else None)
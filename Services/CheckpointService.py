@@ -0,0 +1,76 @@
+import logging
+import threading
+import time
+
+from Services.PersistenceBackend import SERVER_TIMESTAMP
+
+
+class CheckpointService:
+    """
+    Progress of uploaded-video analyses, one document per video in analysis_checkpoints:
+    the next frame to analyse, the streak state and the alert candidate. Saved at most every
+    `interval` seconds per video while it is analysed (and right away when the job is
+    cancelled), so a worker that picks the video up again resumes close to where the last
+    one stopped. A checkpoint only applies to a run with the same fingerprint (model,
+    threshold, stride and alert policy); anything else starts over.
+    """
+
+    def __init__(self, backend, interval=30.0, collection_name="analysis_checkpoints"):
+        self.backend = backend
+        self.interval = interval
+        self.collection_name = collection_name
+        self._last_saved = {}
+        self._lock = threading.Lock()
+        self._stats = {"saved": 0, "resumed": 0, "stale": 0, "failed": 0}
+
+    def load(self, video_key, fingerprint):
+        """The checkpoint to resume from, or None."""
+        with self._lock:
+            self._last_saved[video_key] = time.monotonic()
+        try:
+            doc = self.backend.get_document(self.collection_name, video_key)
+        except Exception as e:
+            logging.error(f"Failed to read the checkpoint of {video_key}: {str(e)}")
+            return None
+        if doc is None:
+            return None
+        checkpoint = doc.to_dict()
+        with self._lock:
+            if checkpoint.get('fingerprint') != fingerprint:
+                self._stats["stale"] += 1
+                logging.info(f"Checkpoint of {video_key} was taken with other settings; starting over")
+                return None
+            self._stats["resumed"] += 1
+        logging.info(f"Resuming {video_key} from frame {checkpoint.get('frameIdx')}")
+        return checkpoint
+
+    def due(self, video_key):
+        with self._lock:
+            return time.monotonic() - self._last_saved.get(video_key, 0.0) >= self.interval
+
+    def save(self, video_key, checkpoint):
+        with self._lock:
+            self._last_saved[video_key] = time.monotonic()
+        try:
+            self.backend.set_document(self.collection_name, video_key, dict(checkpoint, updatedAt=SERVER_TIMESTAMP))
+        except Exception as e:
+            # A missed checkpoint only costs rework after a crash; the analysis goes on
+            logging.error(f"Failed to checkpoint {video_key}: {str(e)}")
+            with self._lock:
+                self._stats["failed"] += 1
+            return False
+        with self._lock:
+            self._stats["saved"] += 1
+        return True
+
+    def clear(self, video_key):
+        with self._lock:
+            self._last_saved.pop(video_key, None)
+        try:
+            self.backend.delete_document(self.collection_name, video_key)
+        except Exception as e:
+            logging.error(f"Failed to remove the checkpoint of {video_key}: {str(e)}")
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats, active=len(self._last_saved))
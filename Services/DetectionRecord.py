@@ -0,0 +1,97 @@
+import os
+
+from Services.AlertDeduplicationService import crop_detection
+
+
+class DetectionRecord:
+    """
+    What the streak logic keeps of a candidate alert frame: the box, the score and a JPEG
+    of the detection crop, instead of the whole ultralytics Results with its frame and
+    tensors. The full frame is read back from the video file (or, for live streams and
+    remote URLs that can't be cheaply re-read, from a JPEG of the frame) only when the
+    alert is dispatched.
+    """
+
+    __slots__ = ('frame_idx', 'conf', 'class_name', 'bbox', 'crop_jpeg', 'frame_jpeg', 'video_path', 'frame_number')
+
+    def __init__(self, frame_idx, conf, class_name, bbox, crop_jpeg, frame_jpeg=None, video_path=None, frame_number=None):
+        self.frame_idx = frame_idx
+        self.conf = conf
+        self.class_name = class_name
+        self.bbox = bbox
+        self.crop_jpeg = crop_jpeg
+        self.frame_jpeg = frame_jpeg
+        self.video_path = video_path
+        self.frame_number = frame_number
+
+    @classmethod
+    def capture(cls, frame_idx, conf, class_name, bbox, image, video_path=None, frame_number=None, quality=90):
+        """Build a record from a frame; without a local video file to seek in, the frame itself is kept as JPEG."""
+        import cv2
+        bbox = tuple(float(v) for v in bbox[:4])
+        params = [int(cv2.IMWRITE_JPEG_QUALITY), quality]
+        crop_jpeg = cv2.imencode('.jpg', crop_detection(image, bbox), params)[1].tobytes()
+        frame_jpeg = None
+        if not is_local_file(video_path):
+            # Re-reading a URL would download it again, or fail on sources that can't seek
+            video_path = frame_number = None
+            frame_jpeg = cv2.imencode('.jpg', image, params)[1].tobytes()
+        return cls(frame_idx, float(conf), class_name, bbox, crop_jpeg, frame_jpeg, video_path, frame_number)
+
+    def to_dict(self):
+        """The record without pixels, for analysis checkpoints; the crop is re-read from the video."""
+        return {"frameIdx": self.frame_idx, "conf": self.conf, "className": self.class_name,
+                "bbox": list(self.bbox), "frameNumber": self.frame_number}
+
+    @classmethod
+    def from_dict(cls, data, video_path):
+        return cls(data["frameIdx"], data["conf"], data["className"], tuple(data["bbox"]), None,
+                   video_path=video_path, frame_number=data["frameNumber"])
+
+    def crop(self):
+        if self.crop_jpeg is None:
+            # Recorded without pixels (segmented analysis): cut the crop from the re-read frame
+            return crop_detection(self.load_frame(), self.bbox)
+        return _decode(self.crop_jpeg)
+
+    def load_frame(self):
+        if self.frame_jpeg is not None:
+            return _decode(self.frame_jpeg)
+        import cv2
+        cap = cv2.VideoCapture(self.video_path)
+        try:
+            cap.set(cv2.CAP_PROP_POS_FRAMES, self.frame_number)
+            ret, frame = cap.read()
+        finally:
+            cap.release()
+        if not ret:
+            raise ValueError(f"Could not read frame {self.frame_number} of {self.video_path}")
+        return frame
+
+    def render(self):
+        """The frame with the detection box and label drawn on it."""
+        import cv2
+        frame = self.load_frame()
+        x1, y1, x2, y2 = (int(round(v)) for v in self.bbox)
+        color = (0, 0, 255)
+        thickness = max(2, round(sum(frame.shape[:2]) / 600))
+        cv2.rectangle(frame, (x1, y1), (x2, y2), color, thickness)
+        label = f"{self.class_name} {self.conf:.2f}"
+        scale = thickness / 3.0
+        (text_width, text_height), baseline = cv2.getTextSize(label, cv2.FONT_HERSHEY_SIMPLEX, scale, max(1, thickness - 1))
+        top = max(y1 - text_height - baseline, 0)
+        cv2.rectangle(frame, (x1, top), (x1 + text_width, top + text_height + baseline), color, -1)
+        cv2.putText(frame, label, (x1, top + text_height), cv2.FONT_HERSHEY_SIMPLEX, scale, (255, 255, 255),
+                    max(1, thickness - 1), cv2.LINE_AA)
+        return frame
+
+
+def is_local_file(video_path):
+    """True when video_path is a file on this machine that frames can be read back from."""
+    return isinstance(video_path, str) and os.path.isfile(video_path)
+
+
+def _decode(data):
+    import cv2
+    import numpy as np
+    return cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
@@ -0,0 +1,297 @@
+import json
+import logging
+import os
+import re
+import hashlib
+import time
+from collections import namedtuple
+
+import numpy as np
+
+
+# Model-version suffix of the detections of a run that has not finished yet
+PARTIAL_SUFFIX = ".partial"
+
+# Best qualifying detection of one frame, as replayed by rescore()
+ScoredFrame = namedtuple("ScoredFrame", "frame_idx conf class_id bbox")
+
+
+class StreakTracker:
+    """
+    Alert frame selection over consecutive frames with a threat, shared by the analysis
+    loops and offline re-scoring. Each frame reports its best valid detection (or None).
+
+    policy="best": the highest-confidence detection of any streak that reached
+    required_consistent_frames. policy="longest_streak": the best detection of the
+    longest such streak (the first one on ties).
+    """
+
+    def __init__(self, required_consistent_frames=2, policy="best"):
+        if policy not in ("best", "longest_streak"):
+            raise ValueError(f"Unknown alert policy: {policy}")
+        self.required_consistent_frames = required_consistent_frames
+        self.policy = policy
+        self.streak_length = 0
+        self.streak_best = None
+        self.longest_streak = 0
+        self.best = None
+
+    def to_dict(self, encode):
+        """Resumable state; encode turns a detection into something the backend can store."""
+        return {
+            "requiredConsistentFrames": self.required_consistent_frames,
+            "policy": self.policy,
+            "streakLength": self.streak_length,
+            "longestStreak": self.longest_streak,
+            "streakBest": None if self.streak_best is None else encode(self.streak_best),
+            "best": None if self.best is None else encode(self.best),
+        }
+
+    @classmethod
+    def from_dict(cls, data, decode):
+        tracker = cls(data["requiredConsistentFrames"], data["policy"])
+        tracker.streak_length = data["streakLength"]
+        tracker.longest_streak = data["longestStreak"]
+        tracker.streak_best = None if data.get("streakBest") is None else decode(data["streakBest"])
+        tracker.best = None if data.get("best") is None else decode(data["best"])
+        return tracker
+
+    def would_improve(self, conf):
+        """Whether a detection with this confidence would become the best of the current streak."""
+        return self.streak_best is None or conf > self.streak_best.conf
+
+    def update(self, detection):
+        if detection is None:
+            self.streak_length = 0
+            self.streak_best = None
+            return
+        self.streak_length += 1
+        if self.streak_best is None or detection.conf > self.streak_best.conf:
+            self.streak_best = detection
+        if self.streak_length < self.required_consistent_frames:
+            return
+        if self.policy == "best":
+            if self.best is None or self.streak_best.conf > self.best.conf:
+                self.best = self.streak_best
+        elif self.streak_length > self.longest_streak:
+            self.longest_streak = self.streak_length
+            self.best = self.streak_best
+
+
+class FrameDetectionRecorder:
+    """Collects the raw detections of every analysed frame of one video run."""
+
+    def __init__(self, video_key, model_version, frame_stride=1, fps=None):
+        self.video_key = video_key
+        self.model_version = model_version
+        self.frame_stride = frame_stride
+        self.fps = fps
+        self.names = {}
+        self.frame_shape = None
+        self._frames = []
+        self._counts = []
+        self._boxes = []
+        self._conf = []
+        self._cls = []
+
+    def add(self, frame_idx, xyxy=None, conf=None, cls=None, orig_shape=None, names=None):
+        count = 0 if xyxy is None else len(xyxy)
+        self._frames.append(frame_idx)
+        self._counts.append(count)
+        if count:
+            self._boxes.append(np.asarray(xyxy, dtype=np.float32).reshape(-1, 4))
+            self._conf.append(np.asarray(conf, dtype=np.float32))
+            self._cls.append(np.asarray(cls, dtype=np.int16))
+        if orig_shape is not None and self.frame_shape is None:
+            self.frame_shape = [int(v) for v in orig_shape[:2]]
+        if names and not self.names:
+            self.names = {int(k): v for k, v in names.items()}
+
+    def __len__(self):
+        return len(self._frames)
+
+    def resume(self, detections, upto):
+        """Start from the first `upto` frames of a partial recording of the same run."""
+        upto = min(upto, len(detections))
+        rows = int(detections.offsets[upto])
+        self._frames.extend(int(frame) for frame in detections.frames[:upto])
+        self._counts.extend(int(count) for count in np.diff(detections.offsets[:upto + 1]))
+        if rows:
+            self._boxes.append(detections.boxes[:rows])
+            self._conf.append(detections.conf[:rows])
+            self._cls.append(detections.cls[:rows])
+        if detections.meta.get("frame_shape") and self.frame_shape is None:
+            self.frame_shape = detections.meta["frame_shape"]
+        if detections.names and not self.names:
+            self.names = dict(detections.names)
+        return upto
+
+    def to_arrays(self):
+        frames = np.asarray(self._frames, dtype=np.int32)
+        fps = self.fps or 0.0
+        meta = {
+            "video_key": self.video_key,
+            "model_version": self.model_version,
+            "frame_stride": self.frame_stride,
+            "fps": fps,
+            "frame_shape": self.frame_shape,
+            "names": {str(k): v for k, v in self.names.items()},
+            "created_at": time.time(),
+        }
+        return {
+            "frames": frames,
+            # Seconds into the video; frame_idx counts analysed frames, the last of each stride group
+            "timestamps": ((frames * self.frame_stride + self.frame_stride - 1) / fps).astype(np.float32) if fps else np.full(len(frames), np.nan, np.float32),
+            "offsets": np.concatenate([[0], np.cumsum(self._counts)]).astype(np.int64),
+            "boxes": np.concatenate(self._boxes) if self._boxes else np.zeros((0, 4), np.float32),
+            "conf": np.concatenate(self._conf) if self._conf else np.zeros(0, np.float32),
+            "cls": np.concatenate(self._cls) if self._cls else np.zeros(0, np.int16),
+            "meta": np.array(json.dumps(meta)),
+        }
+
+
+class FrameDetections:
+    """Columnar detections of one stored run: the boxes of frame i are rows offsets[i]:offsets[i+1]."""
+
+    def __init__(self, arrays):
+        self.frames = arrays["frames"]
+        self.timestamps = arrays["timestamps"]
+        self.offsets = arrays["offsets"]
+        self.boxes = arrays["boxes"]
+        self.conf = arrays["conf"]
+        self.cls = arrays["cls"]
+        self.meta = json.loads(str(arrays["meta"]))
+        self.names = {int(k): v for k, v in self.meta.get("names", {}).items()}
+
+    def __len__(self):
+        return len(self.frames)
+
+
+def rescore(detections, threshold=0.6, required_consistent_frames=2, policy="best",
+            threat_classes=(0, 1), max_box_fraction=5 / 6):
+    """
+    Replay the alert logic of video_analysis over stored detections with other
+    parameters. Returns the alert the run would have produced (or none).
+    """
+    started = time.perf_counter()
+    conf, boxes = detections.conf, detections.boxes
+    qualifies = (conf >= threshold) & np.isin(detections.cls, threat_classes)
+    if detections.meta.get("frame_shape"):
+        height, width = detections.meta["frame_shape"]
+        qualifies &= ((boxes[:, 2] - boxes[:, 0]) / width <= max_box_fraction) & \
+                     ((boxes[:, 3] - boxes[:, 1]) / height <= max_box_fraction)
+    scores = np.where(qualifies, conf, -1.0)
+
+    # Best qualifying box per frame: sort each frame's rows by score, take the first
+    counts = np.diff(detections.offsets)
+    row_frame = np.repeat(np.arange(len(counts)), counts)
+    order = np.lexsort((-scores, row_frame))
+    nonempty = counts > 0
+    best_rows = np.full(len(counts), -1, dtype=np.int64)
+    best_rows[nonempty] = order[detections.offsets[:-1][nonempty]]
+
+    tracker = StreakTracker(required_consistent_frames, policy)
+    for index, row in enumerate(best_rows):
+        if row < 0 or scores[row] < 0:
+            tracker.update(None)
+        else:
+            tracker.update(ScoredFrame(int(detections.frames[index]), float(conf[row]), int(detections.cls[row]), boxes[row]))
+
+    result = {"frames": len(detections), "alert": tracker.best is not None,
+              "elapsed_ms": round(1000 * (time.perf_counter() - started), 3)}
+    if tracker.best is not None:
+        best = tracker.best
+        timestamp = float(detections.timestamps[np.searchsorted(detections.frames, best.frame_idx)])
+        result.update({
+            "frame_idx": best.frame_idx,
+            "timestamp": None if np.isnan(timestamp) else timestamp,
+            "confidence": best.conf,
+            "class_name": detections.names.get(best.class_id, str(best.class_id)),
+            "bbox": [float(v) for v in best.bbox],
+        })
+    return result
+
+
+class DetectionStore:
+    """
+    Per-frame detections of analysed videos as compressed .npz files, one per video and
+    model version under root/<video key>/<model version>.npz. When a backend is given the
+    files are mirrored to blob storage so any worker node can re-score them.
+    """
+
+    def __init__(self, root, backend=None, min_conf=0.25):
+        self.root = root
+        self.backend = backend
+        self.min_conf = min_conf  # inference threshold while recording, so lower thresholds can be replayed
+
+    @staticmethod
+    def key_for(video):
+        """A filesystem-safe key for a video id, path or URL."""
+        video = str(video)
+        if re.fullmatch(r"[A-Za-z0-9_-][A-Za-z0-9_.-]{0,63}", video):
+            return video
+        return hashlib.sha1(video.encode()).hexdigest()[:20]
+
+    def recorder(self, video_key, model_version, frame_stride=1, fps=None):
+        return FrameDetectionRecorder(self.key_for(video_key), model_version, frame_stride, fps)
+
+    def path(self, video_key, model_version):
+        return os.path.join(self.root, self.key_for(video_key), f"{self.key_for(model_version)}.npz")
+
+    def save(self, recorder, partial=False):
+        """Write a run's detections; partial=True keeps an unfinished run next to the final file (checkpoints)."""
+        model_version = recorder.model_version + PARTIAL_SUFFIX if partial else recorder.model_version
+        path = self.path(recorder.video_key, model_version)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = path + ".tmp.npz"
+        np.savez_compressed(tmp_path, **recorder.to_arrays())
+        os.replace(tmp_path, path)
+        logging.info("Stored %d frames of detections for %s (%s)", len(recorder), recorder.video_key, model_version)
+        if self.backend is not None:
+            try:
+                self.backend.upload_blob(path, self._blob_name(recorder.video_key, model_version),
+                                         content_type="application/octet-stream")
+            except Exception as e:
+                logging.error("Failed to mirror detections of %s to storage: %s", recorder.video_key, str(e))
+        if not partial:
+            partial_path = self.path(recorder.video_key, model_version + PARTIAL_SUFFIX)
+            if os.path.exists(partial_path):
+                os.remove(partial_path)
+        return path
+
+    def load_partial(self, video_key, model_version):
+        return self.load(video_key, model_version + PARTIAL_SUFFIX)
+
+    def versions(self, video_key):
+        directory = os.path.join(self.root, self.key_for(video_key))
+        if not os.path.isdir(directory):
+            return []
+        files = sorted((entry for entry in os.scandir(directory)
+                        if entry.name.endswith(".npz") and ".tmp" not in entry.name and PARTIAL_SUFFIX not in entry.name),
+                       key=lambda entry: entry.stat().st_mtime, reverse=True)
+        return [entry.name[:-len(".npz")] for entry in files]
+
+    def load(self, video_key, model_version=None):
+        """Stored detections of a video (newest model version when none is given), or None."""
+        if model_version is None:
+            versions = self.versions(video_key)
+            if not versions:
+                return None
+            model_version = versions[0]
+        path = self.path(video_key, model_version)
+        if not os.path.exists(path):
+            if self.backend is None:
+                return None
+            try:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                self.backend.download_blob(self._blob_name(video_key, model_version), path)
+            except Exception as e:
+                logging.info("No stored detections for %s (%s): %s", video_key, model_version, str(e))
+                if os.path.exists(path):
+                    os.remove(path)
+                return None
+        with np.load(path) as arrays:
+            return FrameDetections({name: arrays[name] for name in arrays.files})
+
+    def _blob_name(self, video_key, model_version):
+        return f"detection_store/{self.key_for(video_key)}/{self.key_for(model_version)}.npz"
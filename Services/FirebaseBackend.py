@@ -0,0 +1,102 @@
+import logging
+import os
+import firebase_admin
+from firebase_admin import credentials, firestore, storage
+from google.cloud.firestore_v1.base_query import FieldFilter
+
+from Services.PersistenceBackend import PersistenceBackend, resolve_sentinels
+
+
+class FirebaseBackend(PersistenceBackend):
+    """PersistenceBackend on top of Cloud Firestore and Firebase Storage."""
+
+    name = "firebase"
+
+    def __init__(self):
+        cred_path = os.getenv("FIREBASE_CREDENTIALS_PATH")
+        self.storage_bucket = os.getenv("FIREBASE_STORAGE_BUCKET")
+
+        if not firebase_admin._apps:
+            firebase_admin.initialize_app(credentials.Certificate(cred_path), {
+                'storageBucket': self.storage_bucket
+            })
+
+        # Firestore client
+        self.db = firestore.client()
+
+        # Firebase Storage
+        self.bucket = storage.bucket(self.storage_bucket)
+
+        logging.info("FirebaseBackend initialized with Firestore and Storage")
+
+    ##################### DOCUMENTS ##########################################
+
+    def add_document(self, collection_name, document_data):
+        _, doc_ref = self.db.collection(collection_name).add(self._resolve(document_data))
+        return doc_ref.id
+
+    def set_document(self, collection_name, document_id, document_data):
+        self.db.collection(collection_name).document(document_id).set(self._resolve(document_data))
+
+    def update_document(self, collection_name, document_id, update_data):
+        self.db.collection(collection_name).document(document_id).update(self._resolve(update_data))
+
+    def get_document(self, collection_name, document_id):
+        doc = self.db.collection(collection_name).document(document_id).get()
+        return doc if doc.exists else None
+
+    def delete_document(self, collection_name, document_id):
+        self.db.collection(collection_name).document(document_id).delete()
+
+    def transactional_update(self, collection_name, document_id, update_fn):
+        doc_ref = self.db.collection(collection_name).document(document_id)
+
+        @firestore.transactional
+        def run(transaction):
+            snapshot = doc_ref.get(transaction=transaction)
+            update = update_fn(snapshot.to_dict() if snapshot.exists else None)
+            if update is not None:
+                transaction.update(doc_ref, self._resolve(update))
+            return update
+
+        return run(self.db.transaction())
+
+    def query_documents(self, collection_name, filters=None, order_by=None, limit=None, start_after=None):
+        query = self.db.collection(collection_name)
+        for field, op, value in filters or []:
+            query = query.where(filter=FieldFilter(field, op, value))
+        query = query.order_by(order_by or firestore.FieldPath.document_id())
+        if start_after is not None:
+            query = query.start_after(start_after)
+        if limit is not None:
+            query = query.limit(limit)
+        return list(query.stream())
+
+    ##################### LISTENERS ##########################################
+
+    def on_snapshot(self, collection_name, callback, document_id=None):
+        ref = self.db.collection(collection_name)
+        if document_id is not None:
+            ref = ref.document(document_id)
+        watch = ref.on_snapshot(callback)
+        return watch.unsubscribe
+
+    ##################### BLOBS ##############################################
+
+    def upload_blob(self, local_path, blob_name, content_type=None):
+        blob = self.bucket.blob(blob_name)
+        blob.upload_from_filename(local_path, content_type=content_type)
+        blob.make_public()
+        return blob.public_url
+
+    def upload_blob_bytes(self, data, blob_name, content_type=None):
+        blob = self.bucket.blob(blob_name)
+        blob.upload_from_string(data, content_type=content_type or "application/octet-stream")
+        blob.make_public()
+        return blob.public_url
+
+    def download_blob(self, blob_name, destination_file_path):
+        self.bucket.blob(blob_name).download_to_filename(destination_file_path)
+
+    def _resolve(self, data):
+        return resolve_sentinels(data, firestore.SERVER_TIMESTAMP)
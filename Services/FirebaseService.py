@@ -1,13 +1,21 @@
 import logging
 import os
-import threading
+import shutil
+import uuid
 from multiprocessing import Process, Event
 import time
-import firebase_admin
-from firebase_admin import auth, credentials, firestore, storage
-import requests
+from urllib.parse import urlparse
+from urllib.request import url2pathname
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 
+from Services.PersistenceBackend import SERVER_TIMESTAMP, create_backend
+from Services.AlertManagementService import severity_rank
+from Services.JobService import JobService
+from Services.BacklogService import BacklogService
+from Services.LeaseService import LeaseService
+from Services.OutboxService import Outbox
+
 # Load environment variables
 load_dotenv()
 
@@ -27,29 +35,34 @@ class FirebaseService:
         return cls._instance
 
     def initialize_firebase(self):
-        # Initialize Firebase Admin SDK with credentials
-        cred_path = os.getenv("FIREBASE_CREDENTIALS_PATH")
-        self.cred = credentials.Certificate(cred_path)
         self.settings_doc_id = os.getenv("FIREBASE_SETTINGS_DOC_ID")  # The ID of the single document in the settings collection
         self.live_detection_active = False
-        self.storage_bucket = os.getenv("FIREBASE_STORAGE_BUCKET")
-
-        if not firebase_admin._apps:
-            firebase_admin.initialize_app(self.cred, {
-                'storageBucket': self.storage_bucket
-            })
 
-        # Firestore client
-        self.db = firestore.client()
-        
-        # Firebase Storage
-        self.bucket = storage.bucket(self.storage_bucket)
+        # Document database + blob storage (Firebase by default, SQLite/filesystem with PERSISTENCE_BACKEND=local)
+        self.backend = create_backend()
+        # Alert images are uploaded in parallel; each upload is network-bound
+        self.upload_executor = ThreadPoolExecutor(max_workers=int(os.getenv("UPLOAD_WORKERS", 4)),
+                                                  thread_name_prefix="Upload")
+        # Alerts, their images and error reports are recorded on disk first and forwarded by a
+        # drainer when OUTBOX_DIR is set, so detection goes on while the network is down
+        self.outbox = Outbox.from_env({"alert": self._forward_alert, "duplicate": self._forward_duplicate,
+                                       "error": self._forward_error})
+        if self.outbox is not None:
+            self.outbox.start()
 
-        logging.info("FirebaseService initialized with Firestore and Storage")
+        logging.info(f"FirebaseService initialized with the {self.backend.name} persistence backend")
 
         
-    def setVideoProcessingService(self, video_processing_service):
+    def setVideoProcessingService(self, video_processing_service, job_service=None):
         self.video_processing_service = video_processing_service
+        # Uploaded videos run as jobs on the same bounded pool as the REST analysis endpoints
+        batch_workers = video_processing_service.scheduler.batch_workers
+        self.job_service = job_service or JobService(max_workers=int(os.getenv("MAX_ANALYSIS_JOBS", batch_workers)),
+                                                     max_queued=int(os.getenv("MAX_QUEUED_JOBS", 8)))
+        # Videos are claimed with a lease so several worker nodes can share the upload queue
+        self.lease_service = LeaseService(self.backend, worker_id=os.getenv("WORKER_ID"),
+                                          lease_seconds=float(os.getenv("LEASE_SECONDS", 120)),
+                                          max_attempts=int(os.getenv("LEASE_MAX_ATTEMPTS", 3)))
         self.listen_to_user_videos()
         self.listen_to_settings()
         logging.info("VideoProcessingService set for FirebaseService")
@@ -65,12 +78,14 @@ class FirebaseService:
         
     def create_user(self, email, password):
         """Create a new user with email and password."""
+        from firebase_admin import auth
         user = auth.create_user(email=email, password=password)
         logging.info(f"User created with email: {email}")
         return user
 
     def delete_user(self, uid):
         """Delete a user identified by uid."""
+        from firebase_admin import auth
         auth.delete_user(uid)
         logging.info(f"User deleted with UID: {uid}")
         return True
@@ -79,35 +94,101 @@ class FirebaseService:
 
     ##################### DATABASE METHODS ##############################
 
-    def log_error(self, error_message):
+    def log_error(self, error_message, *args):
+        if args:
+            error_message = error_message % args
         error_data = {
-            'timestamp': firestore.SERVER_TIMESTAMP,
+            'timestamp': SERVER_TIMESTAMP,
             'error_message': error_message,
         }
-        self.db.collection('errors').add(error_data)
-        logging.info("Error logged to Firestore")
+        if self.outbox is not None:
+            self.outbox.put('error', error_data)
+            logging.info("Error recorded in the outbox")
+            return
+        self.backend.add_document('errors', error_data)
+        logging.info("Error logged to the errors collection")
 
 
    
     def add_document(self, collection_name, document_data):
-        """Add a document to a specified Firestore collection."""
-        doc_ref = self.db.collection(collection_name).add(document_data)
+        """Add a document to a specified collection and return its ID."""
+        document_id = self.backend.add_document(collection_name, document_data)
         logging.info(f"Document added to {collection_name} collection")
-        return doc_ref
+        return document_id
     
     def add_alert(self, collection_name, alert_data):
-        """Add a document to a specified Firestore collection with a specific ID."""
+        """Add a document to a specified collection with a specific ID."""
         document_id = alert_data.get('id')
-        doc_ref = self.db.collection(collection_name).document(document_id)
-        doc_ref.set(alert_data)
+        self.backend.set_document(collection_name, document_id, alert_data)
         logging.info(f"Document {document_id} added to {collection_name} collection")
-        return doc_ref
+        return document_id
+
+    def add_alert_with_images(self, alert_data, images, basename):
+        """Upload the alert images, then write the alert with their URLs; through the outbox when enabled."""
+        if self.outbox is not None:
+            self.outbox.put('alert', {'alert': alert_data, 'basename': basename}, images, key=alert_data['id'])
+            logging.info(f"Alert {alert_data['id']} recorded in the outbox")
+            return alert_data['id']
+        return self._forward_alert(alert_data['id'], {'alert': alert_data, 'basename': basename}, images)
+
+    def attach_duplicate_alert(self, alert_id, source, conf, video_path=None, severity=None):
+        """Record a near-duplicate detection on an existing alert instead of creating a new one."""
+        if self.outbox is not None:
+            # Forwarded after the alert it refers to, which may still be in the outbox itself
+            self.outbox.put('duplicate', {'alertId': alert_id, 'source': source, 'conf': conf, 'videoPath': video_path,
+                                          'severity': severity})
+            return True
+        return self._attach_duplicate(alert_id, source, conf, video_path, severity)
+
+    def _attach_duplicate(self, alert_id, source, conf, video_path=None, severity=None, sighting_id=None):
+        def merge(data):
+            if data is None:
+                return None
+            if sighting_id is not None and sighting_id in data.get('duplicateSightingIds', []):
+                return None  # already counted by an earlier forward of this outbox entry
+            sightings = data.get('duplicateSources', [])
+            if video_path and video_path not in sightings:
+                sightings = sightings + [video_path]
+            update = {
+                'duplicateCount': data.get('duplicateCount', 0) + 1,
+                'duplicateSources': sightings,
+                'confidence': max(data.get('confidence', 0), conf),
+                'lastSeenSource': source,
+                'lastSeenAt': SERVER_TIMESTAMP,
+            }
+            # A more confident sighting can make the incident more severe, never less
+            if severity_rank(severity) > severity_rank(data.get('severity')):
+                update['severity'] = severity
+            if sighting_id is not None:
+                update['duplicateSightingIds'] = (data.get('duplicateSightingIds', []) + [sighting_id])[-50:]
+            return update
+
+        merged = self.backend.transactional_update('alerts', alert_id, merge) is not None
+        logging.info(f"Duplicate detection {'attached to' if merged else 'could not be attached to'} alert {alert_id}")
+        return merged
+
+    ##################### OUTBOX FORWARDING ##########################################
+    # Outbox handlers; each is safe to repeat for the same entry
+
+    def _forward_alert(self, key, payload, images):
+        alert_data = payload['alert']
+        if images:
+            alert_data.update(self.upload_alert_images(images, payload['basename']))
+        # The alert id is fixed when it is recorded, so a repeated forward overwrites the same document
+        return self.add_alert('alerts', alert_data)
+
+    def _forward_duplicate(self, key, payload, blobs):
+        self._attach_duplicate(payload['alertId'], payload['source'], payload['conf'], payload.get('videoPath'),
+                               payload.get('severity'), sighting_id=key)
+
+    def _forward_error(self, key, payload, blobs):
+        self.backend.set_document('errors', key, payload)
 
     def get_document(self, collection_name, document_id):
-        """Retrieve a document from a specified Firestore collection."""
-        doc = self.db.collection(collection_name).document(document_id).get()
+        """Retrieve a document snapshot from a specified collection."""
+        doc = self.backend.get_document(collection_name, document_id)
         logging.info(f"Document retrieved from {collection_name} with ID: {document_id}")
-        return doc if doc.exists else None
+        return doc
     
 
 
@@ -115,46 +196,64 @@ class FirebaseService:
 
     def listen_to_user_videos(self):
         logging.info("Setting up video analysis listener to Firestore...")
-        
+        self.backlog_service = BacklogService(
+            self.backend, self.job_service, self.process_video_document,
+            page_size=int(os.getenv("BACKLOG_PAGE_SIZE", 20)),
+            submit_rate=float(os.getenv("BACKLOG_SUBMIT_RATE", 1.0)),
+        )
+
         # Define the callback function to capture changes
         def on_snapshot(doc_snapshot, changes, read_time):
-            logging.info(f"New changes in videos_from_user collection: {changes}")
+            logging.info(f"{len(changes)} new changes in videos_from_user collection")
             for change in changes:
                 if change.type.name == 'ADDED':
                     video_doc = change.document
-                    video_id = video_doc.id
                     video_data = video_doc.to_dict()
 
                     if not video_data.get('processed', False):  # Check if the video is already processed
-                        video_url = video_data.get('URL')
-                        logging.info(f"New video added: {video_url}")
-
-                        # Check if the URL is a stream or a download link
-                        if 'firebasestorage.googleapis.com' in video_url and 'alt=media' not in video_url:
-                            video_url += '&alt=media'
-
-                        # Process the video in a separate thread
-                        threading.Thread(target=self.process_video, args=(video_url, video_id)).start()
-
-        # Reference to the 'videos_from_user' collection
-        collection_ref = self.db.collection("videos_from_user")
-
-        # Watch the collection for changes
-        collection_ref.on_snapshot(on_snapshot)
-
-        logging.info("Video analysis listener set up complete")
-
-    def process_video(self, video_url, video_id):
+                        # Videos already queued by the backlog reconciliation are skipped here
+                        if self.backlog_service.enqueue(video_doc.id, video_data):
+                            logging.info(f"New video added: {video_data.get('URL')}")
+
+        # First page through the unprocessed backlog at a controlled rate, then watch the
+        # 'videos_from_user' collection for new uploads
+        def attach_listener():
+            self.backend.on_snapshot("videos_from_user", on_snapshot)
+            logging.info("Video analysis listener set up complete")
+
+        self.backlog_service.start(attach_listener)
+        self.lease_service.start(on_reclaim=self.backlog_service.requeue)
+
+    def process_video_document(self, video_id, video_data, job=None):
+        # Claim the video first; another worker may already own it
+        on_lost = job.cancel_event.set if job is not None else None
+        if not self.lease_service.try_claim(video_id, on_lost=on_lost):
+            return {"skipped": "claimed by another worker or already processed"}
+
+        video_url = video_data.get('URL')
+        # Check if the URL is a stream or a download link
+        if 'firebasestorage.googleapis.com' in video_url and 'alt=media' not in video_url:
+            video_url += '&alt=media'
+        return self.process_video(video_url, video_id, job, camera_id=video_data.get('cameraId'))
+
+    def process_video(self, video_url, video_id, job=None, camera_id=None):
         try:
             local_video_path = self.download_video(video_url)
             logging.info(f"Downloaded video to {local_video_path}")
-            self.video_processing_service.video_analysis(local_video_path, videoURL=video_url)
-            logging.info("Video processing completed successfully")
-            self.update_document("videos_from_user", video_id, {"processed": True})
-            logging.info(f"Video {video_id} marked as processed")
+            result = self.video_processing_service.video_analysis(local_video_path, videoURL=video_url, job=job, source_id=camera_id, video_key=video_id)
             os.remove(local_video_path)
+            if result.get("cancelled"):
+                # Lost leases fail the owner check, so only a real cancel sets the video aside
+                self.lease_service.cancel(video_id)
+                return result
+            logging.info("Video processing completed successfully")
+            if self.lease_service.complete(video_id, frames_processed=result.get("frames", 0)):
+                logging.info(f"Video {video_id} marked as processed")
+            return result
         except Exception as e:
             logging.error(f"Error processing video {video_url}: {str(e)}")
+            self.lease_service.release(video_id, failed=True)
+            raise
 
     def listen_to_settings(self):
         logging.info("Setting up settings listener to Firestore...")
@@ -167,14 +266,8 @@ class FirebaseService:
                 if change.type.name in ['ADDED', 'MODIFIED']:
                     settings_doc = change.document
                     settings_data = settings_doc.to_dict()
-                    threashold = settings_data.get('threshHold', 0.6)
-                    if threashold:
-                        if threashold < 0.4 or threashold > 1:
-                            self.video_processing_service.confidence_threshold = 0.6
-                            logging.error(f"Invalid confidence threshold value: {threashold}. Defaulting to 0.6")
-                        else:
-                            self.video_processing_service.confidence_threshold = threashold
-                            logging.info(f"Confidence threshold updated to {threashold}")
+                    # Thresholds, models and frame strides (global and per camera) are swapped in as one snapshot
+                    self.video_processing_service.runtime_config.apply_settings(settings_data)
                     live_detection = settings_data.get('isLive', False)
 
                     if live_detection and not self.live_detection_active:
@@ -182,11 +275,13 @@ class FirebaseService:
                     elif not live_detection and self.live_detection_active:
                         self.stop_live_detection()
 
-        # Reference to the single document in the 'settings' collection
-        doc_ref = self.db.collection("settings").document(settings_doc_id)
+        # Watch the single document in the 'settings' collection for changes
+        self.backend.on_snapshot("settings", on_snapshot, document_id=settings_doc_id)
 
-        # Watch the document for changes
-        doc_ref.on_snapshot(on_snapshot)
+    def listen_to_alerts(self, alert_cache):
+        """Keep an AlertCache in sync with the alerts collection."""
+        logging.info("Setting up alerts cache listener...")
+        self.backend.on_snapshot("alerts", alert_cache.on_snapshot)
 
     #those functions require work and are not finished yet
     def start_live_detection(self):
@@ -228,8 +323,19 @@ class FirebaseService:
         try:
             logging.info(f"Downloading video from {video_url}")
             local_filename = video_url.split('/')[-1].split('?')[0]
-            local_filepath = os.path.join('/Users/wmryny/Desktop/לימודים/פרוייקט גמר/FinalProject/GuardianViewRest/Videos_from_user', local_filename)
-            
+            download_dir = os.getenv("VIDEO_DOWNLOAD_DIR", "Videos_from_user")
+            os.makedirs(download_dir, exist_ok=True)
+            # Unique name: concurrent jobs may download videos with the same file name
+            local_filepath = os.path.join(download_dir, f"{uuid.uuid4().hex[:8]}_{local_filename}")
+
+            source_path = self.local_video_path(video_url)
+            if source_path is not None:
+                # Copied, since the analysed file is removed afterwards
+                shutil.copyfile(source_path, local_filepath)
+                logging.info(f"Video copied to {local_filepath}")
+                return local_filepath
+
+            import requests
             response = requests.get(video_url, stream=True)
             response.raise_for_status()
             
@@ -244,41 +350,50 @@ class FirebaseService:
             logging.error(f"Error downloading video {video_url}: {str(e)}")
             raise
 
+    @staticmethod
+    def local_video_path(video_url):
+        """The file behind a file:// URL (as handed out by the local backend) or a plain path, else None."""
+        if os.path.exists(video_url):
+            return video_url
+        parsed = urlparse(video_url)
+        if parsed.scheme == 'file':
+            return url2pathname(parsed.path)
+        return None
+
     def update_document(self, collection_name, document_id, update_data):
-        """Update a document in a specified Firestore collection."""
-        doc_ref = self.db.collection(collection_name).document(document_id)
-        doc_ref.update(update_data)
+        """Update a document in a specified collection."""
+        self.backend.update_document(collection_name, document_id, update_data)
         logging.info(f"Document {document_id} updated in {collection_name} collection")
 
     
     ##################### STORAGE METHODS ##################################
 
     def download_file(self, blob_name, destination_file_path):
-        """Download a file from Firebase Storage."""
-        blob = self.bucket.blob(blob_name)
-        blob.download_to_filename(destination_file_path)
+        """Download a file from Storage."""
+        self.backend.download_blob(blob_name, destination_file_path)
         logging.info(f"File downloaded from Storage: {blob_name} to {destination_file_path}")
 
 
     def upload_frame(self, filepath, filename):
-        """Upload a frame to Firebase Storage and return the public URL."""
-        # Construct the full path for the blob
-       
-        blob = self.bucket.blob(f'detections/{filename}')
-
-        # Upload the file to Firebase Storage
-        blob.upload_from_filename(filepath)
-        
-        # Make the blob publicly accessible
-        blob.make_public()
-        
-
-        # Get the public URL of the file
-        image_url = blob.public_url
+        """Upload a frame to Storage and return the public URL."""
+        # Upload under detections/ and make the blob publicly accessible
+        image_url = self.backend.upload_blob(filepath, f'detections/{filename}', content_type='image/jpeg')
         logging.info(f"Frame uploaded to Storage as {filename} with URL {image_url}")
 
         return image_url
 
+    def upload_alert_images(self, images, basename):
+        """Upload the encoded variants of an alert image concurrently; returns alert field -> URL."""
+        from Services.AlertImageService import IMAGE_VARIANTS
+        futures = {
+            field: self.upload_executor.submit(self.backend.upload_blob_bytes, data,
+                                               f'detections/{basename}{IMAGE_VARIANTS[field]}.jpg', 'image/jpeg')
+            for field, data in images.items()
+        }
+        urls = {field: future.result() for field, future in futures.items()}
+        logging.info(f"Uploaded {len(urls)} images for {basename}")
+        return urls
+
 
     def download_video_from_firebase(storage_url):
         # Assuming `storage_url` is thehe URL to the video in Firebase Storage
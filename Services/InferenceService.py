@@ -0,0 +1,286 @@
+import logging
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+
+class _Request:
+    __slots__ = ('frame', 'conf', 'future', 'enqueued')
+
+    def __init__(self, frame, conf):
+        self.frame = frame
+        self.conf = conf
+        self.future = Future()
+        self.enqueued = time.monotonic()
+
+
+class InferenceService:
+    """
+    In-process inference server shared by every producer (live loops, upload jobs, REST).
+
+    Frames are submitted per model and input size and come back as futures. Requests are
+    grouped into dynamic batches: a batch is run as soon as max_batch_size requests are
+    waiting or the oldest one has waited max_wait seconds. Each model runs on `replicas`
+    worker threads, each with its own copy of the weights and pinned to its own share of
+    the CPUs, so the batches of different replicas don't fight over cores. Pinning is by
+    thread affinity only; torch's thread counts are process-wide and stay with the
+    ResourceScheduler.
+    """
+
+    def __init__(self, model_paths, loader, replicas=1, max_batch_size=8, max_wait=0.01, cpus=None):
+        self.model_paths = model_paths
+        self.loader = loader
+        self.replicas = replicas
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.cpu_groups = self._split_cpus(cpus, replicas)
+        self.names = {}  # model name -> class names, once a replica has loaded it
+        self._queues = {}  # (model name, imgsz) -> deque of _Request
+        self._workers = {}
+        self._load_failures = {}  # model name -> replicas that failed to load it
+        self._load_errors = {}  # model name -> error, once every replica failed
+        self._running = True
+        self._cond = threading.Condition()
+        self._stats = {}
+        self._recent = {}
+
+    @classmethod
+    def from_env(cls, model_paths, loader):
+        """The shared server when INFERENCE_SERVER=1, otherwise None (producers call the models directly)."""
+        if os.getenv("INFERENCE_SERVER", "0") != "1":
+            return None
+        return cls(model_paths, loader,
+                   replicas=int(os.getenv("INFERENCE_REPLICAS", 1)),
+                   max_batch_size=int(os.getenv("INFERENCE_MAX_BATCH", 8)),
+                   max_wait=float(os.getenv("INFERENCE_MAX_WAIT_MS", 10)) / 1000.0)
+
+    @staticmethod
+    def _split_cpus(cpus, replicas):
+        if cpus is None:
+            try:
+                cpus = sorted(os.sched_getaffinity(0))
+            except AttributeError:
+                cpus = list(range(os.cpu_count() or 1))
+        cpus = list(cpus)
+        if len(cpus) < replicas:
+            # Fewer cores than replicas: let them share instead of pinning several to one core
+            return [cpus] * replicas
+        size = len(cpus) // replicas
+        return [cpus[i * size:(i + 1) * size] for i in range(replicas - 1)] + [cpus[(replicas - 1) * size:]]
+
+    ##################### PRODUCERS ##########################################
+
+    def submit(self, model_name, frame, conf=0.25, imgsz=640):
+        """Queue one frame; the future resolves to its ultralytics Results."""
+        if model_name not in self.model_paths:
+            raise KeyError(f"Unknown model: {model_name}")
+        request = _Request(frame, conf)
+        with self._cond:
+            if not self._running:
+                raise RuntimeError("Inference service is shut down")
+            if model_name in self._load_errors:
+                raise RuntimeError(f"Model {model_name} could not be loaded: {self._load_errors[model_name]}")
+            self._start_workers(model_name)
+            self._queues.setdefault((model_name, imgsz), deque()).append(request)
+            self._cond.notify_all()
+        return request.future
+
+    def warm(self, model_name, timeout=None):
+        """Start the replicas of a model and wait until one of them has loaded it."""
+        if model_name not in self.model_paths:
+            raise KeyError(f"Unknown model: {model_name}")
+        with self._cond:
+            self._start_workers(model_name)
+            self._cond.wait_for(lambda: model_name in self.names or model_name in self._load_errors, timeout)
+            if model_name in self._load_errors:
+                raise RuntimeError(f"Model {model_name} could not be loaded: {self._load_errors[model_name]}")
+
+    def predict(self, model_name, frame, conf=0.25, imgsz=640, timeout=None):
+        return self.submit(model_name, frame, conf, imgsz).result(timeout)
+
+    def stream(self, model_name, frames, conf=0.25, imgsz=640, lookahead=None):
+        """Results of an iterable of frames in order, keeping up to `lookahead` frames in flight."""
+        lookahead = lookahead or self.max_batch_size
+        pending = deque()
+        for frame in frames:
+            pending.append(self.submit(model_name, frame, conf, imgsz))
+            if len(pending) >= lookahead:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+    ##################### REPLICAS ##########################################
+
+    def _start_workers(self, model_name):
+        # Called with the condition held; replicas load their weights on first use of the model
+        if model_name in self._workers:
+            return
+        self._stats[model_name] = {"requests": 0, "batches": 0, "errors": 0, "queue_wait_seconds": 0.0, "compute_seconds": 0.0}
+        self._recent[model_name] = deque(maxlen=1000)
+        self._workers[model_name] = [
+            threading.Thread(target=self._worker, args=(model_name, cpus), daemon=True,
+                             name=f"inference-{model_name}-{replica}")
+            for replica, cpus in enumerate(self.cpu_groups)
+        ]
+        for worker in self._workers[model_name]:
+            worker.start()
+
+    def _worker(self, model_name, cpus):
+        self._pin(cpus)
+        try:
+            model = self.loader(self.model_paths[model_name])
+        except Exception as e:
+            logging.error(f"Inference replica for {model_name} failed to load: {str(e)}")
+            with self._cond:
+                self._load_failures[model_name] = self._load_failures.get(model_name, 0) + 1
+                if self._load_failures[model_name] < len(self._workers[model_name]):
+                    return  # the other replicas keep serving the model
+                self._load_errors[model_name] = e
+                self._cond.notify_all()
+            self._fail_pending(model_name, e)
+            return
+        with self._cond:
+            self.names.setdefault(model_name, getattr(model, 'names', None))
+            self._cond.notify_all()
+        logging.info(f"Inference replica for {model_name} ready on CPUs {cpus}")
+        while True:
+            batch = self._next_batch(model_name)
+            if batch is None:
+                return
+            self._run(model_name, model, *batch)
+
+    def _pin(self, cpus):
+        try:
+            # On Linux a thread id is a valid target, so only this replica's thread is pinned
+            os.sched_setaffinity(threading.get_native_id(), cpus)
+        except (AttributeError, OSError):
+            pass
+
+    def _next_batch(self, model_name):
+        """Block until a batch of one model is due; returns (imgsz, requests), or None on shutdown."""
+        with self._cond:
+            while self._running:
+                waiting = [(queue[0].enqueued, key) for key, queue in self._queues.items()
+                           if key[0] == model_name and queue]
+                if not waiting:
+                    self._cond.wait()
+                    continue
+                oldest, key = min(waiting)
+                queue = self._queues[key]
+                delay = oldest + self.max_wait - time.monotonic()
+                if len(queue) < self.max_batch_size and delay > 0:
+                    self._cond.wait(delay)
+                    continue
+                requests = [queue.popleft() for _ in range(min(len(queue), self.max_batch_size))]
+                return key[1], requests
+            return None
+
+    def _run(self, model_name, model, imgsz, requests):
+        requests = [request for request in requests if request.future.set_running_or_notify_cancel()]
+        if not requests:
+            return
+        started = time.monotonic()
+        waits = [started - request.enqueued for request in requests]
+        # One pass at the lowest threshold of the batch; each request then gets its own
+        conf = min(request.conf for request in requests)
+        try:
+            results = model.predict([request.frame for request in requests], conf=conf, imgsz=imgsz, verbose=False)
+        except Exception as e:
+            logging.error(f"Inference batch of {len(requests)} frames on {model_name} failed: {str(e)}")
+            for request in requests:
+                request.future.set_exception(e)
+            self._record(model_name, len(requests), waits, time.monotonic() - started, error=True)
+            return
+        compute = time.monotonic() - started
+        for request, result in zip(requests, results):
+            request.future.set_result(filter_conf(result, request.conf) if request.conf > conf else result)
+        self._record(model_name, len(requests), waits, compute)
+
+    def _fail_pending(self, model_name, error):
+        with self._cond:
+            for key, queue in self._queues.items():
+                while key[0] == model_name and queue:
+                    queue.popleft().future.set_exception(error)
+
+    def shutdown(self):
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        error = RuntimeError("Inference service is shut down")
+        for model_name in list(self._workers):
+            self._fail_pending(model_name, error)
+
+    ##################### STATS ##########################################
+
+    def _record(self, model_name, size, waits, compute, error=False):
+        with self._cond:
+            stats = self._stats[model_name]
+            stats["requests"] += size
+            stats["batches"] += 1
+            stats["errors"] += int(error)
+            stats["queue_wait_seconds"] += sum(waits)
+            stats["compute_seconds"] += compute
+            self._recent[model_name].append((size, max(waits), compute))
+
+    def stats(self):
+        """Per model: batch sizes, and how much of the latency is queueing vs compute."""
+        with self._cond:
+            report = {}
+            for model_name, stats in self._stats.items():
+                recent = list(self._recent[model_name])
+                requests, batches = stats["requests"], stats["batches"]
+                report[model_name] = {
+                    "requests": requests,
+                    "batches": batches,
+                    "errors": stats["errors"],
+                    "failed_replicas": self._load_failures.get(model_name, 0),
+                    "pending": sum(len(queue) for key, queue in self._queues.items() if key[0] == model_name),
+                    "mean_batch_size": round(requests / batches, 2) if batches else None,
+                    "mean_queue_wait_ms": round(1000 * stats["queue_wait_seconds"] / requests, 2) if requests else None,
+                    "p95_queue_wait_ms": _p95_ms([wait for _, wait, _ in recent]),
+                    "mean_batch_compute_ms": round(1000 * stats["compute_seconds"] / batches, 2) if batches else None,
+                    "p95_batch_compute_ms": _p95_ms([compute for _, _, compute in recent]),
+                    "compute_per_frame_ms": round(1000 * stats["compute_seconds"] / requests, 2) if requests else None,
+                }
+            return {"replicas": self.replicas, "cpu_groups": self.cpu_groups, "max_batch_size": self.max_batch_size,
+                    "max_wait_ms": round(1000 * self.max_wait, 2), "models": report}
+
+
+def filter_conf(result, conf):
+    """A Results with only the boxes at or above conf."""
+    if result.boxes is None:
+        return result
+    return result[result.boxes.conf >= conf]
+
+
+def _p95_ms(values):
+    if not values:
+        return None
+    values = sorted(values)
+    return round(1000 * values[min(len(values) - 1, int(0.95 * len(values)))], 2)
+
+
+class ServedModel:
+    """
+    Stands in for a YOLO model on in-memory frames (predict on a frame or a list of frames),
+    so the live loop and the tiled and cascade detectors go through the shared server.
+    """
+
+    def __init__(self, service, model_name, names=None):
+        self.service = service
+        self.model_name = model_name
+        self._names = names
+
+    @property
+    def names(self):
+        return self.service.names.get(self.model_name) or self._names
+
+    def predict(self, source, conf=0.25, imgsz=640, **kwargs):
+        frames = source if isinstance(source, (list, tuple)) else [source]
+        futures = [self.service.submit(self.model_name, frame, conf, imgsz) for frame in frames]
+        return [future.result() for future in futures]
+
+    def stream(self, frames, conf=0.25, imgsz=640):
+        return self.service.stream(self.model_name, frames, conf, imgsz)
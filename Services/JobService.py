@@ -0,0 +1,176 @@
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+
+class JobQueueFullError(Exception):
+    """Raised when a job is submitted while every worker and queue slot is taken."""
+
+
+class Job:
+    QUEUED = "queued"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+    def __init__(self, kind, params=None, on_cancel=None):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.params = params or {}
+        self.status = Job.QUEUED
+        self.frames_done = 0
+        self.total_frames = None
+        self.result = None
+        self.error = None
+        self.submitted_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.cancel_event = threading.Event()
+        self._on_cancel = on_cancel
+        self._future = None
+
+    def report_progress(self, frames_done, total_frames=None):
+        """Called by the analysis loop; cheap enough to call on every frame."""
+        self.frames_done = frames_done
+        if total_frames is not None:
+            self.total_frames = total_frames
+
+    def is_cancelled(self):
+        return self.cancel_event.is_set()
+
+    def is_finished(self):
+        return self.status in (Job.COMPLETED, Job.FAILED, Job.CANCELLED)
+
+    def throughput(self):
+        """Frames analysed per second since the job started running."""
+        if not self.started_at:
+            return 0.0
+        elapsed = (self.finished_at or time.time()) - self.started_at
+        return self.frames_done / elapsed if elapsed > 0 else 0.0
+
+    def to_dict(self):
+        percent = None
+        if self.total_frames:
+            percent = round(100.0 * min(self.frames_done, self.total_frames) / self.total_frames, 1)
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "params": self.params,
+            "progress": {
+                "frames_done": self.frames_done,
+                "total_frames": self.total_frames,
+                "percent": percent,
+            },
+            "throughput_fps": round(self.throughput(), 2),
+            "result": self.result,
+            "error": self.error,
+            "submitted_at": self.submitted_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+
+class JobService:
+    """
+    Runs analysis jobs on a bounded thread pool so REST handlers can return immediately.
+
+    At most max_workers jobs run at once and at most max_queued wait behind them; further
+    submissions raise JobQueueFullError instead of piling up unbounded work.
+    """
+
+    def __init__(self, max_workers=2, max_queued=8, history_size=200):
+        self.max_workers = max_workers
+        self.max_queued = max_queued
+        self.history_size = history_size
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="AnalysisJob")
+        self._jobs = OrderedDict()
+        self._active = 0
+        self._lock = threading.Lock()
+
+    def submit(self, kind, target, params=None, on_cancel=None):
+        """Queue target(job) for execution and return the Job handle."""
+        job = Job(kind, params, on_cancel)
+        with self._lock:
+            if self._active >= self.max_workers + self.max_queued:
+                raise JobQueueFullError(f"{self._active} analysis jobs already running or queued")
+            self._active += 1
+            self._jobs[job.id] = job
+            self._trim_history()
+        job._future = self._executor.submit(self._run, job, target)
+        logging.info("Job %s (%s) queued", job.id, kind)
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def list_jobs(self):
+        with self._lock:
+            return list(self._jobs.values())
+
+    def cancel(self, job_id):
+        """Cancel a queued job outright, or ask a running job to stop at its next frame."""
+        job = self.get(job_id)
+        if job is None or job.is_finished():
+            return job
+        job.cancel_event.set()
+        if job._future is not None and job._future.cancel():
+            self._finish(job, Job.CANCELLED)
+        elif job._on_cancel is not None:
+            job._on_cancel()
+        logging.info("Cancellation requested for job %s", job_id)
+        return job
+
+    def has_free_worker(self):
+        """True when a new job would start right away instead of waiting in the queue."""
+        with self._lock:
+            return self._active < self.max_workers
+
+    def stats(self):
+        with self._lock:
+            running = sum(1 for job in self._jobs.values() if job.status == Job.RUNNING)
+            return {
+                "running": running,
+                "queued": self._active - running,
+                "max_workers": self.max_workers,
+                "max_queued": self.max_queued,
+            }
+
+    def shutdown(self, wait=False):
+        for job in self.list_jobs():
+            self.cancel(job.id)
+        self._executor.shutdown(wait=wait)
+
+    def _run(self, job, target):
+        if job.is_cancelled():
+            self._finish(job, Job.CANCELLED)
+            return
+        job.status = Job.RUNNING
+        job.started_at = time.time()
+        try:
+            job.result = target(job)
+            self._finish(job, Job.CANCELLED if job.is_cancelled() else Job.COMPLETED)
+        except Exception as e:
+            job.error = str(e)
+            logging.error("Job %s (%s) failed: %s", job.id, job.kind, str(e))
+            self._finish(job, Job.FAILED)
+
+    def _finish(self, job, status):
+        with self._lock:
+            if job.is_finished():
+                return
+            job.status = status
+            job.finished_at = time.time()
+            self._active -= 1
+        logging.info("Job %s (%s) %s", job.id, job.kind, status)
+
+    def _trim_history(self):
+        # Forget the oldest finished jobs once the history is full; live ones are kept.
+        excess = len(self._jobs) - self.history_size
+        for job_id in [job_id for job_id, job in self._jobs.items() if job.is_finished()][:max(excess, 0)]:
+            del self._jobs[job_id]
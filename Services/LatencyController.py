@@ -0,0 +1,104 @@
+import logging
+import threading
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True)
+class DegradationLevel:
+    """How much work one live frame gets at a given step of the ladder."""
+    stride_factor: int = 1  # multiplies the configured frame stride
+    imgsz: int = 640  # inference size
+    model_name: str = None  # None keeps the configured model
+
+
+DEFAULT_LADDER = (
+    DegradationLevel(1, 640),
+    DegradationLevel(2, 640),
+    DegradationLevel(2, 480),
+    DegradationLevel(3, 320),
+    DegradationLevel(3, 320, "yolov8s"),
+)
+
+
+class LatencyController:
+    """
+    Keeps one live stream inside its capture-to-decision latency SLO.
+
+    Each analysed frame reports its latency and inference time. When `patience` frames
+    in a row miss the SLO the stream moves one step down the ladder (fewer frames,
+    smaller input, then the small model); once the smoothed latency stays below
+    headroom x SLO for `recovery` frames it moves back up one step.
+    """
+
+    def __init__(self, stream_id, slo=0.5, ladder=DEFAULT_LADDER, patience=5, recovery=30, headroom=0.6, on_change=None):
+        self.stream_id = stream_id
+        self.slo = slo
+        self.ladder = ladder
+        self.patience = patience
+        self.recovery = recovery
+        self.headroom = headroom
+        self.on_change = on_change
+        self.level = 0
+        self.latency = None  # EWMA, seconds
+        self.inference_time = None  # EWMA, seconds
+        self._over = 0
+        self._under = 0
+        self._lock = threading.Lock()
+        self._stats = {"frames": 0, "slo_violations": 0, "degradations": 0, "recoveries": 0}
+
+    def current(self):
+        return self.ladder[self.level]
+
+    def observe(self, latency, inference_time):
+        """Record one analysed frame; returns the DegradationLevel for the next one."""
+        with self._lock:
+            self._stats["frames"] += 1
+            if latency > self.slo:
+                self._stats["slo_violations"] += 1
+            self.latency = latency if self.latency is None else 0.7 * self.latency + 0.3 * latency
+            self.inference_time = inference_time if self.inference_time is None else 0.7 * self.inference_time + 0.3 * inference_time
+
+            # Degrade on consecutive raw violations (no EWMA lag once load drops); recover on the
+            # smoothed value so a few fast frames don't undo a degradation
+            if latency > self.slo:
+                self._over, self._under = self._over + 1, 0
+            elif self.latency < self.headroom * self.slo:
+                self._over, self._under = 0, self._under + 1
+            else:
+                self._over = self._under = 0
+
+            previous = self.level
+            if self._over >= self.patience and self.level < len(self.ladder) - 1:
+                self.level += 1
+                self._stats["degradations"] += 1
+            elif self._under >= self.recovery and self.level > 0:
+                self.level -= 1
+                self._stats["recoveries"] += 1
+            if self.level != previous:
+                self._over = self._under = 0
+            level = self.level
+
+        if level != previous:
+            if level > previous:
+                logging.warning("Live stream %s over its %.0fms latency SLO (%.0fms, inference %.0fms); degrading to %s",
+                                self.stream_id, 1000 * self.slo, 1000 * self.latency, 1000 * self.inference_time, self.ladder[level])
+            else:
+                logging.info("Live stream %s back within its latency SLO; restoring %s", self.stream_id, self.ladder[level])
+            if self.on_change is not None:
+                self.on_change(self.stream_id, previous, level)
+        return self.ladder[level]
+
+    def stats(self):
+        with self._lock:
+            current = self.ladder[self.level]
+            return dict(
+                self._stats,
+                level=self.level,
+                degraded=self.level > 0,
+                stride_factor=current.stride_factor,
+                imgsz=current.imgsz,
+                model_override=current.model_name,
+                slo_ms=round(1000 * self.slo, 1),
+                latency_ms=round(1000 * self.latency, 1) if self.latency is not None else None,
+                inference_ms=round(1000 * self.inference_time, 1) if self.inference_time is not None else None,
+            )
@@ -0,0 +1,185 @@
+import logging
+import os
+import socket
+import threading
+import time
+
+
+class LeaseService:
+    """
+    Lease/claim protocol on videos_from_user documents so several worker nodes can share
+    the upload queue and each video is analysed by exactly one of them.
+
+    A worker claims a video in a transaction by writing lease.owner/lease.expiresAt, keeps
+    the lease alive with a heartbeat while it works, and marks the video processed in a
+    transaction that first checks it still owns the lease. Videos whose lease expired
+    (the worker died) are found by a periodic scan and handed back for reprocessing.
+    Lease times are wall-clock epoch seconds, so node clocks only need to agree to well
+    within lease_seconds.
+    """
+
+    def __init__(self, backend, worker_id=None, lease_seconds=120, collection_name="videos_from_user", max_attempts=3):
+        self.backend = backend
+        self.worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}"
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.heartbeat_interval = lease_seconds / 3.0
+        self.collection_name = collection_name
+        self.started_at = time.time()
+        self._held = {}  # video_id -> on_lost callback
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._stats = {"claimed": 0, "completed": 0, "released": 0, "cancelled": 0, "lost": 0, "reclaimed": 0,
+                       "skipped": 0, "frames_processed": 0}
+
+    ##################### CLAIMING ##########################################
+
+    def try_claim(self, video_id, on_lost=None):
+        """Claim an unprocessed video; False if it is processed or leased by a live worker."""
+        now = time.time()
+
+        def claim(data):
+            if data is None or data.get('processed', False):
+                return None
+            lease = data.get('lease') or {}
+            # A live lease is refused whoever holds it, so this node never runs one video twice
+            if lease.get('expiresAt', 0) > now:
+                return None
+            return {
+                'lease': {'owner': self.worker_id, 'expiresAt': now + self.lease_seconds, 'claimedAt': now},
+                'attempts': data.get('attempts', 0) + 1,
+            }
+
+        claimed = self.backend.transactional_update(self.collection_name, video_id, claim) is not None
+        with self._lock:
+            if claimed:
+                self._held[video_id] = on_lost
+                self._stats["claimed"] += 1
+            else:
+                self._stats["skipped"] += 1
+        logging.info(f"Video {video_id} {'claimed' if claimed else 'not claimed'} by worker {self.worker_id}")
+        return claimed
+
+    def complete(self, video_id, frames_processed=0):
+        """Mark the video processed if this worker still owns its lease."""
+        done = self._update_if_owner(video_id, {'processed': True, 'lease': None, 'processedBy': self.worker_id})
+        with self._lock:
+            self._held.pop(video_id, None)
+            if done:
+                self._stats["completed"] += 1
+                self._stats["frames_processed"] += frames_processed
+            else:
+                self._stats["lost"] += 1
+        if not done:
+            logging.warning(f"Worker {self.worker_id} lost the lease on video {video_id} before completing it")
+        return done
+
+    def cancel(self, video_id):
+        """Set a video aside because its job was cancelled, so no worker picks it up again."""
+        if self._stop_event.is_set():
+            # Jobs stopped by a shutdown were already handed back by stop()
+            return False
+        cancelled = self._update_if_owner(video_id, {'processed': True, 'cancelled': True, 'lease': None,
+                                                     'processedBy': self.worker_id})
+        with self._lock:
+            self._held.pop(video_id, None)
+            if cancelled:
+                self._stats["cancelled"] += 1
+        if cancelled:
+            logging.info(f"Video {video_id} cancelled by worker {self.worker_id}")
+        return cancelled
+
+    def release(self, video_id, failed=False):
+        """
+        Give a claimed video back (failed, or on shutdown) so another worker can take it. The
+        lease is expired rather than removed, so the expiry scan of every worker finds it;
+        a video that failed on its last allowed attempt is set aside as failed instead.
+        """
+        def apply(data):
+            lease = (data or {}).get('lease') or {}
+            if lease.get('owner') != self.worker_id:
+                return None
+            if failed and data.get('attempts', 0) >= self.max_attempts:
+                return {'processed': True, 'failed': True, 'lease': None, 'processedBy': self.worker_id}
+            return {'lease.expiresAt': 0}
+
+        released = self.backend.transactional_update(self.collection_name, video_id, apply) is not None
+        with self._lock:
+            self._held.pop(video_id, None)
+            if released:
+                self._stats["released"] += 1
+        return released
+
+    def renew_all(self):
+        """Extend every held lease; leases taken over by someone else fire their on_lost callback."""
+        with self._lock:
+            held = list(self._held.items())
+        expires_at = time.time() + self.lease_seconds
+        for video_id, on_lost in held:
+            try:
+                renewed = self._update_if_owner(video_id, {'lease.expiresAt': expires_at})
+            except Exception as e:
+                logging.error(f"Failed to renew lease on video {video_id}: {str(e)}")
+                continue
+            if not renewed:
+                with self._lock:
+                    self._held.pop(video_id, None)
+                    self._stats["lost"] += 1
+                logging.warning(f"Lease on video {video_id} was taken over; stopping local processing")
+                if on_lost is not None:
+                    on_lost()
+
+    def find_expired(self, limit=20):
+        """Unprocessed videos whose lease expired, i.e. their worker died mid-job."""
+        return self.backend.query_documents(
+            self.collection_name,
+            filters=[('processed', '==', False), ('lease.expiresAt', '<', time.time())],
+            order_by='lease.expiresAt', limit=limit,
+        )
+
+    def _update_if_owner(self, video_id, update):
+        def apply(data):
+            lease = (data or {}).get('lease') or {}
+            return update if lease.get('owner') == self.worker_id else None
+
+        return self.backend.transactional_update(self.collection_name, video_id, apply) is not None
+
+    ##################### HEARTBEAT ##########################################
+
+    def start(self, on_reclaim):
+        """Start the heartbeat thread: renew leases, publish node stats, hand back expired videos."""
+        def run():
+            while not self._stop_event.wait(self.heartbeat_interval):
+                try:
+                    self.renew_all()
+                    for doc in self.find_expired():
+                        with self._lock:
+                            if doc.id in self._held:
+                                continue  # still being processed here
+                            self._stats["reclaimed"] += 1
+                        logging.info(f"Reclaiming video {doc.id} from expired worker {(doc.get('lease') or {}).get('owner')}")
+                        on_reclaim(doc.id, doc.to_dict())
+                    self.backend.set_document('workers', self.worker_id, self.stats())
+                except Exception as e:
+                    logging.error(f"Lease heartbeat failed: {str(e)}")
+
+        threading.Thread(target=run, name="LeaseHeartbeat", daemon=True).start()
+
+    def stop(self):
+        self._stop_event.set()
+        with self._lock:
+            held = list(self._held)
+        for video_id in held:
+            self.release(video_id)
+
+    def stats(self):
+        uptime = max(time.time() - self.started_at, 1e-6)
+        with self._lock:
+            stats = dict(self._stats, held=len(self._held))
+        stats.update({
+            "workerId": self.worker_id,
+            "heartbeatAt": time.time(),
+            "videosPerMinute": round(60.0 * stats["completed"] / uptime, 3),
+            "framesPerSecond": round(stats["frames_processed"] / uptime, 2),
+        })
+        return stats
@@ -0,0 +1,289 @@
+import copy
+import datetime
+import json
+import logging
+import queue
+import shutil
+import sqlite3
+import threading
+import uuid
+from pathlib import Path
+
+from Services.PersistenceBackend import (
+    ChangeType,
+    DocumentChange,
+    DocumentSnapshot,
+    PersistenceBackend,
+    resolve_sentinels,
+)
+
+
+def _encode(value):
+    if isinstance(value, datetime.datetime):
+        return {"__datetime__": value.isoformat()}
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def _decode(obj):
+    if "__datetime__" in obj and len(obj) == 1:
+        return datetime.datetime.fromisoformat(obj["__datetime__"])
+    return obj
+
+
+def _dumps(data):
+    return json.dumps(data, default=_encode)
+
+
+def _loads(text):
+    return json.loads(text, object_hook=_decode)
+
+
+_MISSING = object()
+
+_OPERATORS = {
+    "==": lambda a, b: a == b,
+    "!=": lambda a, b: a != b,
+    "<": lambda a, b: a < b,
+    "<=": lambda a, b: a <= b,
+    ">": lambda a, b: a > b,
+    ">=": lambda a, b: a >= b,
+    "in": lambda a, b: a in b,
+    "not-in": lambda a, b: a not in b,
+    "array-contains": lambda a, b: isinstance(a, list) and b in a,
+}
+
+
+def _field(data, path):
+    """Read a dotted field path, returning _MISSING when any segment is absent."""
+    for part in path.split("."):
+        if not isinstance(data, dict) or part not in data:
+            return _MISSING
+        data = data[part]
+    return data
+
+
+def _matches(data, filters):
+    # Like Firestore, documents that do not have the filtered field never match.
+    for field, op, value in filters:
+        current = _field(data, field)
+        if current is _MISSING:
+            return False
+        try:
+            if not _OPERATORS[op](current, value):
+                return False
+        except TypeError:
+            return False
+    return True
+
+
+class LocalBackend(PersistenceBackend):
+    """
+    PersistenceBackend for on-prem/edge nodes and local load tests: documents live in a
+    single SQLite file and blobs in a directory next to it.
+
+    Listeners are notified in write order from one dispatcher thread. For collection
+    listeners the documents argument only holds the documents touched by the change set.
+    """
+
+    name = "local"
+
+    def __init__(self, root_dir):
+        self.root_dir = Path(root_dir)
+        self.blob_dir = self.root_dir / "blobs"
+        self.blob_dir.mkdir(parents=True, exist_ok=True)
+
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(str(self.root_dir / "documents.sqlite3"), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS documents ("
+            " collection TEXT NOT NULL,"
+            " id TEXT NOT NULL,"
+            " data TEXT NOT NULL,"
+            " PRIMARY KEY (collection, id))"
+        )
+        self._conn.commit()
+
+        self._listeners = {}
+        self._events = queue.Queue()
+        self._dispatcher = threading.Thread(target=self._dispatch_events, name="LocalBackendDispatcher", daemon=True)
+        self._dispatcher.start()
+
+        logging.info(f"LocalBackend initialized in {self.root_dir}")
+
+    ##################### DOCUMENTS ##########################################
+
+    def add_document(self, collection_name, document_data):
+        document_id = uuid.uuid4().hex[:20]
+        self.set_document(collection_name, document_id, document_data)
+        return document_id
+
+    def set_document(self, collection_name, document_id, document_data):
+        data = self._resolve(document_data)
+        with self._lock:
+            existed = self._read(collection_name, document_id) is not None
+            self._write(collection_name, document_id, data)
+            self._notify(collection_name, document_id, ChangeType.MODIFIED if existed else ChangeType.ADDED, data)
+
+    def update_document(self, collection_name, document_id, update_data):
+        with self._lock:
+            data = self._read(collection_name, document_id)
+            if data is None:
+                raise KeyError(f"No document {document_id} in {collection_name}")
+            self._apply_update(data, update_data)
+            self._write(collection_name, document_id, data)
+            self._notify(collection_name, document_id, ChangeType.MODIFIED, data)
+
+    def transactional_update(self, collection_name, document_id, update_fn):
+        with self._lock:
+            # BEGIN IMMEDIATE also serializes against other processes sharing the database file
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                data = self._read(collection_name, document_id)
+                update = update_fn(copy.deepcopy(data))
+                if update is None:
+                    self._conn.rollback()
+                    return None
+                if data is None:
+                    raise KeyError(f"No document {document_id} in {collection_name}")
+                self._apply_update(data, update)
+                self._write(collection_name, document_id, data)
+            except Exception:
+                self._conn.rollback()
+                raise
+            self._notify(collection_name, document_id, ChangeType.MODIFIED, data)
+            return update
+
+    def delete_document(self, collection_name, document_id):
+        with self._lock:
+            data = self._read(collection_name, document_id)
+            if data is None:
+                return
+            self._conn.execute("DELETE FROM documents WHERE collection = ? AND id = ?", (collection_name, document_id))
+            self._conn.commit()
+            self._notify(collection_name, document_id, ChangeType.REMOVED, data)
+
+    def get_document(self, collection_name, document_id):
+        with self._lock:
+            data = self._read(collection_name, document_id)
+        return DocumentSnapshot(document_id, data) if data is not None else None
+
+    def query_documents(self, collection_name, filters=None, order_by=None, limit=None, start_after=None):
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, data FROM documents WHERE collection = ? ORDER BY id", (collection_name,)
+            ).fetchall()
+
+        snapshots = []
+        for document_id, text in rows:
+            data = _loads(text)
+            if not _matches(data, filters or []):
+                continue
+            if order_by and _field(data, order_by) is _MISSING:
+                continue
+            snapshots.append(DocumentSnapshot(document_id, data))
+
+        if order_by:
+            snapshots.sort(key=lambda snap: (_field(snap._data, order_by), snap.id))
+
+        if start_after is not None:
+            if order_by:
+                cursor = (start_after.get(order_by), start_after.id)
+                snapshots = [s for s in snapshots if (_field(s._data, order_by), s.id) > cursor]
+            else:
+                snapshots = [s for s in snapshots if s.id > start_after.id]
+
+        return snapshots[:limit] if limit is not None else snapshots
+
+    ##################### LISTENERS ##########################################
+
+    def on_snapshot(self, collection_name, callback, document_id=None):
+        token = object()
+        with self._lock:
+            self._listeners[token] = (collection_name, document_id, callback)
+            if document_id is not None:
+                data = self._read(collection_name, document_id)
+                initial = [DocumentSnapshot(document_id, data)] if data is not None else []
+            else:
+                initial = [DocumentSnapshot(doc_id, _loads(text)) for doc_id, text in self._conn.execute(
+                    "SELECT id, data FROM documents WHERE collection = ? ORDER BY id", (collection_name,))]
+            changes = [DocumentChange(ChangeType.ADDED, snapshot) for snapshot in initial]
+            self._events.put((token, callback, initial, changes))
+
+        def unsubscribe():
+            with self._lock:
+                self._listeners.pop(token, None)
+
+        return unsubscribe
+
+    def _notify(self, collection_name, document_id, change_type, data):
+        snapshot = DocumentSnapshot(document_id, data)
+        change = [DocumentChange(change_type, snapshot)]
+        for token, (listen_collection, listen_document, callback) in self._listeners.items():
+            if listen_collection != collection_name:
+                continue
+            if listen_document is not None and listen_document != document_id:
+                continue
+            self._events.put((token, callback, [snapshot], change))
+
+    def _dispatch_events(self):
+        while True:
+            token, callback, documents, changes = self._events.get()
+            if token not in self._listeners:
+                continue
+            try:
+                callback(documents, changes, datetime.datetime.now(datetime.timezone.utc))
+            except Exception as e:
+                logging.error(f"LocalBackend listener callback failed: {str(e)}")
+
+    ##################### BLOBS ##############################################
+
+    def upload_blob(self, local_path, blob_name, content_type=None):
+        destination = self._blob_path(blob_name)
+        shutil.copyfile(local_path, destination)
+        return destination.resolve().as_uri()
+
+    def upload_blob_bytes(self, data, blob_name, content_type=None):
+        destination = self._blob_path(blob_name)
+        destination.write_bytes(data)
+        return destination.resolve().as_uri()
+
+    def download_blob(self, blob_name, destination_file_path):
+        shutil.copyfile(self._blob_path(blob_name), destination_file_path)
+
+    def close(self):
+        with self._lock:
+            self._listeners.clear()
+            self._conn.close()
+
+    ##################### HELPERS ############################################
+
+    def _read(self, collection_name, document_id):
+        row = self._conn.execute(
+            "SELECT data FROM documents WHERE collection = ? AND id = ?", (collection_name, document_id)
+        ).fetchone()
+        return _loads(row[0]) if row else None
+
+    def _apply_update(self, data, update_data):
+        for path, value in self._resolve(update_data).items():
+            target = data
+            *parents, leaf = path.split(".")
+            for part in parents:
+                target = target.setdefault(part, {})
+            target[leaf] = value
+
+    def _write(self, collection_name, document_id, data):
+        self._conn.execute(
+            "INSERT OR REPLACE INTO documents (collection, id, data) VALUES (?, ?, ?)",
+            (collection_name, document_id, _dumps(data)),
+        )
+        self._conn.commit()
+
+    def _blob_path(self, blob_name):
+        destination = self.blob_dir / blob_name
+        destination.parent.mkdir(parents=True, exist_ok=True)
+        return destination
+
+    def _resolve(self, data):
+        return resolve_sentinels(data, datetime.datetime.now(datetime.timezone.utc))
@@ -0,0 +1,105 @@
+import atexit
+import logging
+import logging.handlers
+import os
+import queue
+import threading
+import time
+from collections import deque
+
+
+LOG_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+
+_listener = None
+
+
+class _DeferredQueueHandler(logging.handlers.QueueHandler):
+    # The stock QueueHandler formats the message in the calling thread; records never leave
+    # this process, so hand them over untouched and let the listener thread do the formatting.
+    def prepare(self, record):
+        return record
+
+
+def setup_logging(level=None):
+    """
+    Move log formatting and I/O off the calling threads. The root logger's handlers are
+    moved behind a QueueListener, so logging from an analysis loop is just a queue put.
+    """
+    global _listener
+    if _listener is not None:
+        return _listener
+
+    root = logging.getLogger()
+    level = level or os.getenv("LOG_LEVEL", "INFO")
+    if not root.handlers:
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter(LOG_FORMAT))
+        root.addHandler(handler)
+    root.setLevel(level)
+
+    log_queue = queue.SimpleQueue()
+    _listener = logging.handlers.QueueListener(log_queue, *root.handlers, respect_handler_level=True)
+    root.handlers = [_DeferredQueueHandler(log_queue)]
+    _listener.start()
+    atexit.register(_listener.stop)
+    return _listener
+
+
+class SampledLog:
+    """
+    Rate-limited logging for per-frame messages. Each key logs at INFO at most once per
+    interval (with a count of what was suppressed); everything else goes to DEBUG, which
+    costs a single level check unless debug logging is on.
+    """
+
+    def __init__(self, interval=5.0, logger=None):
+        self.interval = interval
+        self.logger = logger or logging.getLogger()
+        self._last = {}
+        self._suppressed = {}
+
+    def info(self, key, msg, *args):
+        now = time.monotonic()
+        last = self._last.get(key)
+        if last is not None and now - last < self.interval:
+            self._suppressed[key] = self._suppressed.get(key, 0) + 1
+            if self.logger.isEnabledFor(logging.DEBUG):
+                self.logger.debug(msg, *args)
+            return
+        self._last[key] = now
+        suppressed = self._suppressed.pop(key, 0)
+        if suppressed:
+            self.logger.info(msg + " (%d similar messages suppressed)", *args, suppressed)
+        else:
+            self.logger.info(msg, *args)
+
+
+class TraceRingBuffer:
+    """
+    Fixed-size in-memory record of recent per-frame events. Recording is a deque append,
+    so full detail is always kept for the last `capacity` events and can be dumped on
+    demand (REST) or when an error happens.
+    """
+
+    def __init__(self, capacity=4096):
+        self._events = deque(maxlen=capacity)
+
+    def record(self, event, **fields):
+        self._events.append((time.time(), threading.current_thread().name, event, fields))
+
+    def dump(self, limit=None):
+        events = list(self._events)  # copying a deque is atomic under the GIL
+        if limit is not None:
+            events = events[-limit:]
+        return [dict(fields, time=timestamp, thread=thread, event=event)
+                for timestamp, thread, event, fields in events]
+
+    def dump_to_log(self, reason, limit=200):
+        events = self.dump(limit)
+        lines = "\n".join(
+            "%.3f [%s] %s %s" % (e.pop('time'), e.pop('thread'), e.pop('event'), e) for e in events
+        )
+        logging.warning("Last %d trace events (%s):\n%s", len(events), reason, lines)
+
+    def __len__(self):
+        return len(self._events)
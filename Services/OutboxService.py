@@ -0,0 +1,212 @@
+import datetime
+import json
+import logging
+import os
+import shutil
+import sqlite3
+import threading
+import time
+import uuid
+
+from Services.PersistenceBackend import SERVER_TIMESTAMP
+
+
+def _encode(value):
+    if isinstance(value, datetime.datetime):
+        return {"__datetime__": value.isoformat()}
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def _stamp(value, now):
+    # Pending server timestamps are fixed at the time the entry is recorded, not forwarded
+    if value is SERVER_TIMESTAMP:
+        return now
+    if isinstance(value, dict):
+        return {key: _stamp(item, now) for key, item in value.items()}
+    return value
+
+
+def _decode(obj):
+    if "__datetime__" in obj and len(obj) == 1:
+        return datetime.datetime.fromisoformat(obj["__datetime__"])
+    return obj
+
+
+class Outbox:
+    """
+    Durable store-and-forward queue for writes that must not be lost when the network is
+    down: entries are committed to a local SQLite file (and their images to a spool
+    directory) before put() returns, and a drainer thread forwards them in order through
+    the handler registered for their kind.
+
+    Entries are forwarded strictly in the order they were recorded, at most `rate` per
+    second in bursts of batch_size. A failed entry stops the burst and the drainer backs
+    off exponentially before trying it again, so an outage costs one failed call per
+    backoff period rather than one per entry. Handlers must be idempotent: an entry that
+    was forwarded but not yet removed when the process died is forwarded again.
+    """
+
+    def __init__(self, directory, handlers, batch_size=20, rate=10.0, backoff=1.0, max_backoff=300.0, max_attempts=0):
+        self.directory = directory
+        self.handlers = handlers  # kind -> callable(key, payload, blobs)
+        self.batch_size = batch_size
+        self.rate = rate
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.max_attempts = max_attempts  # 0 = retry forever
+        self.spool_dir = os.path.join(directory, "spool")
+        os.makedirs(self.spool_dir, exist_ok=True)
+        self._conn = sqlite3.connect(os.path.join(directory, "outbox.sqlite3"), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("""CREATE TABLE IF NOT EXISTS outbox (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            key TEXT UNIQUE NOT NULL,
+            kind TEXT NOT NULL,
+            payload TEXT NOT NULL,
+            blobs TEXT NOT NULL,
+            created REAL NOT NULL,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            last_error TEXT,
+            parked INTEGER NOT NULL DEFAULT 0)""")
+        self._conn.commit()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._failures = 0
+        self._retry_at = 0.0
+        self._stats = {"recorded": 0, "forwarded": 0, "failed_attempts": 0, "parked": 0}
+        self._remove_orphaned_spool()
+
+    @classmethod
+    def from_env(cls, handlers):
+        """The outbox in OUTBOX_DIR, or None when it is unset (writes go straight to the backend)."""
+        directory = os.getenv("OUTBOX_DIR", "")
+        if not directory:
+            return None
+        return cls(directory, handlers,
+                   batch_size=int(os.getenv("OUTBOX_BATCH_SIZE", 20)),
+                   rate=float(os.getenv("OUTBOX_RATE", 10)),
+                   max_backoff=float(os.getenv("OUTBOX_MAX_BACKOFF_SECONDS", 300)),
+                   max_attempts=int(os.getenv("OUTBOX_MAX_ATTEMPTS", 0)))
+
+    def _remove_orphaned_spool(self):
+        # Images of an entry whose row was never committed (crash in between) or already removed
+        with self._lock:
+            keys = {row[0] for row in self._conn.execute("SELECT key FROM outbox")}
+        for name in os.listdir(self.spool_dir):
+            if name not in keys:
+                shutil.rmtree(os.path.join(self.spool_dir, name), ignore_errors=True)
+
+    ##################### RECORDING ##########################################
+
+    def put(self, kind, payload, blobs=None, key=None):
+        """Record an entry durably and return its key. Pending server timestamps become the current time."""
+        if kind not in self.handlers:
+            raise KeyError(f"No outbox handler for {kind}")
+        key = key or str(uuid.uuid4())
+        payload = _stamp(payload, datetime.datetime.now(datetime.timezone.utc))
+        blobs = blobs or {}
+        if blobs:
+            entry_dir = os.path.join(self.spool_dir, key)
+            os.makedirs(entry_dir, exist_ok=True)
+            for name, data in blobs.items():
+                path = os.path.join(entry_dir, name)
+                with open(path + ".tmp", "wb") as f:
+                    f.write(data)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(path + ".tmp", path)
+        with self._lock:
+            self._conn.execute("INSERT OR IGNORE INTO outbox (key, kind, payload, blobs, created) VALUES (?, ?, ?, ?, ?)",
+                               (key, kind, json.dumps(payload, default=_encode), json.dumps(sorted(blobs)), time.time()))
+            self._conn.commit()
+            self._stats["recorded"] += 1
+        self._wake.set()
+        return key
+
+    ##################### FORWARDING ##########################################
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._drain_loop, daemon=True, name="OutboxDrainer")
+            self._thread.start()
+        return self
+
+    def stop(self, timeout=5.0):
+        self._stop_event.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        with self._lock:
+            self._conn.close()
+
+    def _drain_loop(self):
+        while not self._stop_event.is_set():
+            delay = self._retry_at - time.monotonic()
+            if delay > 0:
+                self._stop_event.wait(delay)
+                continue
+            self._wake.clear()
+            if self.drain() == 0:
+                self._wake.wait(5.0)
+
+    def drain(self):
+        """Forward one burst of pending entries in order; returns how many were forwarded."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT seq, key, kind, payload, blobs, attempts FROM outbox WHERE parked = 0 ORDER BY seq LIMIT ?",
+                (self.batch_size,)).fetchall()
+        forwarded = 0
+        for seq, key, kind, payload, blob_names, attempts in rows:
+            if self._stop_event.is_set():
+                break
+            started = time.monotonic()
+            try:
+                blobs = {}
+                for name in json.loads(blob_names):
+                    with open(os.path.join(self.spool_dir, key, name), "rb") as f:
+                        blobs[name] = f.read()
+                self.handlers[kind](key, json.loads(payload, object_hook=_decode), blobs)
+            except Exception as e:
+                self._failed(seq, key, kind, attempts + 1, e)
+                break
+            with self._lock:
+                self._conn.execute("DELETE FROM outbox WHERE seq = ?", (seq,))
+                self._conn.commit()
+                self._stats["forwarded"] += 1
+            shutil.rmtree(os.path.join(self.spool_dir, key), ignore_errors=True)
+            self._failures = 0
+            forwarded += 1
+            if self.rate:
+                self._stop_event.wait(max(0.0, 1.0 / self.rate - (time.monotonic() - started)))
+        return forwarded
+
+    def _failed(self, seq, key, kind, attempts, error):
+        parked = bool(self.max_attempts) and attempts >= self.max_attempts
+        with self._lock:
+            self._conn.execute("UPDATE outbox SET attempts = ?, last_error = ?, parked = ? WHERE seq = ?",
+                               (attempts, str(error), int(parked), seq))
+            self._conn.commit()
+            self._stats["failed_attempts"] += 1
+            self._stats["parked"] += int(parked)
+        if parked:
+            # Give up on this entry only; the ones behind it carry on
+            logging.error(f"Outbox entry {kind} {key} parked after {attempts} attempts: {str(error)}")
+            return
+        self._failures += 1
+        wait = min(self.max_backoff, self.backoff * 2 ** (self._failures - 1))
+        self._retry_at = time.monotonic() + wait
+        logging.warning(f"Forwarding outbox entry {kind} {key} failed ({str(error)}); retrying in {wait:.0f}s")
+
+    ##################### STATS ##########################################
+
+    def stats(self):
+        with self._lock:
+            pending, oldest, head_attempts = self._conn.execute(
+                "SELECT COUNT(*), MIN(created), MAX(attempts) FROM outbox WHERE parked = 0").fetchone()
+            parked = self._conn.execute("SELECT COUNT(*) FROM outbox WHERE parked = 1").fetchone()[0]
+            stats = dict(self._stats)
+        return dict(stats, pending=pending, parked_entries=parked, max_attempts_pending=head_attempts or 0,
+                    oldest_pending_seconds=round(time.time() - oldest, 1) if oldest else None,
+                    retry_in_seconds=round(max(0.0, self._retry_at - time.monotonic()), 1))
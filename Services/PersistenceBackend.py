@@ -0,0 +1,136 @@
+import copy
+import enum
+import os
+
+
+# Backend-neutral stand-in for firestore.SERVER_TIMESTAMP. Each backend replaces it
+# with its own notion of "now" when the document is written.
+class _ServerTimestamp:
+    def __repr__(self):
+        return "SERVER_TIMESTAMP"
+
+
+SERVER_TIMESTAMP = _ServerTimestamp()
+
+
+def resolve_sentinels(data, server_timestamp):
+    """Return a copy of data with every SERVER_TIMESTAMP replaced by server_timestamp."""
+    if data is SERVER_TIMESTAMP:
+        return server_timestamp
+    if isinstance(data, dict):
+        return {key: resolve_sentinels(value, server_timestamp) for key, value in data.items()}
+    if isinstance(data, (list, tuple)):
+        return [resolve_sentinels(value, server_timestamp) for value in data]
+    return data
+
+
+class ChangeType(enum.Enum):
+    ADDED = 1
+    MODIFIED = 2
+    REMOVED = 3
+
+
+class DocumentSnapshot:
+    """Minimal equivalent of a Firestore DocumentSnapshot (id, exists, to_dict)."""
+
+    def __init__(self, document_id, data):
+        self.id = document_id
+        self._data = data
+        self.exists = data is not None
+
+    def get(self, field):
+        return (self._data or {}).get(field)
+
+    def to_dict(self):
+        return copy.deepcopy(self._data) if self._data is not None else None
+
+
+class DocumentChange:
+    """Minimal equivalent of a Firestore DocumentChange (type.name, document)."""
+
+    def __init__(self, change_type, document):
+        self.type = change_type
+        self.document = document
+
+
+class PersistenceBackend:
+    """
+    Interface for the document database and blob storage used by the services.
+
+    Snapshot callbacks receive (documents, changes, read_time) exactly like Firestore
+    listeners do, so listener code works unchanged against every backend.
+    """
+
+    name = None
+
+    ##################### DOCUMENTS ##########################################
+
+    def add_document(self, collection_name, document_data):
+        """Add a document with a generated ID and return that ID."""
+        raise NotImplementedError
+
+    def set_document(self, collection_name, document_id, document_data):
+        """Create or overwrite the document with the given ID."""
+        raise NotImplementedError
+
+    def update_document(self, collection_name, document_id, update_data):
+        """Merge update_data into an existing document."""
+        raise NotImplementedError
+
+    def get_document(self, collection_name, document_id):
+        """Return the DocumentSnapshot for document_id, or None if it does not exist."""
+        raise NotImplementedError
+
+    def delete_document(self, collection_name, document_id):
+        """Delete a document; deleting a missing document is not an error."""
+        raise NotImplementedError
+
+    def transactional_update(self, collection_name, document_id, update_fn):
+        """
+        Atomically read a document and apply update_fn(data) to it. update_fn gets the current
+        data (None if missing) and returns the fields to update, or None to leave it untouched.
+        Returns what update_fn returned.
+        """
+        raise NotImplementedError
+
+    def query_documents(self, collection_name, filters=None, order_by=None, limit=None, start_after=None):
+        """
+        Return a list of DocumentSnapshots matching every (field, op, value) filter.
+        Results are ordered by order_by (document ID when None); start_after is the last
+        DocumentSnapshot of the previous page.
+        """
+        raise NotImplementedError
+
+    ##################### LISTENERS ##########################################
+
+    def on_snapshot(self, collection_name, callback, document_id=None):
+        """Watch a collection (or a single document) and return an unsubscribe function."""
+        raise NotImplementedError
+
+    ##################### BLOBS ##############################################
+
+    def upload_blob(self, local_path, blob_name, content_type=None):
+        """Upload a local file and return its public URL."""
+        raise NotImplementedError
+
+    def upload_blob_bytes(self, data, blob_name, content_type=None):
+        """Upload an in-memory buffer and return its public URL."""
+        raise NotImplementedError
+
+    def download_blob(self, blob_name, destination_file_path):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+def create_backend(kind=None):
+    """Build the backend selected by PERSISTENCE_BACKEND ('firebase' or 'local')."""
+    kind = (kind or os.getenv("PERSISTENCE_BACKEND", "firebase")).lower()
+    if kind == "firebase":
+        from Services.FirebaseBackend import FirebaseBackend
+        return FirebaseBackend()
+    if kind == "local":
+        from Services.LocalBackend import LocalBackend
+        return LocalBackend(os.getenv("LOCAL_BACKEND_DIR", "LocalData"))
+    raise ValueError(f"Unknown persistence backend: {kind}")
@@ -0,0 +1,135 @@
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+# Analysis jobs (uploads and live streams) and the shared inference replicas
+DEFAULT_THREAD_PREFIXES = ("AnalysisJob", "inference-")
+
+
+class ProfileBusyError(Exception):
+    """Raised when a profile is requested while another one is running."""
+
+
+def _frame_label(code):
+    return f"{os.path.basename(code.co_filename)}:{code.co_name}"
+
+
+class ProfileSession:
+    """One sampling run: stacks of the selected threads every `interval` seconds until it stops."""
+
+    def __init__(self, seconds, frames=None, interval=0.005, thread_prefixes=DEFAULT_THREAD_PREFIXES):
+        self.seconds = seconds
+        self.frames = frames
+        self.interval = interval
+        self.thread_prefixes = thread_prefixes  # None samples every thread
+        self.stacks = Counter()  # folded stack -> samples
+        self.samples = 0
+        self.frames_seen = 0
+        self.started = None
+        self.elapsed = None
+        self.done = threading.Event()
+
+    def count_frame(self):
+        self.frames_seen += 1
+        if self.frames is not None and self.frames_seen >= self.frames:
+            self.done.set()
+
+    def run(self):
+        self.started = time.monotonic()
+        own = threading.get_ident()
+        deadline = self.started + self.seconds
+        while not self.done.is_set() and time.monotonic() < deadline:
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                name = names.get(ident, str(ident))
+                if ident == own or (self.thread_prefixes and not name.startswith(self.thread_prefixes)):
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_label(frame.f_code))
+                    frame = frame.f_back
+                # Pool workers share a name prefix, so AnalysisJob_0 and AnalysisJob_3 fold together
+                self.stacks[";".join([name.rstrip("_-0123456789")] + stack[::-1])] += 1
+            self.samples += 1
+            self.done.wait(self.interval)
+        self.elapsed = time.monotonic() - self.started
+        self.done.set()
+
+    def folded(self):
+        """Stacks in the collapsed format flamegraph.pl and speedscope read: "a;b;c count" per line."""
+        return "\n".join(f"{stack} {count}" for stack, count in self.stacks.most_common())
+
+    def summary(self, limit=30):
+        """Per function: samples where it was on top of the stack (self) and anywhere in it (total)."""
+        own, total = Counter(), Counter()
+        for stack, count in self.stacks.items():
+            functions = stack.split(";")[1:]
+            if not functions:
+                continue
+            own[functions[-1]] += count
+            for function in set(functions):
+                total[function] += count
+        stack_samples = sum(self.stacks.values()) or 1
+        return [{"function": function, "self": own[function], "total": total[function],
+                 "self_pct": round(100.0 * own[function] / stack_samples, 1),
+                 "total_pct": round(100.0 * total[function] / stack_samples, 1)}
+                for function, _ in total.most_common(limit)]
+
+
+class Profiler:
+    """
+    On-demand sampling profiler for a running node. Nothing is hooked while no profile is
+    running: the analysis loops only check one attribute per frame. A profile samples the
+    selected threads from a separate thread for a number of seconds (or until the loops
+    have analysed a number of frames), optionally with a torch profiler trace alongside.
+    """
+
+    def __init__(self, trace_dir="Profiles"):
+        self.trace_dir = trace_dir
+        self.session = None
+        self._lock = threading.Lock()
+
+    def frame_done(self):
+        """Called by the analysis loops once per frame."""
+        session = self.session
+        if session is not None:
+            session.count_frame()
+
+    def profile(self, seconds=10.0, frames=None, interval=0.005, thread_prefixes=DEFAULT_THREAD_PREFIXES, torch_trace=False):
+        """Run one profile (blocking) and return the session and, with torch_trace, the torch results."""
+        session = ProfileSession(seconds, frames, interval, thread_prefixes)
+        with self._lock:
+            if self.session is not None:
+                raise ProfileBusyError("A profile is already running")
+            self.session = session
+        logging.info(f"Profiling for up to {seconds}s{f' or {frames} frames' if frames else ''}")
+        torch_profile = self._start_torch() if torch_trace else None
+        try:
+            session.run()
+        finally:
+            self.session = None
+            torch_result = self._stop_torch(torch_profile) if torch_profile is not None else None
+        logging.info(f"Profile finished: {session.samples} samples, {session.frames_seen} frames in {session.elapsed:.1f}s")
+        return session, torch_result
+
+    def _start_torch(self):
+        torch = sys.modules.get("torch")
+        if torch is None:
+            return None
+        profile = torch.profiler.profile(activities=[torch.profiler.ProfilerActivity.CPU])
+        profile.start()
+        return profile
+
+    def _stop_torch(self, profile):
+        profile.stop()
+        os.makedirs(self.trace_dir, exist_ok=True)
+        path = os.path.join(self.trace_dir, f"torch_trace_{time.strftime('%Y-%m-%d_%H-%M-%S')}.json")
+        profile.export_chrome_trace(path)
+        operators = [{"name": event.key, "calls": event.count,
+                      "cpu_time_total_ms": round(event.cpu_time_total / 1000.0, 3),
+                      "self_cpu_time_total_ms": round(event.self_cpu_time_total / 1000.0, 3)}
+                     for event in sorted(profile.key_averages(), key=lambda e: e.self_cpu_time_total, reverse=True)[:20]]
+        return {"chrome_trace": path, "operators": operators}
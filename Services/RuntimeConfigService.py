@@ -0,0 +1,192 @@
+import logging
+import threading
+from dataclasses import dataclass, field, replace
+from types import MappingProxyType
+
+
+DEFAULT_THRESHOLD = 0.6
+MIN_THRESHOLD = 0.4
+MAX_THRESHOLD = 1.0
+MIN_TILE_SIZE = 160
+
+
+@dataclass(frozen=True)
+class SourceConfig:
+    """Inference settings for one source (a camera id, or the 'video'/'live_video' defaults)."""
+    confidence_threshold: float = DEFAULT_THRESHOLD
+    model_name: str = "yolov8s"
+    frame_stride: int = 1  # analyse every Nth frame
+    tile_size: int = 0  # > 0: tiled inference with tiles of this many pixels (for 4K footage)
+    cascade: bool = False  # screen with the small model, confirm uncertain frames with the medium one
+
+
+@dataclass(frozen=True)
+class RuntimeConfig:
+    """
+    Immutable snapshot of all runtime settings. Inference loops grab the current snapshot
+    with a plain attribute read; updates build a new snapshot and swap the reference.
+    """
+    defaults: MappingProxyType = field(default_factory=lambda: MappingProxyType({
+        'video': SourceConfig(model_name="yolov8s"),
+        'live_video': SourceConfig(model_name="yolov8m"),
+    }))
+    sources: MappingProxyType = field(default_factory=lambda: MappingProxyType({}))  # camera id -> kind -> SourceConfig
+    version: int = 0
+
+    def for_source(self, source_id=None, kind='video'):
+        if source_id is not None and str(source_id) in self.sources:
+            return self.sources[str(source_id)][kind]
+        return self.defaults[kind]
+
+    def model_names(self):
+        configs = list(self.defaults.values()) + [config for kinds in self.sources.values() for config in kinds.values()]
+        return {config.model_name for config in configs}
+
+
+class ModelRegistry:
+    """Loads models by name (keys of model_paths) once and hands out the shared instances."""
+
+    def __init__(self, model_paths, loader):
+        self.model_paths = model_paths
+        self.loader = loader
+        self._models = {}
+        self._lock = threading.Lock()
+
+    def get(self, name):
+        model = self._models.get(name)
+        if model is None:
+            model = self.load(name)
+        return model
+
+    def load(self, name):
+        if name not in self.model_paths:
+            raise KeyError(f"Unknown model: {name}")
+        with self._lock:
+            if name not in self._models:
+                logging.info("Loading model %s from %s", name, self.model_paths[name])
+                self._models[name] = self.loader(self.model_paths[name])
+            return self._models[name]
+
+    def is_loaded(self, name):
+        return name in self._models
+
+
+class RuntimeConfigService:
+    """Parses the settings document into RuntimeConfig snapshots and swaps them in atomically."""
+
+    def __init__(self, model_registry):
+        self.model_registry = model_registry
+        self._config = RuntimeConfig()
+        self._requested_version = 0
+        self._lock = threading.Lock()
+
+    def current(self):
+        return self._config
+
+    def set_default_threshold(self, threshold):
+        """Change the threshold of the built-in defaults (used by tests and the REST layer)."""
+        with self._lock:
+            config = self._config
+            defaults = {kind: replace(source, confidence_threshold=threshold) for kind, source in config.defaults.items()}
+            self._requested_version += 1
+            self._config = replace(config, defaults=MappingProxyType(defaults), version=self._requested_version)
+
+    def apply_settings(self, settings_data):
+        """
+        Build a snapshot from the settings document. If it needs a model that is not loaded yet,
+        the model is loaded on a background thread and the snapshot is swapped in afterwards, so
+        inference keeps running on the previous snapshot meanwhile.
+        """
+        with self._lock:
+            self._requested_version += 1
+            config = self._parse(settings_data, self._requested_version)
+
+        missing = [name for name in config.model_names() if not self.model_registry.is_loaded(name)]
+        if not missing:
+            self._swap(config)
+            return None
+
+        def load_then_swap():
+            try:
+                for name in missing:
+                    self.model_registry.load(name)
+            except Exception as e:
+                logging.error("Failed to load models %s, keeping the previous configuration: %s", missing, str(e))
+                return
+            self._swap(config)
+
+        loader_thread = threading.Thread(target=load_then_swap, name="ModelLoader", daemon=True)
+        loader_thread.start()
+        return loader_thread
+
+    def _swap(self, config):
+        with self._lock:
+            # A newer settings update may have been applied while models were loading.
+            if config.version != self._requested_version:
+                logging.info("Discarding stale runtime configuration v%d", config.version)
+                return
+            self._config = config
+        logging.info("Runtime configuration v%d active: %s", config.version, config)
+
+    def _parse(self, settings_data, version):
+        base_threshold = self._threshold(settings_data.get('threshHold'), DEFAULT_THRESHOLD)
+        base_stride = self._stride(settings_data.get('frameStride'), 1)
+        base_tile_size = self._tile_size(settings_data.get('tileSize'), 0)
+        base_cascade = self._flag(settings_data.get('cascade'), False)
+        defaults = {
+            'video': SourceConfig(base_threshold, self._model(settings_data.get('model'), "yolov8s"), base_stride, base_tile_size, base_cascade),
+            'live_video': SourceConfig(base_threshold, self._model(settings_data.get('liveModel'), "yolov8m"), base_stride, base_tile_size, base_cascade),
+        }
+
+        # Per-camera overrides inherit whatever they don't set from the default of each kind, so
+        # uploads tagged with a camera keep the video model unless the camera names one
+        sources = {}
+        for source_id, overrides in (settings_data.get('sources') or {}).items():
+            sources[str(source_id)] = MappingProxyType({kind: SourceConfig(
+                self._threshold(overrides.get('threshHold'), default.confidence_threshold),
+                self._model(overrides.get('model'), default.model_name),
+                self._stride(overrides.get('frameStride'), default.frame_stride),
+                self._tile_size(overrides.get('tileSize'), default.tile_size),
+                self._flag(overrides.get('cascade'), default.cascade),
+            ) for kind, default in defaults.items()})
+        return RuntimeConfig(MappingProxyType(defaults), MappingProxyType(sources), version)
+
+    def _threshold(self, value, default):
+        if value is None:
+            return default
+        if not isinstance(value, (int, float)) or value < MIN_THRESHOLD or value > MAX_THRESHOLD:
+            logging.error(f"Invalid confidence threshold value: {value}. Defaulting to {default}")
+            return default
+        return float(value)
+
+    def _model(self, value, default):
+        if value is None:
+            return default
+        if value not in self.model_registry.model_paths:
+            logging.error(f"Unknown model {value}. Defaulting to {default}")
+            return default
+        return value
+
+    def _stride(self, value, default):
+        if value is None:
+            return default
+        if not isinstance(value, int) or value < 1:
+            logging.error(f"Invalid frame stride {value}. Defaulting to {default}")
+            return default
+        return value
+
+    def _tile_size(self, value, default):
+        if value is None:
+            return default
+        if not isinstance(value, int) or (value != 0 and value < MIN_TILE_SIZE):
+            logging.error(f"Invalid tile size {value}. Defaulting to {default}")
+            return default
+        return value
+
+    def _flag(self, value, default):
+        if value is None:
+            return default
+        if not isinstance(value, bool):
+            logging.error(f"Invalid boolean setting {value}. Defaulting to {default}")
+            return default
+        return value
@@ -0,0 +1,168 @@
+import logging
+import os
+import sys
+import threading
+import time
+
+
+class ResourceScheduler:
+    """
+    Splits the CPU between live streams and batch (uploaded video) analysis.
+
+    The first live_threads of the usable CPUs are reserved for live inference and batch
+    jobs share the rest: each thread is pinned to its CPU set when it is configured, so
+    the OpenMP threads torch starts for it afterwards land on the same set. Batch threads
+    also get batch_threads_per_job torch threads and a lower OS priority. The live loops
+    report their capture-to-decision latency; when it exceeds the target, batch loops are
+    throttled (duty-cycled at their per-frame checkpoint), and when it exceeds
+    preempt_factor x target they are paused until live latency recovers.
+
+    With a single CPU both sets are that CPU. Where thread affinity is unavailable (not
+    Linux) only the thread counts, priorities and throttling apply. The inter-op pool is
+    process-wide, so its size is set once by configure_process() before any model runs.
+    With INFERENCE_SERVER=1 the forward passes run on the server's replica threads, which
+    InferenceService pins itself; the split then covers decoding and post-processing.
+    """
+
+    def __init__(self, cpus=None, live_threads=None, batch_threads_per_job=None, interop_threads=1,
+                 latency_target=0.25, preempt_factor=2.0, max_pause=5.0):
+        if cpus is None:
+            try:
+                cpus = sorted(os.sched_getaffinity(0))
+            except AttributeError:
+                cpus = list(range(os.cpu_count() or 1))
+        cpus = list(cpus)
+        self.total_cpus = len(cpus)
+        self.live_threads = min(live_threads or max(1, self.total_cpus // 2), self.total_cpus)
+        self.live_cpus = cpus[:self.live_threads]
+        self.batch_cpus = cpus[self.live_threads:] or cpus
+        batch_threads = len(self.batch_cpus)
+        self.batch_threads_per_job = batch_threads_per_job or max(1, batch_threads // 2)
+        self.batch_workers = max(1, batch_threads // self.batch_threads_per_job)
+        self.latency_target = latency_target
+        self.preempt_factor = preempt_factor
+        self.max_pause = max_pause
+        self.interop_threads = interop_threads
+
+        self.live_latency = None  # EWMA of live capture-to-decision latency, seconds
+        self.throttle = 0.0  # fraction of wall time batch loops spend sleeping
+        self._live_streams = 0
+        self._resume = threading.Event()
+        self._resume.set()
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._stats = {"throttled_sleep_seconds": 0.0, "preemptions": 0}
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            live_threads=int(os.getenv("LIVE_RESERVED_THREADS", 0)) or None,
+            batch_threads_per_job=int(os.getenv("BATCH_THREADS_PER_JOB", 0)) or None,
+            interop_threads=int(os.getenv("TORCH_INTEROP_THREADS", 1)),
+            latency_target=float(os.getenv("LIVE_LATENCY_TARGET_MS", 250)) / 1000.0,
+        )
+
+    ##################### THREAD SETUP ##########################################
+
+    def configure_process(self):
+        """Size torch's process-wide inter-op pool; must run before the first model is loaded."""
+        import torch
+        try:
+            torch.set_num_interop_threads(self.interop_threads)
+        except RuntimeError as e:
+            # torch refuses once parallel work has started; the pool keeps its default size
+            logging.warning(f"Could not set torch inter-op threads to {self.interop_threads}: {str(e)}")
+
+    def configure_live_thread(self):
+        self._pin(self.live_cpus)
+        self._set_torch_threads(self.live_threads)
+        with self._lock:
+            self._live_streams += 1
+
+    def live_thread_done(self):
+        with self._lock:
+            self._live_streams = max(0, self._live_streams - 1)
+            if self._live_streams == 0:
+                # No live stream left to protect
+                self.live_latency = None
+                self.throttle = 0.0
+                self._resume.set()
+
+    def configure_batch_thread(self):
+        self._pin(self.batch_cpus)
+        self._set_torch_threads(self.batch_threads_per_job)
+        try:
+            # On Linux a thread id is a valid PRIO_PROCESS target, so only this thread is reniced
+            os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), 10)
+        except (AttributeError, OSError):
+            pass
+
+    def _pin(self, cpus):
+        try:
+            # On Linux a thread id is a valid target, so only this thread is pinned
+            os.sched_setaffinity(threading.get_native_id(), cpus)
+        except (AttributeError, OSError):
+            pass
+
+    def _set_torch_threads(self, count):
+        # With the OpenMP backend the intra-op thread count applies to the calling thread
+        torch = sys.modules.get("torch")
+        if torch is not None:
+            torch.set_num_threads(count)
+
+    ##################### LIVE FEEDBACK ##########################################
+
+    def report_live_latency(self, seconds):
+        with self._lock:
+            self.live_latency = seconds if self.live_latency is None else 0.8 * self.live_latency + 0.2 * seconds
+            if self.live_latency > self.latency_target:
+                self.throttle = min(0.9, self.throttle + 0.1)
+            elif self.live_latency < 0.8 * self.latency_target:
+                self.throttle = max(0.0, self.throttle - 0.05)
+
+            if self.live_latency > self.preempt_factor * self.latency_target:
+                if self._resume.is_set():
+                    self._stats["preemptions"] += 1
+                    logging.warning("Live latency %.0fms over budget, pausing batch analysis", 1000 * self.live_latency)
+                self._resume.clear()
+            elif not self._resume.is_set():
+                logging.info("Live latency back to %.0fms, resuming batch analysis", 1000 * self.live_latency)
+                self._resume.set()
+
+    ##################### BATCH CHECKPOINT ##########################################
+
+    def batch_checkpoint(self):
+        """Called by batch loops once per frame; pauses or sleeps when live streams need the CPU."""
+        now = time.monotonic()
+        last = getattr(self._local, "last_checkpoint", None)
+        self._local.last_checkpoint = now
+        if self._resume.is_set() and self.throttle == 0.0:
+            return
+
+        if not self._resume.is_set():
+            self._resume.wait(self.max_pause)  # bounded, so batch work is never starved forever
+        elif last is not None:
+            # Sleep long enough that batch work only runs (1 - throttle) of the time
+            throttle = self.throttle
+            sleep = min((now - last) * throttle / (1.0 - throttle), self.max_pause)
+            time.sleep(sleep)
+            with self._lock:
+                self._stats["throttled_sleep_seconds"] += sleep
+        self._local.last_checkpoint = time.monotonic()
+
+    def stats(self):
+        with self._lock:
+            return dict(
+                self._stats,
+                live_streams=self._live_streams,
+                live_latency_ms=round(1000 * self.live_latency, 1) if self.live_latency is not None else None,
+                latency_target_ms=round(1000 * self.latency_target, 1),
+                throttle=round(self.throttle, 2),
+                batch_paused=not self._resume.is_set(),
+                live_threads=self.live_threads,
+                live_cpus=self.live_cpus,
+                batch_cpus=self.batch_cpus,
+                interop_threads=self.interop_threads,
+                batch_workers=self.batch_workers,
+                batch_threads_per_job=self.batch_threads_per_job,
+            )
@@ -0,0 +1,115 @@
+import logging
+import os
+from concurrent.futures import TimeoutError
+
+# Models loaded by this worker process, by weights path
+_models = {}
+
+
+def segment_bounds(total_frames, segments, min_frames=1):
+    """
+    Split analysed-frame indices [0, total_frames) into up to `segments` contiguous
+    (start, end) ranges of at least min_frames. The last range is open (end None) so it
+    reads to the end of the file even when the container under-reports its length.
+    """
+    segments = max(1, min(segments, total_frames // max(1, min_frames)))
+    size = -(-total_frames // segments) if total_frames else 0
+    bounds = [(start, start + size) for start in range(0, total_frames, size)] if size else [(0, None)]
+    bounds[-1] = (bounds[-1][0], None)
+    return bounds
+
+
+def init_worker(torch_threads=1, niceness=10, cpus=None):
+    """Segment workers are batch work: fewer torch threads each, a lower OS priority, and the batch CPUs."""
+    try:
+        os.nice(niceness)
+    except (AttributeError, OSError):
+        pass
+    if cpus:
+        try:
+            os.sched_setaffinity(0, cpus)
+        except (AttributeError, OSError):
+            pass
+    import torch
+    torch.set_num_threads(torch_threads)
+
+
+def _model(path):
+    if path not in _models:
+        from ultralytics import YOLO
+        _models[path] = YOLO(path)
+    return _models[path]
+
+
+def analyse_segment(video_path, start, end, frame_stride, model_paths, model_name, conf,
+                    tile_size=0, cascade=False, cascade_band=(0.3, 0.8), cancel_event=None):
+    """
+    Run the model over analysed frames [start, end) of a video (end None: to the end of the
+    file) and return their raw boxes. Frames are picked exactly like the serial path: the
+    last of each group of frame_stride frames. Stops early once cancel_event is set.
+    """
+    import cv2
+    from Services.TiledInference import TiledDetector
+    from Services.CascadeDetector import CascadeDetector
+
+    model = _model(model_paths[model_name])
+    detector = None
+    if tile_size:
+        detector = TiledDetector(model, tile_size)
+    elif cascade:
+        detector = CascadeDetector(_model(model_paths["yolov8s"]), _model(model_paths["yolov8m"]), band=cascade_band)
+
+    frames, names, orig_shape = [], None, None
+    cap = cv2.VideoCapture(video_path)
+    try:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, start * frame_stride)
+        frame_idx = start
+        while end is None or frame_idx < end:
+            if cancel_event is not None and cancel_event.is_set():
+                break
+            if not all(cap.grab() for _ in range(frame_stride - 1)):
+                break
+            ret, frame = cap.read()
+            if not ret:
+                break
+            r = detector.predict(frame, conf) if detector is not None else model.predict(frame, conf=conf, verbose=False)[0]
+            names, orig_shape = r.names, r.orig_shape
+            if r.boxes is None:
+                frames.append(None)
+            else:
+                frames.append((r.boxes.xyxy.cpu().numpy(), r.boxes.conf.cpu().numpy(), r.boxes.cls.cpu().numpy()))
+            frame_idx += 1
+    finally:
+        cap.release()
+    return {"start": start, "end": end, "frames": frames, "names": names, "orig_shape": orig_shape}
+
+
+def stitch_segments(submit, bounds, is_cancelled=None, poll=0.5):
+    """
+    Submit every segment (submit(start, end) returns a future of analyse_segment's result)
+    and yield (xyxy, confs, classes, orig_shape, names, None) per analysed frame strictly in
+    frame order, whatever order the segments finish in, so the streak logic downstream
+    sees exactly the sequence a serial pass would. Stops at a segment that ended early (the
+    file is shorter than reported, as a serial pass would) and when is_cancelled() turns true.
+    """
+    futures = [submit(start, end) for start, end in bounds]
+    try:
+        for future in futures:
+            while True:
+                try:
+                    segment = future.result(timeout=poll)
+                    break
+                except TimeoutError:
+                    if is_cancelled is not None and is_cancelled():
+                        return
+            for boxes in segment["frames"]:
+                if boxes is None:
+                    yield None, None, None, segment["orig_shape"], segment["names"], None
+                else:
+                    yield boxes[0], boxes[1], boxes[2], segment["orig_shape"], segment["names"], None
+            if segment["end"] is not None and len(segment["frames"]) < segment["end"] - segment["start"]:
+                logging.warning("Segment %d-%d ended early; ignoring later segments", segment["start"], segment["end"])
+                return
+    finally:
+        for future in futures:
+            future.cancel()
@@ -0,0 +1,207 @@
+import logging
+import multiprocessing
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+
+# Header layout (int64): write sequence, slot count, frame height, width, channels, writer state
+_WRITE_SEQ, _SLOTS, _HEIGHT, _WIDTH, _CHANNELS, _STATE = range(6)
+_HEADER_FIELDS = 8
+_RUNNING, _ENDED = 0, 1
+
+
+class SharedFrameRing:
+    """
+    Single-writer, multi-reader ring of decoded frames in shared memory.
+
+    The capture process writes frames into fixed slots; readers in any process attach by
+    name and get numpy views straight into the shared buffer, so no frame is pickled or
+    copied. Every slot carries the sequence number of the frame it holds (negative while
+    it is being written). When readers fall behind, the oldest frames are simply
+    overwritten; a reader can check is_valid(seq) after using a view to detect that its
+    slot was reused in the meantime.
+    """
+
+    def __init__(self, name=None, slots=8, frame_shape=(720, 1280, 3), create=True):
+        if create:
+            height, width, channels = frame_shape
+            size = self._layout(slots, height * width * channels)
+            self._shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+            header = np.ndarray((_HEADER_FIELDS,), np.int64, buffer=self._shm.buf)
+            header[:] = 0
+            header[_SLOTS], header[_HEIGHT], header[_WIDTH], header[_CHANNELS] = slots, height, width, channels
+        else:
+            self._shm = shared_memory.SharedMemory(name=name, create=False)
+            header = np.ndarray((_HEADER_FIELDS,), np.int64, buffer=self._shm.buf)
+            slots = int(header[_SLOTS])
+            frame_shape = (int(header[_HEIGHT]), int(header[_WIDTH]), int(header[_CHANNELS]))
+
+        self.name = self._shm.name
+        self.slots = slots
+        self.frame_shape = tuple(frame_shape)
+        self._owner = create
+        self._header = header
+        offset = _HEADER_FIELDS * 8
+        self._slot_seq = np.ndarray((slots,), np.int64, buffer=self._shm.buf, offset=offset)
+        offset += slots * 8
+        self._timestamps = np.ndarray((slots,), np.float64, buffer=self._shm.buf, offset=offset)
+        offset += slots * 8
+        self._frames = np.ndarray((slots,) + self.frame_shape, np.uint8, buffer=self._shm.buf, offset=offset)
+        if create:
+            self._slot_seq[:] = 0
+
+    @classmethod
+    def attach(cls, name):
+        return cls(name=name, create=False)
+
+    @staticmethod
+    def _layout(slots, frame_bytes):
+        return _HEADER_FIELDS * 8 + slots * 16 + slots * frame_bytes
+
+    ##################### WRITER ##########################################
+
+    def write(self, frame, timestamp=None):
+        """Copy one decoded frame into the next slot and publish it; returns its sequence number."""
+        seq = int(self._header[_WRITE_SEQ]) + 1
+        slot = seq % self.slots
+        self._slot_seq[slot] = -seq  # readers skip a slot while it is being written
+        self._frames[slot][...] = frame
+        self._timestamps[slot] = timestamp if timestamp is not None else time.time()
+        self._slot_seq[slot] = seq
+        self._header[_WRITE_SEQ] = seq
+        return seq
+
+    def mark_ended(self):
+        self._header[_STATE] = _ENDED
+
+    ##################### READERS ##########################################
+
+    def latest_seq(self):
+        return int(self._header[_WRITE_SEQ])
+
+    def has_ended(self):
+        return int(self._header[_STATE]) == _ENDED
+
+    def read(self, after_seq=0, latest=False):
+        """
+        Return (seq, frame_view, timestamp) for the next frame after after_seq (or the newest
+        one when latest=True), or None if nothing newer has been written. Frames that were
+        already overwritten are skipped (drop-oldest).
+        """
+        while True:
+            newest = self.latest_seq()
+            if newest <= after_seq:
+                return None
+            seq = newest if latest else max(after_seq + 1, newest - self.slots + 1)
+            slot = seq % self.slots
+            if self._slot_seq[slot] == seq:
+                return seq, self._frames[slot], float(self._timestamps[slot])
+            after_seq = seq  # overwritten while we looked; move on to a newer frame
+
+    def is_valid(self, seq):
+        """True while the slot of frame seq still holds that frame."""
+        return self._slot_seq[seq % self.slots] == seq
+
+    def read_copy(self, after_seq=0, latest=False):
+        """
+        Like read(), but the frame is copied out of its slot and the copy is only returned
+        if the slot was not reused while it was being copied, so it is one whole frame that
+        stays valid however long the caller keeps it.
+        """
+        while True:
+            entry = self.read(after_seq, latest)
+            if entry is None:
+                return None
+            seq, view, timestamp = entry
+            frame = view.copy()
+            if self.is_valid(seq):
+                return seq, frame, timestamp
+            after_seq = seq  # overwritten mid-copy; take a newer frame
+
+    def close(self):
+        # Drop our views before closing the mapping
+        self._header = self._slot_seq = self._timestamps = self._frames = None
+        try:
+            self._shm.close()
+        except BufferError:
+            # A caller still holds a frame view; the mapping goes away with the last reference
+            logging.debug("Shared frame ring %s closed with frame views still alive", self.name)
+        if self._owner:
+            self._shm.unlink()
+
+
+def capture_worker(source, ring_name, stop_event):
+    """Capture-process entry point: decode frames from source into the shared ring."""
+    import cv2
+
+    ring = SharedFrameRing.attach(ring_name)
+    cap = cv2.VideoCapture(source)
+    height, width, _ = ring.frame_shape
+    try:
+        while cap.isOpened() and not stop_event.is_set():
+            ret, frame = cap.read()
+            if not ret:
+                break
+            if frame.shape[:2] != (height, width):
+                frame = cv2.resize(frame, (width, height))
+            ring.write(frame)
+    finally:
+        ring.mark_ended()
+        cap.release()
+        ring.close()
+
+
+class SharedMemoryCapture:
+    """
+    Drop-in replacement for cv2.VideoCapture that decodes in a separate process and hands
+    frames over through a SharedFrameRing. read() always returns the newest frame, so a
+    slow consumer drops stale frames instead of building up latency. The frame is a copy:
+    inference and the alert image outlive a slot (8 slots last ~270ms at 30fps), and one
+    memcpy per analysed frame is small next to a forward pass.
+    """
+
+    def __init__(self, source, frame_shape=(720, 1280, 3), slots=8, read_timeout=5.0):
+        self.ring = SharedFrameRing(slots=slots, frame_shape=frame_shape)
+        self.read_timeout = read_timeout
+        self.last_seq = 0
+        self.last_timestamp = None  # capture time of the frame returned by the last read()
+        self.dropped = 0
+        context = multiprocessing.get_context("spawn")  # never fork a process that holds torch state
+        self._stop_event = context.Event()
+        self._process = context.Process(target=capture_worker, args=(source, self.ring.name, self._stop_event),
+                                        name="FrameCapture", daemon=True)
+        self._process.start()
+        logging.info("Capture process %d started for source %s", self._process.pid, source)
+
+    def isOpened(self):
+        return self.ring is not None and not (self.ring.has_ended() and self.ring.latest_seq() <= self.last_seq)
+
+    def read(self):
+        """Return (True, frame) with the newest frame, or (False, None) at end of stream."""
+        deadline = time.monotonic() + self.read_timeout
+        while True:
+            entry = self.ring.read_copy(self.last_seq, latest=True)
+            if entry is not None:
+                seq, frame, self.last_timestamp = entry
+                self.dropped += seq - self.last_seq - 1
+                self.last_seq = seq
+                return True, frame
+            if self.ring.has_ended() or time.monotonic() > deadline:
+                return False, None
+            time.sleep(0.001)
+
+    def grab(self):
+        ret, _ = self.read()
+        return ret
+
+    def release(self):
+        if self.ring is None:
+            return
+        self._stop_event.set()
+        self._process.join(timeout=5)
+        if self._process.is_alive():
+            self._process.terminate()
+        self.ring.close()
+        self.ring = None
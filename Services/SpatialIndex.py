@@ -0,0 +1,67 @@
+import math
+
+EARTH_RADIUS_M = 6371000.0
+METERS_PER_DEGREE = math.pi * EARTH_RADIUS_M / 180.0
+
+
+def distance_m(lat1, lon1, lat2, lon2):
+    """Great-circle distance in metres."""
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_M * math.asin(math.sqrt(min(1.0, a)))
+
+
+class GridIndex:
+    """
+    Uniform lat/lon grid over point keys. A radius query only visits the cells overlapping
+    the circle's bounding box, so its cost depends on how many points are nearby rather
+    than on how many are indexed. Not thread-safe; callers hold their own lock.
+    """
+
+    def __init__(self, cell_size_m=1000.0):
+        self.cell_deg = cell_size_m / METERS_PER_DEGREE
+        self._cells = {}  # (row, col) -> {key: (lat, lon)}
+        self._points = {}  # key -> (row, col)
+
+    def _cell(self, lat, lon):
+        return int(math.floor(lat / self.cell_deg)), int(math.floor(lon / self.cell_deg))
+
+    def insert(self, key, lat, lon):
+        self.remove(key)
+        cell = self._cell(lat, lon)
+        self._cells.setdefault(cell, {})[key] = (lat, lon)
+        self._points[key] = cell
+
+    def remove(self, key):
+        cell = self._points.pop(key, None)
+        if cell is not None:
+            bucket = self._cells[cell]
+            del bucket[key]
+            if not bucket:
+                del self._cells[cell]
+
+    def near(self, lat, lon, radius_m, limit=None):
+        """Keys within radius_m of (lat, lon) as (key, distance_m), nearest first."""
+        lat_span = radius_m / METERS_PER_DEGREE
+        # Longitude degrees shrink towards the poles; clamp so the box stays finite
+        lon_span = lat_span / max(math.cos(math.radians(lat)), 1e-6)
+        row_min, col_min = self._cell(lat - lat_span, lon - lon_span)
+        row_max, col_max = self._cell(lat + lat_span, lon + lon_span)
+
+        found = []
+        if (row_max - row_min + 1) * (col_max - col_min + 1) > len(self._cells):
+            # Huge radius: walking the occupied cells is cheaper than the empty ones
+            buckets = self._cells.values()
+        else:
+            buckets = (self._cells.get((row, col)) for row in range(row_min, row_max + 1)
+                       for col in range(col_min, col_max + 1))
+        for bucket in buckets:
+            for key, (point_lat, point_lon) in (bucket or {}).items():
+                distance = distance_m(lat, lon, point_lat, point_lon)
+                if distance <= radius_m:
+                    found.append((key, distance))
+        found.sort(key=lambda item: item[1])
+        return found[:limit] if limit is not None else found
+
+    def __len__(self):
+        return len(self._points)
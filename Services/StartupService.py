@@ -0,0 +1,55 @@
+import logging
+import threading
+import time
+
+
+class StartupService:
+    """
+    Runs the heavy service initialization on a background thread and tracks which
+    readiness checks (backend connected, models loaded, listeners attached) have passed.
+    """
+
+    def __init__(self, checks=('backend', 'models', 'listeners')):
+        self.checks = {name: None for name in checks}
+        self.error = None
+        self.started_at = None
+        self._thread = None
+
+    def mark_ready(self, name):
+        self.checks[name] = round(time.time() - self.started_at, 3)
+        logging.info("Startup check '%s' ready after %.2fs", name, self.checks[name])
+
+    def is_ready(self):
+        return self.error is None and all(elapsed is not None for elapsed in self.checks.values())
+
+    def is_alive(self):
+        """Liveness fails only when initialization crashed, so the orchestrator restarts us."""
+        return self.error is None
+
+    def start(self, init_fn):
+        self.started_at = time.time()
+
+        def run():
+            try:
+                init_fn(self)
+            except Exception as e:
+                self.error = str(e)
+                logging.error("Service initialization failed: %s", str(e))
+
+        self._thread = threading.Thread(target=run, name="ServiceStartup", daemon=True)
+        self._thread.start()
+        return self._thread
+
+    def wait(self, timeout=None):
+        """Block until initialization finished (successfully or not)."""
+        if self._thread is not None:
+            self._thread.join(timeout)
+        return self.is_ready()
+
+    def status(self):
+        return {
+            "ready": self.is_ready(),
+            "checks": {name: elapsed is not None for name, elapsed in self.checks.items()},
+            "ready_after_seconds": dict(self.checks),
+            "error": self.error,
+        }
@@ -0,0 +1,89 @@
+import numpy as np
+
+
+def make_tiles(height, width, tile_size=640, overlap=0.2):
+    """Overlapping (x0, y0, x1, y1) windows covering the frame; the last row/column is flush with the edge."""
+    step = max(1, int(tile_size * (1.0 - overlap)))
+
+    def starts(length):
+        if length <= tile_size:
+            return [0]
+        positions = list(range(0, length - tile_size, step))
+        return positions + [length - tile_size]
+
+    return [(x0, y0, min(x0 + tile_size, width), min(y0 + tile_size, height))
+            for y0 in starts(height) for x0 in starts(width)]
+
+
+def merge_detections(detections, threshold=0.6, metric="ios"):
+    """
+    Class-aware greedy NMS over rows of (x1, y1, x2, y2, conf, cls). With metric="ios" the
+    overlap is intersection over the smaller box, so the partial box of an object cut by a
+    tile edge is absorbed by the full box found in the neighbouring tile or the full frame.
+    """
+    if len(detections) == 0:
+        return np.zeros((0, 6), dtype=np.float32)
+    detections = detections[np.argsort(-detections[:, 4], kind="stable")]
+    x1, y1, x2, y2 = detections[:, 0], detections[:, 1], detections[:, 2], detections[:, 3]
+    areas = np.maximum(x2 - x1, 0) * np.maximum(y2 - y1, 0)
+    suppressed = np.zeros(len(detections), dtype=bool)
+    keep = []
+    for i in range(len(detections)):
+        if suppressed[i]:
+            continue
+        keep.append(i)
+        rest = np.arange(i + 1, len(detections))
+        rest = rest[~suppressed[rest] & (detections[rest, 5] == detections[i, 5])]
+        if len(rest) == 0:
+            continue
+        inter = (np.maximum(np.minimum(x2[i], x2[rest]) - np.maximum(x1[i], x1[rest]), 0) *
+                 np.maximum(np.minimum(y2[i], y2[rest]) - np.maximum(y1[i], y1[rest]), 0))
+        if metric == "ios":
+            denominator = np.minimum(areas[i], areas[rest])
+        else:
+            denominator = areas[i] + areas[rest] - inter
+        overlap = inter / np.maximum(denominator, 1e-9)
+        suppressed[rest[overlap > threshold]] = True
+    return detections[keep]
+
+
+def build_results(frame, path, names, detections):
+    """Wrap merged detections in an ultralytics Results so the usual box/plot code works on them."""
+    import torch
+    from ultralytics.engine.results import Results
+    return Results(orig_img=frame, path=path, names=names,
+                   boxes=torch.from_numpy(np.ascontiguousarray(detections, dtype=np.float32)))
+
+
+class TiledDetector:
+    """
+    Sliced inference for high-resolution frames: the frame is cut into overlapping tiles
+    that go through the model as one batch at native resolution, together with the whole
+    frame (for objects larger than a tile), and the boxes are merged across tiles.
+    """
+
+    def __init__(self, model, tile_size=640, overlap=0.2, merge_threshold=0.6, include_full_frame=True):
+        self.model = model
+        self.tile_size = tile_size
+        self.overlap = overlap
+        self.merge_threshold = merge_threshold
+        self.include_full_frame = include_full_frame
+
+    def predict(self, frame, conf, path=""):
+        height, width = frame.shape[:2]
+        windows = make_tiles(height, width, self.tile_size, self.overlap)
+        if self.include_full_frame and len(windows) > 1:
+            windows.append((0, 0, width, height))
+        crops = [frame[y0:y1, x0:x1] for x0, y0, x1, y1 in windows]
+        results = self.model.predict(crops, conf=conf, imgsz=self.tile_size, verbose=False)
+
+        parts = []
+        for (x0, y0, _, _), r in zip(windows, results):
+            if r.boxes is None or len(r.boxes) == 0:
+                continue
+            data = r.boxes.data.cpu().numpy().copy()
+            data[:, [0, 2]] += x0
+            data[:, [1, 3]] += y0
+            parts.append(data)
+        detections = np.concatenate(parts) if parts else np.zeros((0, 6), dtype=np.float32)
+        return build_results(frame, path, self.model.names, merge_detections(detections, self.merge_threshold))
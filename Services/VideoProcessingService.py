@@ -1,183 +1,453 @@
 import logging
+import os
 import threading
 import time
-import cv2
-from ultralytics import YOLO
 import datetime
 from Services.AlertManagementService import AlertManagementService
+from Services.AlertDeduplicationService import AlertDeduplicator, crop_detection, dhash
+from Services.AlertImageService import encode_alert_images
+from Services.AlertBusService import AlertBus
+from Services.TiledInference import TiledDetector
+from Services.LatencyController import LatencyController
+from Services.CascadeDetector import CascadeDetector
+from Services.InferenceService import InferenceService, ServedModel
+from Services.DetectionStoreService import DetectionStore, ScoredFrame, StreakTracker
+from Services.DetectionRecord import DetectionRecord, is_local_file
+from Services.CheckpointService import CheckpointService
+from Services.RuntimeConfigService import ModelRegistry, RuntimeConfigService
+from Services.LoggingService import SampledLog, TraceRingBuffer
+from Services.ProfilingService import Profiler
+from Services.SchedulerService import ResourceScheduler
+
+
+def load_yolo(model_path):
+    # ultralytics pulls in torch; import it only when a model is actually loaded
+    from ultralytics import YOLO
+    return YOLO(model_path)
 
 
 class VideoProcessingService:
-    def __init__(self, firebase_service):
+    def __init__(self, firebase_service, scheduler=None):
         self.firebase_service = firebase_service
+        # Reserves CPU for live streams and throttles batch analysis when live latency suffers
+        self.scheduler = scheduler or ResourceScheduler.from_env()
+        self.scheduler.configure_process()
         logging.basicConfig(level=logging.INFO)
         
         self.model_path = {"yolov8s":'WeaponsDetection/guardianViewV5.pt',"yolov8m":'WeaponsDetection/guardianViewV2.pt'}
-        self.model = YOLO(self.model_path.get("yolov8s"))
-        self.modelLive = YOLO(self.model_path.get("yolov8m"))
-        self.confidenceThreshold = 0.6
+        # Optional shared server that batches the frames of all producers (INFERENCE_SERVER=1); its
+        # replicas hold the weights, so the registry then hands out handles instead of loading copies
+        self.inference = InferenceService.from_env(self.model_path, load_yolo)
+        self.model_registry = ModelRegistry(self.model_path, self.served_model if self.inference is not None else load_yolo)
+        self._display_models = {}
+        self.model = self.model_registry.get("yolov8s")
+        self.modelLive = self.model_registry.get("yolov8m")
+        # Thresholds, model choice and frame stride per source; swapped atomically on settings changes
+        self.runtime_config = RuntimeConfigService(self.model_registry)
         self.model_names = ['gun', 'knife', 'person']
         self.stop_event = None
         self.alert_management_service = AlertManagementService()
+        # Near-duplicate detections (overlapping cameras, re-uploads) are folded into recent alerts
+        self.alert_deduplicator = AlertDeduplicator(
+            time_window=float(os.getenv("ALERT_DEDUP_WINDOW", 120)),
+            max_distance_m=float(os.getenv("ALERT_DEDUP_DISTANCE_M", 150)),
+            max_hamming=int(os.getenv("ALERT_DEDUP_MAX_HAMMING", 10)),
+        )
+        # Small model screens, medium model confirms uncertain frames (cascade setting)
+        self.cascade = CascadeDetector(self.inference_model("yolov8s"), self.inference_model("yolov8m"),
+                                       band=(float(os.getenv("CASCADE_BAND_LOW", 0.3)), float(os.getenv("CASCADE_BAND_HIGH", 0.8))))
+        # Raw per-frame detections of uploaded videos, kept for offline re-scoring
+        store_dir = os.getenv("DETECTION_STORE_DIR", "DetectionStore")
+        mirror = os.getenv("DETECTION_STORE_MIRROR", "0") == "1"
+        self.detection_store = DetectionStore(store_dir, firebase_service.backend if mirror else None,
+                                              min_conf=float(os.getenv("DETECTION_STORE_MIN_CONF", 0.25))) if store_dir else None
+        # Per live stream: degrades frame rate, input size and model to stay within the latency SLO
+        self.latency_controllers = {}
+        # Per-frame detail goes to the trace buffer; the log only gets a sampled summary
+        self.trace_buffer = TraceRingBuffer()
+        self.frame_log = SampledLog()
+        # On-demand sampling profiles (POST /debug/profile); idle unless one is running
+        self.profiler = Profiler(os.getenv("PROFILE_DIR", "Profiles"))
+        # Long uploads are split into segments analysed by worker processes (0 = always serial)
+        self.segment_workers = int(os.getenv("SEGMENT_WORKERS", 0))
+        self.segment_min_seconds = float(os.getenv("SEGMENT_MIN_SECONDS", 300))
+        self._segment_pool = None
+        self._segment_manager = None
+        self._segment_pool_lock = threading.Lock()
+        # Progress of uploaded videos, so a restarted worker resumes instead of starting over (0 = off)
+        checkpoint_interval = float(os.getenv("CHECKPOINT_INTERVAL_SECONDS", 30))
+        self.checkpoints = CheckpointService(firebase_service.backend, checkpoint_interval) if checkpoint_interval > 0 else None
+        # New alerts are pushed to connected consoles (GET /alerts/stream) before they are written
+        self.alert_bus = AlertBus(max_subscribers=int(os.getenv("ALERT_STREAM_MAX_CLIENTS", 100)),
+                                  buffer_size=int(os.getenv("ALERT_STREAM_BUFFER", 100)))
+
+    @property
+    def confidenceThreshold(self):
+        return self.runtime_config.current().defaults['video'].confidence_threshold
+
+    @confidenceThreshold.setter
+    def confidenceThreshold(self, threshold):
+        self.runtime_config.set_default_threshold(threshold)
 
  
     # This function processes user-uploaded videos by analyzing each frame using the YOLO model.
     # It identifies threats such as guns and knives, logging the highest confidence detections.
     # The function generates alerts if threats are detected consistently for a specified number of frames (required_consistent_frames).
     # This version selects the frame with the highest confidence in the longest streak of consistent detections for alert generation.
-    def video_analysis_longest_streak(self, video_path, showAnalysis=False, videoURL=None, location='Tel Aviv', longitud=32.114414, latitude=34.817955):
-        logging.info("Starting video analysis for %s", video_path)
-
-        try:
-            confidenceThreshold = self.confidenceThreshold
-            results = self.model.predict(video_path, conf=confidenceThreshold, stream=True, show=showAnalysis)
-            max_conf = 0
-            best_frame = None
-            frame_idx = 0
-            total_frames = 0
-            consistent_detections = 0
-            streak_best_frame = None
-            streak_max_conf = 0
-            max_consistent_detections = 0
-            longest_streak_best_frame = None
-            required_consistent_frames = 3  # Number of consistent detections required to trigger an alert
-
-            logging.info("Processing video %s", video_path)
-
-            for r in results:
-                total_frames += 1
-                logging.info("Processing frame %d", frame_idx)
-
-                if not hasattr(r, 'boxes') or r.boxes is None:
-                    logging.info("No boxes found in frame %d", frame_idx)
-                    frame_idx += 1
-                    continue
-
-                xyxy = r.boxes.xyxy.numpy()  # Bounding box coordinates as numpy array
-                confs = r.boxes.conf.numpy()  # Confidence scores as numpy array
-                classes = r.boxes.cls.numpy()  # Class indices as numpy array
-                frame_threats = False
-
-                for bbox, conf, cls_idx in zip(xyxy, confs, classes):
-                    if conf >= confidenceThreshold and cls_idx in [0, 1]:
-                        class_name = self.model.names[int(cls_idx)]
-                        if self.is_valid_bbox(bbox, r.orig_shape):
-                            logging.info("Detected %s with confidence %f", class_name, conf)
-                            frame_threats = True
-
-                            if conf > streak_max_conf:
-                                streak_max_conf = conf
-                                streak_best_frame = {'result': r, 'frame_idx': frame_idx, 'conf': conf, 'class_name': class_name, 'boxes': xyxy}
-
-                if frame_threats:
-                    consistent_detections += 1
-                    if consistent_detections >= required_consistent_frames:
-                        if consistent_detections > max_consistent_detections:
-                            max_consistent_detections = consistent_detections
-                            longest_streak_best_frame = streak_best_frame
-                else:
-                    consistent_detections = 0
-                    streak_max_conf = 0
-                    streak_best_frame = None
-
-                frame_idx += 1
-
-            if total_frames == 0:
-                logging.warning("No frames were processed. Please check the video input or format.")
-            elif longest_streak_best_frame:
-                if videoURL is not None:
-                    self.save_frame_and_generate_alert(longest_streak_best_frame, 'video', videoURL)
-                else:
-                    self.save_frame_and_generate_alert(longest_streak_best_frame, 'video', video_path)
-            else:
-                logging.info("No valid frames detected with the required confidence threshold.")
-
-        except Exception as e:
-            logging.error("Error occurred during video analysis: %s", str(e))
-            self.firebase_service.log_error("Error occurred during video analysis: %s", str(e))
-            return
+    def video_analysis_longest_streak(self, video_path, showAnalysis=False, videoURL=None, location='Tel Aviv', longitud=32.114414, latitude=34.817955, job=None, source_id=None, video_key=None):
+        return self.analyse_video(video_path, showAnalysis, videoURL, job, source_id, video_key,
+                                  required_consistent_frames=3, policy="longest_streak")
 
 
     # This function processes user-uploaded videos by analyzing each frame using the YOLO model.
     # It identifies threats such as guns and knives, logging the highest confidence detections.
     # The function generates alerts if threats are detected consistently for a specified number of frames (required_consistent_frames).
     # This version selects the frame with the highest confidence across the entire video for alert generation.
-    def video_analysis(self, video_path, showAnalysis= False, videoURL=None,location='Tel Aviv',longitud=32.114414,latitude=34.817955):
+    def video_analysis(self, video_path, showAnalysis= False, videoURL=None,location='Tel Aviv',longitud=32.114414,latitude=34.817955, job=None, source_id=None, video_key=None):
+        return self.analyse_video(video_path, showAnalysis, videoURL, job, source_id, video_key,
+                                  required_consistent_frames=2, policy="best")
+
+    def analyse_video(self, video_path, showAnalysis=False, videoURL=None, job=None, source_id=None, video_key=None,
+                      required_consistent_frames=2, policy="best"):
         logging.info("Starting video analysis for %s", video_path)
 
         try:
-            confidenceThreshold = self.confidenceThreshold
-            results = self.model.predict(video_path,conf= confidenceThreshold, stream=True, show=showAnalysis)
-            max_conf = 0
-            best_frame = None
+            # One config snapshot for the whole video so every frame is judged the same way
+            config = self.runtime_config.current().for_source(source_id, 'video')
+            confidenceThreshold = config.confidence_threshold
+            recorder = self.detection_recorder(video_key or videoURL or video_path, video_path, config)
+            # Keeps only a compact record of the best frame of the current streak and of the alert candidate
+            tracker = StreakTracker(required_consistent_frames, policy)
             frame_idx = 0
-            total_frames = 0
-            consistent_detections = 0
-            streak_best_frame = None
-            streak_max_conf = 0
-            max_consistent_detections = 0
-            required_consistent_frames = 2  # Number of consistent detections required to trigger an alert
 
-            logging.info("Processing video %s", video_path)
+            # Pick up where an earlier run on this video stopped (crash, restart, lost lease)
+            checkpointing = self.checkpoints is not None and video_key is not None
+            fingerprint = self.checkpoint_fingerprint(config, required_consistent_frames, policy)
+            checkpoint = self.checkpoints.load(video_key, fingerprint) if checkpointing else None
+            if checkpoint is not None:
+                frame_idx = checkpoint['frameIdx']
+                tracker = StreakTracker.from_dict(checkpoint['tracker'], lambda data: DetectionRecord.from_dict(data, video_path))
+                recorder = self.resume_recorder(recorder, checkpoint, frame_idx)
+            total_frames = frame_idx
+
+            if self.use_segments(video_path, showAnalysis):
+                frames = self.segment_frames(video_path, config, job, start_frame=frame_idx)
+            else:
+                frames = self.frame_boxes(self.predict_video(video_path, self.inference_model(config.model_name), config,
+                                                             showAnalysis, start_frame=frame_idx))
 
-            for r in results:
+            logging.info("Processing video %s", video_path)
+            if job is not None:
+                job.report_progress(frame_idx, self.count_frames(video_path, config.frame_stride))
+                self.scheduler.configure_batch_thread()
+
+            for xyxy, confs, classes, orig_shape, names, image in frames:
+                self.scheduler.batch_checkpoint()
+                if job is not None:
+                    if job.is_cancelled():
+                        break
+                    job.report_progress(frame_idx + 1)
+                if checkpointing and self.checkpoints.due(video_key):
+                    self.save_checkpoint(video_key, fingerprint, frame_idx, tracker, recorder)
                 total_frames += 1
-                logging.info("Processing frame %d", frame_idx)
-
-                if not hasattr(r, 'boxes') or r.boxes is None:
-                    logging.info("No boxes found in frame %d", frame_idx)
+                self.profiler.frame_done()
+                self.frame_log.info(video_path, "Processing frame %d of %s", frame_idx, video_path)
+
+                if xyxy is None:
+                    self.trace_buffer.record('no_boxes', source=video_path, frame=frame_idx)
+                    if recorder is not None:
+                        recorder.add(frame_idx)
+                    tracker.update(None)
                     frame_idx += 1
                     continue
 
-                xyxy = r.boxes.xyxy.numpy()  # Bounding box coordinates as numpy array
-                confs = r.boxes.conf.numpy()  # Confidence scores as numpy array
-                classes = r.boxes.cls.numpy()  # Class indices as numpy array
-                frame_threats = False
-
-                for bbox, conf, cls_idx in zip(xyxy, confs, classes):
-                    if conf >= confidenceThreshold and cls_idx in [0, 1]:
-                        class_name = self.model.names[int(cls_idx)]
-                        if self.is_valid_bbox(bbox, r.orig_shape):
-                            logging.info("Detected %s with confidence %f", class_name, conf)
-                            frame_threats = True
-
-                            if conf > streak_max_conf:
-                                streak_max_conf = conf
-                                streak_best_frame = {'result': r, 'frame_idx': frame_idx, 'conf': conf, 'class_name': class_name, 'boxes': xyxy}
-
-                if frame_threats:
-                    consistent_detections += 1
-                    if consistent_detections > max_consistent_detections:
-                        max_consistent_detections = consistent_detections
+                if recorder is not None:
+                    recorder.add(frame_idx, xyxy, confs, classes, orig_shape, names)
+
+                frame_best = self.best_threat(names, orig_shape, xyxy, confs, classes, confidenceThreshold, video_path, frame_idx)
+                if frame_best is None:
+                    tracker.update(None)
+                elif tracker.would_improve(frame_best[0]):
+                    conf, class_name, bbox = frame_best
+                    frame_number = self.source_frame_number(frame_idx, config.frame_stride)
+                    if image is not None:
+                        # Only a new streak best pays for encoding its evidence crop
+                        tracker.update(DetectionRecord.capture(frame_idx, conf, class_name, bbox, image, video_path, frame_number))
+                    else:
+                        # Segment workers only send boxes; the crop is read back from the file if this frame alerts
+                        tracker.update(DetectionRecord(frame_idx, conf, class_name, tuple(float(v) for v in bbox[:4]), None,
+                                                       video_path=video_path, frame_number=frame_number))
                 else:
-                    consistent_detections = 0
-                    streak_max_conf = 0
-                    streak_best_frame = None
-
-                if consistent_detections >= required_consistent_frames:
-                    if streak_best_frame:
-                        if streak_best_frame['conf'] > max_conf:
-                            max_conf = streak_best_frame['conf']
-                            best_frame = streak_best_frame
+                    tracker.update(ScoredFrame(frame_idx, frame_best[0], None, frame_best[2]))
 
+                self.trace_buffer.record('frame', source=video_path, frame=frame_idx, threats=frame_best is not None, streak=tracker.streak_length)
                 frame_idx += 1
-                
 
+            if job is not None and job.is_cancelled():
+                logging.info("Video analysis of %s cancelled at frame %d", video_path, frame_idx)
+                if checkpointing:
+                    self.save_checkpoint(video_key, fingerprint, frame_idx, tracker, recorder)
+                return {"cancelled": True, "frames": total_frames}
+            if recorder is not None and total_frames:
+                self.detection_store.save(recorder)
             if total_frames == 0:
                 logging.warning("No frames were processed. Please check the video input or format.")
-            elif best_frame:
+            elif tracker.best:
                 if videoURL is not None:
-                    self.save_frame_and_generate_alert(best_frame, 'video', videoURL)
+                    self.save_frame_and_generate_alert(tracker.best, 'video', videoURL, camera_id=source_id)
                 else:
-                    self.save_frame_and_generate_alert(best_frame, 'video', video_path)
+                    self.save_frame_and_generate_alert(tracker.best, 'video', video_path, camera_id=source_id)
             else:
                 logging.info("No valid frames detected with the required confidence threshold.")
-            
+            if checkpointing:
+                self.checkpoints.clear(video_key)
+            return self.analysis_summary(total_frames, tracker.best, recorder)
 
         except Exception as e:
             logging.error("Error occurred during video analysis: %s", str(e))
+            self.trace_buffer.dump_to_log("video analysis error")
             self.firebase_service.log_error("Error occurred during video analysis: %s", str(e))
-            return
+            raise  # the job that ran this analysis is reported as failed
+
+    ##################### CHECKPOINTS ##########################################
+
+    def checkpoint_fingerprint(self, config, required_consistent_frames, policy):
+        """A checkpoint is only resumed by a run that would have produced the same frames and streaks."""
+        return "%s|%s|%s|%s|%s|%s" % (self.model_version(config), config.confidence_threshold, self.inference_conf(config),
+                                      config.frame_stride, required_consistent_frames, policy)
+
+    def save_checkpoint(self, video_key, fingerprint, frame_idx, tracker, recorder):
+        """Persist the state after frame_idx analysed frames: streaks, alert candidate and recorded detections."""
+        if recorder is not None and len(recorder):
+            self.detection_store.save(recorder, partial=True)
+        self.checkpoints.save(video_key, {
+            'videoKey': video_key,
+            'fingerprint': fingerprint,
+            'frameIdx': frame_idx,
+            'tracker': tracker.to_dict(lambda record: record.to_dict()),
+            'recorded': recorder is not None,
+        })
+
+    def resume_recorder(self, recorder, checkpoint, frame_idx):
+        """The recorder continued from the checkpoint's partial detections, or None if they are gone."""
+        if recorder is None:
+            return None
+        partial = self.detection_store.load_partial(recorder.video_key, recorder.model_version) if checkpoint.get('recorded') else None
+        if frame_idx and (partial is None or len(partial) < frame_idx):
+            # Storing only the rest of the video would look like a complete run
+            logging.warning("No partial detections to resume for %s; not recording this run", recorder.video_key)
+            return None
+        if partial is not None:
+            recorder.resume(partial, frame_idx)
+        return recorder
+
+    def frame_boxes(self, results):
+        """(xyxy, confs, classes, orig_shape, names, image) per Results; xyxy is None for a frame without boxes."""
+        for r in results:
+            if not hasattr(r, 'boxes') or r.boxes is None:
+                yield None, None, None, r.orig_shape, r.names, r.orig_img
+            else:
+                # Bounding box coordinates, confidence scores and class indices as numpy arrays
+                yield r.boxes.xyxy.numpy(), r.boxes.conf.numpy(), r.boxes.cls.numpy(), r.orig_shape, r.names, r.orig_img
+
+    def best_threat(self, names, orig_shape, xyxy, confs, classes, confidenceThreshold, source, frame_idx):
+        """(conf, class_name, bbox) of the most confident valid threat on the frame, or None."""
+        best = None
+        for bbox, conf, cls_idx in zip(xyxy, confs, classes):
+            if conf >= confidenceThreshold and cls_idx in [0, 1]:  # Assuming 0 and 1 are the class indices for threats
+                class_name = names[int(cls_idx)]
+                if self.is_valid_bbox(bbox, orig_shape):
+                    self.trace_buffer.record('detection', source=source, frame=frame_idx, class_name=class_name, conf=float(conf))
+                    self.frame_log.info('detection', "Detected %s with confidence %f", class_name, conf)
+                    if best is None or conf > best[0]:
+                        best = (float(conf), class_name, bbox)
+        return best
+
+    @staticmethod
+    def source_frame_number(frame_idx, frame_stride):
+        # With a stride, the analysed frames are the last of each group of frame_stride frames
+        return frame_idx * frame_stride + frame_stride - 1
+
+
+    ##################### SEGMENTED ANALYSIS ##########################################
+
+    def use_segments(self, video_path, show=False):
+        # Segment workers reopen the video and alerts are read back from it, so only local files qualify
+        if not self.segment_workers or show or not is_local_file(video_path):
+            return False
+        import cv2
+        cap = cv2.VideoCapture(video_path)
+        try:
+            frame_count, fps = cap.get(cv2.CAP_PROP_FRAME_COUNT), cap.get(cv2.CAP_PROP_FPS)
+        finally:
+            cap.release()
+        return frame_count > 0 and fps > 0 and frame_count / fps >= self.segment_min_seconds
+
+    def segment_pool(self):
+        with self._segment_pool_lock:
+            if self._segment_pool is None:
+                import multiprocessing
+                from concurrent.futures import ProcessPoolExecutor
+                from Services.SegmentedAnalysis import init_worker
+                # spawn: the workers load their own models instead of inheriting torch state
+                self._segment_pool = ProcessPoolExecutor(max_workers=self.segment_workers,
+                                                         mp_context=multiprocessing.get_context("spawn"),
+                                                         initializer=init_worker,
+                                                         initargs=(self.scheduler.batch_threads_per_job, 10,
+                                                                   self.scheduler.batch_cpus))
+                # Per-job cancel flags the worker processes can see
+                self._segment_manager = multiprocessing.get_context("spawn").Manager()
+            return self._segment_pool
+
+    def segment_frames(self, video_path, config, job=None, start_frame=0):
+        """
+        Same per-frame tuples as frame_boxes, for a video analysed in parallel segments. Segments
+        are yielded strictly in frame order, so the streak logic downstream sees exactly the
+        sequence a serial pass would and stitches streaks across segment boundaries by itself.
+        """
+        from Services.SegmentedAnalysis import analyse_segment, segment_bounds, stitch_segments
+        import cv2
+        cap = cv2.VideoCapture(video_path)
+        try:
+            total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT)) // config.frame_stride
+        finally:
+            cap.release()
+        bounds = [(start + start_frame, None if end is None else end + start_frame)
+                  for start, end in segment_bounds(max(0, total - start_frame), 2 * self.segment_workers,
+                                                   min_frames=int(os.getenv("SEGMENT_MIN_FRAMES", 500)))]
+        logging.info("Analysing %s in %d segments on %d worker processes", video_path, len(bounds), self.segment_workers)
+        pool = self.segment_pool()
+        cancel_event = self._segment_manager.Event()
+
+        def submit(start, end):
+            return pool.submit(analyse_segment, video_path, start, end, config.frame_stride, self.model_path,
+                               config.model_name, self.inference_conf(config), config.tile_size, config.cascade,
+                               (self.cascade.low, self.cascade.high), cancel_event)
+        try:
+            yield from stitch_segments(submit, bounds, job.is_cancelled if job is not None else None)
+        finally:
+            # Segments already running stop decoding too (cancelled job, early end, or done)
+            cancel_event.set()
+
+    def inference_model(self, model_name):
+        """The model to run inference on: a handle to the shared server when it is enabled."""
+        return self.model_registry.get(model_name)
+
+    def served_model(self, path):
+        """Registry loader with the shared server: wait for a replica to load the weights, return a handle."""
+        model_name = next(name for name, model_path in self.model_path.items() if model_path == path)
+        self.inference.warm(model_name)
+        return ServedModel(self.inference, model_name)
+
+    def frame_detector(self, model, config):
+        """Per-frame detector for the source config: tiled, cascade, or None for plain model.predict."""
+        if config.tile_size:
+            return TiledDetector(model, config.tile_size)
+        if config.cascade:
+            return self.cascade
+        return None
+
+    def predict_video(self, video_path, model, config, show=False, start_frame=0):
+        """Per-frame Results for a video file from analysed frame start_frame on, through the tiled or cascade detector when configured."""
+        detector = self.frame_detector(model, config)
+        if detector is None and isinstance(model, ServedModel):
+            # Several frames in flight, so a single upload already fills the server's batches
+            return model.stream(self._read_frames(video_path, config.frame_stride, start_frame), self.inference_conf(config))
+        if detector is None and not start_frame:
+            return model.predict(video_path, conf=self.inference_conf(config), stream=True, show=show, vid_stride=config.frame_stride)
+        if detector is None:
+            # model.predict on a path can't start mid-file, so a resumed run seeks and feeds frames itself
+            return (model.predict(frame, conf=self.inference_conf(config), show=show, verbose=False)[0]
+                    for frame in self._read_frames(video_path, config.frame_stride, start_frame))
+        return self._detector_stream(video_path, detector, config, start_frame)
+
+    def _detector_stream(self, video_path, detector, config, start_frame=0):
+        for frame in self._read_frames(video_path, config.frame_stride, start_frame):
+            yield detector.predict(frame, self.inference_conf(config), path=video_path)
+
+    def _read_frames(self, video_path, frame_stride, start_frame=0):
+        import cv2
+        cap = cv2.VideoCapture(video_path)
+        try:
+            frame_number = start_frame * frame_stride
+            if frame_number:
+                cap.set(cv2.CAP_PROP_POS_FRAMES, frame_number)
+            while cap.isOpened():
+                frame_number += 1
+                if frame_number % frame_stride:  # same frames as vid_stride in model.predict
+                    if not cap.grab():
+                        break
+                    continue
+                ret, frame = cap.read()
+                if not ret:
+                    break
+                yield frame
+        finally:
+            cap.release()
+
+    def inference_conf(self, config):
+        # While recording, keep boxes below the alert threshold so lower thresholds can be replayed;
+        # the analysis loops still only alert on confidence_threshold
+        if self.detection_store is None:
+            return config.confidence_threshold
+        return min(config.confidence_threshold, self.detection_store.min_conf)
+
+    def model_version(self, config):
+        """Identifies which weights and inference mode produced a set of detections."""
+        version = "%s-%s" % (config.model_name, os.path.splitext(os.path.basename(self.model_path[config.model_name]))[0])
+        if config.tile_size:
+            version += "-tile%d" % config.tile_size
+        elif config.cascade:
+            version = "cascade-yolov8s-yolov8m"
+        return version
+
+    def detection_recorder(self, video_key, video_path, config):
+        if self.detection_store is None:
+            return None
+        import cv2
+        cap = cv2.VideoCapture(video_path)
+        try:
+            fps = cap.get(cv2.CAP_PROP_FPS) or None
+        finally:
+            cap.release()
+        return self.detection_store.recorder(video_key, self.model_version(config), config.frame_stride, fps)
+
+    def predict_frame(self, frame, model, config, show=False, imgsz=640):
+        """Results for one live frame, through the tiled or cascade detector when configured."""
+        if config.tile_size:
+            return [TiledDetector(model, config.tile_size).predict(frame, config.confidence_threshold)]
+        if config.cascade:
+            return [self.cascade.predict(frame, config.confidence_threshold, imgsz=imgsz)]
+        if show and isinstance(model, ServedModel):
+            # Displaying the annotated stream needs the model's own predictor
+            if model.model_name not in self._display_models:
+                self._display_models[model.model_name] = load_yolo(self.model_path[model.model_name])
+            model = self._display_models[model.model_name]
+        return model.predict(source=frame, conf=config.confidence_threshold, show=show, stream=True, imgsz=imgsz)
+
+    def count_frames(self, video_path, frame_stride=1):
+        """Number of frames that will be analysed, or None when the container doesn't say (streams)."""
+        import cv2
+        cap = cv2.VideoCapture(video_path)
+        try:
+            total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+            return -(-total // frame_stride) if total > 0 else None
+        finally:
+            cap.release()
+
+    def analysis_summary(self, total_frames, best_frame, recorder=None):
+        """JSON-friendly result of a video analysis, reported by the job API."""
+        summary = {"frames": total_frames, "alert": best_frame is not None}
+        if recorder is not None:
+            # Where to re-score this run: /detections/<video_key>/rescore
+            summary.update({"video_key": recorder.video_key, "model_version": recorder.model_version})
+        if best_frame is not None:
+            summary.update({
+                "class_name": best_frame.class_name,
+                "confidence": best_frame.conf,
+                "frame_idx": best_frame.frame_idx,
+            })
+        return summary
 
 
     def is_valid_bbox(self, bbox, img_shape):
@@ -189,7 +459,7 @@ class VideoProcessingService:
 
         if bbox_width / img_width <= 5/6 and bbox_height / img_height <= 5/6:
             return True
-        logging.info("Invalid bounding box detected: %s", bbox)
+        self.trace_buffer.record('invalid_bbox', bbox=[float(v) for v in bbox[:4]], shape=[int(v) for v in img_shape[:2]])
         return False
 
 
@@ -221,26 +491,40 @@ class VideoProcessingService:
 
 
 
-    def save_frame_and_generate_alert(self, frame, source, video_path=None,location='None',longitud=32.114414,latitude=34.817955):
+    def save_frame_and_generate_alert(self, frame, source, video_path=None,location='None',longitud=32.114414,latitude=34.817955, camera_id=None):
         try:
-            r = frame.get('result')
-            class_name = frame.get('class_name')
-            frame_idx = frame.get('frame_idx')
+            class_name = frame.class_name
+            frame_idx = frame.frame_idx
             timestamp = datetime.datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
-            local_filename = "%s_%s_%s.jpg" % (class_name, frame_idx, timestamp)
-            local_filepath = 'Results/%s' % local_filename
-            severity = self.determine_severity(frame.get('conf'), class_name)
-            
-            # Save the frame locally
-            r.save(local_filepath)
-            logging.info("Saving frame for detected %s with confidence %f", class_name, frame.get('conf'))
-            conf = float(frame.get('conf'))
-            
-            # Upload the frame to Firebase Storage
-            image_url = self.firebase_service.upload_frame(local_filepath, local_filename)
-            logging.info("Image URL: %s", image_url)
-            
-            self.generateAlert(class_name, conf, image_url, timestamp, source, video_path, severity)
+            basename = "%s_%s_%s" % (class_name, frame_idx, timestamp)
+            severity = self.determine_severity(frame.conf, class_name)
+            conf = frame.conf
+
+            # Skip the upload and the new alert document if this incident was already reported
+            # Only a registered camera says where it happened; demo and default locations are
+            # placeholders, so without one only the class, crop, time and source are compared
+            camera_location = self.alert_management_service.camera_location(source, camera_id)
+            location = camera_location or self.alert_management_service.resolve_location(source, camera_id)
+            lat, lon = (camera_location["lat"], camera_location["lon"]) if camera_location else (None, None)
+            phash = dhash(frame.crop())
+            duplicate_of = self.alert_deduplicator.find_duplicate(class_name, phash, lat, lon, source=source)
+            if duplicate_of is not None:
+                self.alert_bus.publish({"id": duplicate_of, "alertType": class_name, "source": source, "severity": severity,
+                                        "cameraId": None if camera_id is None else str(camera_id), "confidence": conf,
+                                        "videoUrl": video_path}, event_type="duplicate")
+                self.firebase_service.attach_duplicate_alert(duplicate_of, source, conf, video_path, severity)
+                return duplicate_of
+
+            # The full frame is only read back (or decoded) now, once the alert is known to be new
+            images = encode_alert_images(frame.render(), frame.bbox)
+            logging.info("Saving frame for detected %s with confidence %f", class_name, conf)
+
+            # The images are uploaded with the alert (concurrently, or later from the outbox)
+            alert_id = self.generateAlert(class_name, conf, None, timestamp, source, video_path, severity, location, None, camera_id,
+                                          images=images, basename=basename)
+            if alert_id is not None:
+                self.alert_deduplicator.remember(alert_id, class_name, phash, lat, lon, source=source)
+            return alert_id
         except Exception as e:
             logging.error("Error occurred while saving frame and generating alert: %s", str(e))
             self.firebase_service.log_error("Error occurred while saving frame and generating alert: %s", str(e))
@@ -249,13 +533,20 @@ class VideoProcessingService:
     
 
     
-    def generateAlert(self, class_name, conf, image_url, timestamp, source, video_path=None, severity="Low"):
+    def generateAlert(self, class_name, conf, image_url, timestamp, source, video_path=None, severity="Low", location=None, image_urls=None, camera_id=None,
+                      images=None, basename=None):
         # Create alert data 
-        alert_data = self.alert_management_service.generate_alert(class_name, conf, image_url, source, video_path, severity)
+        alert_data = self.alert_management_service.generate_alert(class_name, conf, image_url, source, video_path, severity, location, image_urls, camera_id)
+        # Consoles on the alert stream get it now instead of after the Firestore round trip
+        self.alert_bus.publish(alert_data)
         # Save the alert to Firestore
         try:
-            self.firebase_service.add_alert('alerts', alert_data)
+            if images is not None:
+                self.firebase_service.add_alert_with_images(alert_data, images, basename)
+            else:
+                self.firebase_service.add_alert('alerts', alert_data)
             logging.info("Alert created and saved to Firestore: %s", alert_data)
+            return alert_data["id"]
         except Exception as e:
             logging.error("Error occurred while saving alert to Firestore: %s", str(e))
             self.firebase_service.log_error("Error occurred while saving alert to Firestore: %s", str(e))
@@ -279,34 +570,77 @@ class VideoProcessingService:
     2024-06-27 13:34:12,458 - ERROR - Error during live video analysis: Unknown C++ exception from OpenCV code
     '''
         #when this function is started in a seperated class it works when started in the main class it doesnt work probably because of threads  
-    def live_video_analysis(self, source=1, show=True):
+    def on_latency_level_change(self, source, previous, level):
+        # Level changes are routine under load: they go to the trace buffer, the log (by the
+        # controller) and its degradation/recovery counters, not to the errors collection
+        self.trace_buffer.record('latency_level', source=source, previous=previous, level=level)
+
+    def live_stats(self):
+        """Latency controller state of every live stream being analysed."""
+        return {source: controller.stats() for source, controller in list(self.latency_controllers.items())}
+
+    def open_capture(self, source):
+        """Decode in a separate capture process when LIVE_SHARED_MEMORY=1, in this thread otherwise."""
+        if os.getenv("LIVE_SHARED_MEMORY", "0") == "1":
+            from Services.SharedFrameRing import SharedMemoryCapture
+            width, height = (int(v) for v in os.getenv("LIVE_FRAME_SIZE", "1280x720").split("x"))
+            return SharedMemoryCapture(source, frame_shape=(height, width, 3))
+        import cv2
+        return cv2.VideoCapture(source)
+
+    def live_video_analysis(self, source=1, show=True, job=None, camera_id=None):
+        import cv2
+        cap = None
+        controller = None
         try:
             logging.info("Starting live video analysis")
-            confidenceThreshold = self.confidenceThreshold
             self.stop_event = threading.Event()
-            cap = cv2.VideoCapture(source)
+            self.scheduler.configure_live_thread()
+            cap = self.open_capture(source)
 
             if not cap.isOpened():
-                error_message = "Error: Could not open video stream."
-                logging.error(error_message)
-                return
+                raise IOError("Could not open video stream.")
 
             alert_active = False
             consistent_detections = 0
             streak_best_frame = None
-            streak_max_conf = 0
             required_consistent_frames = 4  # Number of consistent detections required to trigger an alert
             last_detection_time = None
             cool_down_time = 5  # Minimum duration of no threat detection required to reset the alert state
+            frames_done = 0
+            controller = LatencyController(source, slo=float(os.getenv("LIVE_LATENCY_SLO_MS", 500)) / 1000.0,
+                                           on_change=self.on_latency_level_change)
+            self.latency_controllers[str(source)] = controller
+            level = controller.current()
 
             while cap.isOpened() and not self.stop_event.is_set():
+                # Lock-free read of the current settings snapshot; changes apply from the next frame
+                config = self.runtime_config.current().for_source(source, 'live_video')
+                model = self.inference_model(level.model_name or config.model_name)
+                confidenceThreshold = config.confidence_threshold
+
+                frames_done += 1
+                if job is not None:
+                    if job.is_cancelled():
+                        break
+                    job.report_progress(frames_done)
+                if frames_done % (config.frame_stride * level.stride_factor):
+                    # Skipped frames are grabbed to keep up with the stream but never decoded
+                    if not cap.grab():
+                        logging.error("Failed to read frame from video stream.")
+                        break
+                    continue
+
                 ret, frame = cap.read()
                 if not ret:
                     logging.error("Failed to read frame from video stream.")
                     break
+                # The shared-memory capture stamps frames when they were decoded, not when we got them
+                capture_time = getattr(cap, 'last_timestamp', None) or time.time()
 
                 # Perform prediction on the current frame
-                results = self.modelLive.predict(source=frame, conf=confidenceThreshold, show=show, stream=True)
+                inference_start = time.time()
+                results = list(self.predict_frame(frame, model, config, show, level.imgsz))
                 current_time = time.time()
                 threat_detected = False
 
@@ -316,32 +650,35 @@ class VideoProcessingService:
                     classes = r.boxes.cls  # Class indices
                     for conf, cls_idx, bbox in zip(confs, classes, xyxy):
                         if conf >= confidenceThreshold and cls_idx in [0, 1]:  # Assuming 0 and 1 are the class indices for threats
-                            class_name = self.model.names[int(cls_idx)]
+                            class_name = r.names[int(cls_idx)]
                             if self.is_valid_bbox(bbox, r.orig_shape):
-                                logging.info("Detected %s with confidence %f", class_name, conf)
+                                self.trace_buffer.record('detection', source=source, frame=frames_done, class_name=class_name, conf=float(conf))
+                                self.frame_log.info('live_detection', "Detected %s with confidence %f", class_name, conf)
                                 threat_detected = True
 
-                                if conf > streak_max_conf:
-                                    streak_max_conf = conf
-                                    streak_best_frame = {'result': r, 'frame_idx': time.time(), 'conf': conf, 'class_name': class_name, 'boxes': xyxy}
+                                if streak_best_frame is None or conf > streak_best_frame.conf:
+                                    # A live frame can't be re-read later, so the record keeps it as JPEG
+                                    # rather than holding on to the Results
+                                    streak_best_frame = DetectionRecord.capture(time.time(), conf, class_name, bbox.cpu().numpy(), r.orig_img)
 
+                self.trace_buffer.record('frame', source=source, frame=frames_done, threats=threat_detected, streak=consistent_detections)
                 if threat_detected:
                     consistent_detections += 1
                     last_detection_time = current_time
                 else:
                     consistent_detections = 0
-                    streak_max_conf = 0
                     streak_best_frame = None
 
                 if consistent_detections >= required_consistent_frames and not alert_active:
                     if streak_best_frame:
                         self.save_frame_and_generate_alert(
                             streak_best_frame,
-                            'live_video'
+                            'live_video',
+                            camera_id=camera_id
                         )
                         alert_active = True
                         consistent_detections = 0  # Reset after triggering the alert
-                        logging.info("Alert triggered for %s", streak_best_frame['class_name'])
+                        logging.info("Alert triggered for %s", streak_best_frame.class_name)
 
                 # Reset alert status if no threats are detected for the duration of the cooldown period
                 if alert_active and last_detection_time and current_time - last_detection_time > cool_down_time:
@@ -349,19 +686,35 @@ class VideoProcessingService:
                     last_detection_time = None  # Reset last detection time
                     logging.info("Alert state reset due to inactivity.")
 
+                # Capture-to-decision latency drives how much CPU batch analysis may use, and how
+                # much work the next frames of this stream get
+                latency = time.time() - capture_time
+                self.scheduler.report_live_latency(latency)
+                level = controller.observe(latency, current_time - inference_start)
+                self.profiler.frame_done()
+
                 # Check if the user pressed the 'q' key to quit
                 if cv2.waitKey(1) & 0xFF == ord('q') and self.firebase_service.live_detection_active is False:
                     self.firebase_service.live_detection_active = False
                     self.firebase_service.live_detection_activated = False
                     break
 
-            cap.release()
             cv2.destroyAllWindows()
+            return {"frames": frames_done, "latency": controller.stats()}
         except Exception as e:
             error_message = "Error during live video analysis: %s" % str(e)
+            self.trace_buffer.dump_to_log("live video analysis error")
             self.firebase_service.stop_live_detection()
             logging.error(error_message)
             self.firebase_service.log_error(error_message)
+            raise
+        finally:
+            if cap is not None:
+                cap.release()
+            # A stream restarted on the same source may already have registered its own controller
+            if controller is not None and self.latency_controllers.get(str(source)) is controller:
+                del self.latency_controllers[str(source)]
+            self.scheduler.live_thread_done()
 
 
 
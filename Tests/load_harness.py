@@ -0,0 +1,263 @@
+"""
+End-to-end load harness for the upload pipeline.
+
+Runs the real FirebaseService + VideoProcessingService against the local persistence
+backend (SQLite + filesystem instead of Firestore/Storage) and feeds them synthetic
+videos_from_user snapshot events: each arrival writes an unprocessed video document and
+delivers it to the listener callback, bursts as one snapshot with several changes, the
+way Firestore batches them. Reports throughput, queue growth, memory and end-to-end
+latency (snapshot delivered -> video processed, and -> alert written) percentiles.
+
+Needs the full environment (models, ultralytics, OpenCV). Example:
+
+    python Tests/load_harness.py --video "Tests/Test Videos/gun.mp4" --uploads 200 --duration 60 --pattern burst
+"""
+import argparse
+import datetime
+import json
+import os
+import random
+import resource
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from urllib.parse import parse_qs, urlparse
+
+# Add the root directory to Python path to import from parent directory
+sys.path.append(str(Path(__file__).parent.parent))
+
+
+##################### ARRIVAL PATTERNS ##########################################
+
+def arrival_schedule(pattern, uploads, duration, burst_size=20, seed=None):
+    """[(seconds from start, number of uploads delivered in one snapshot)] for an arrival pattern."""
+    rng = random.Random(seed)
+    if pattern == "uniform":
+        return [(i * duration / uploads, 1) for i in range(uploads)]
+    if pattern == "poisson":
+        rate = uploads / duration
+        schedule, offset = [], 0.0
+        for _ in range(uploads):
+            schedule.append((offset, 1))
+            offset += rng.expovariate(rate)
+        return schedule
+    if pattern == "burst":
+        sizes = [burst_size] * (uploads // burst_size) + ([uploads % burst_size] if uploads % burst_size else [])
+        interval = duration / len(sizes)
+        return [(i * interval, size) for i, size in enumerate(sizes)]
+    if pattern == "spike":
+        # Steady trickle with half of all uploads landing at once in the middle
+        spike = uploads // 2
+        steady = arrival_schedule("uniform", uploads - spike, duration)
+        return sorted(steady + [(duration / 2, spike)])
+    raise ValueError(f"Unknown arrival pattern: {pattern}")
+
+
+def percentiles(values):
+    if not values:
+        return None
+    values = sorted(values)
+
+    def at(q):
+        return round(values[min(len(values) - 1, int(q * len(values)))], 3)
+    return {"count": len(values), "p50": at(0.5), "p90": at(0.9), "p95": at(0.95), "p99": at(0.99),
+            "max": round(values[-1], 3)}
+
+
+def memory_mb():
+    """(current RSS, peak RSS) of this process in MB; current is None off Linux."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (1024 * 1024 if sys.platform == "darwin" else 1024)
+    try:
+        with open("/proc/self/statm") as statm:
+            current = int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except OSError:
+        current = None
+    return current, peak
+
+
+##################### HARNESS ##########################################
+
+class LoadHarness:
+
+    def __init__(self, video_file, schedule, sample_interval=1.0, timeout=600):
+        self.video_file = video_file
+        self.schedule = schedule
+        self.sample_interval = sample_interval
+        self.timeout = timeout
+        self.delivered_at = {}  # upload id -> time its snapshot was delivered
+        self.processed_at = {}
+        self.alerted_at = {}
+        self.samples = []
+        self._video_callback = None
+        self._listening = threading.Event()
+        self._lock = threading.Lock()
+
+    def setup(self, workdir):
+        os.environ.setdefault("PERSISTENCE_BACKEND", "local")
+        os.environ.setdefault("LOCAL_BACKEND_DIR", os.path.join(workdir, "backend"))
+        os.environ.setdefault("VIDEO_DOWNLOAD_DIR", os.path.join(workdir, "downloads"))
+        os.environ.setdefault("DETECTION_STORE_DIR", os.path.join(workdir, "detections"))
+        os.environ.setdefault("FIREBASE_SETTINGS_DOC_ID", "load-harness")
+        os.environ.setdefault("BACKLOG_SUBMIT_RATE", "0")  # measure the pipeline, not the startup pacing
+
+        from Services.FirebaseService import FirebaseService
+        from Services.VideoProcessingService import VideoProcessingService
+
+        self.firebase_service = FirebaseService()
+        self.backend = self.firebase_service.backend
+        if self.backend.name != "local":
+            raise RuntimeError("The load harness only runs against PERSISTENCE_BACKEND=local")
+        self.video_url = self.backend.upload_blob(self.video_file, f"load_harness/{os.path.basename(self.video_file)}",
+                                                  content_type="video/mp4")
+
+        # The upload listener is captured instead of attached, so arrivals reach it as
+        # synthetic snapshots; every other listener goes to the backend as usual
+        attach = self.backend.on_snapshot
+
+        def on_snapshot(collection_name, callback, document_id=None):
+            if collection_name == "videos_from_user":
+                self._video_callback = callback
+                self._listening.set()
+                return lambda: None
+            return attach(collection_name, callback, document_id)
+
+        self.backend.on_snapshot = on_snapshot
+        attach("videos_from_user", self._on_video_change)
+        attach("alerts", self._on_alert_change)
+
+        self.video_processing_service = VideoProcessingService(self.firebase_service)
+        self.firebase_service.setVideoProcessingService(self.video_processing_service)
+        if not self._listening.wait(60):
+            raise RuntimeError("The upload listener was never attached")
+
+    def _on_video_change(self, docs, changes, read_time):
+        now = time.monotonic()
+        for change in changes:
+            if change.type.name == 'MODIFIED' and change.document.to_dict().get('processed'):
+                with self._lock:
+                    self.processed_at.setdefault(change.document.id, now)
+
+    def _on_alert_change(self, docs, changes, read_time):
+        now = time.monotonic()
+        for change in changes:
+            if change.type.name != 'ADDED':
+                continue
+            upload_id = parse_qs(urlparse(change.document.to_dict().get('videoUrl') or '').query).get('upload')
+            if upload_id:
+                with self._lock:
+                    self.alerted_at.setdefault(upload_id[0], now)
+
+    def deliver(self, count, sequence):
+        """Write `count` unprocessed video documents and hand them to the listener as one snapshot."""
+        from Services.PersistenceBackend import ChangeType, DocumentChange
+        snapshots = []
+        for i in range(count):
+            upload_id = f"load-{sequence:05d}-{i:03d}"
+            data = {
+                'URL': f"{self.video_url}?upload={upload_id}",
+                'processed': False,
+                'uploadedAt': datetime.datetime.now(datetime.timezone.utc),
+            }
+            self.backend.set_document("videos_from_user", upload_id, data)
+            snapshots.append(self.backend.get_document("videos_from_user", upload_id))
+        with self._lock:
+            now = time.monotonic()
+            for snapshot in snapshots:
+                self.delivered_at[snapshot.id] = now
+        self._video_callback(snapshots, [DocumentChange(ChangeType.ADDED, s) for s in snapshots],
+                             datetime.datetime.now(datetime.timezone.utc))
+
+    def sample(self, started):
+        current, peak = memory_mb()
+        jobs = self.firebase_service.job_service.stats()
+        backlog = self.firebase_service.backlog_service.stats()
+        with self._lock:
+            delivered, processed = len(self.delivered_at), len(self.processed_at)
+        self.samples.append({
+            "t": round(time.monotonic() - started, 2),
+            "delivered": delivered,
+            "processed": processed,
+            "backlog_pending": backlog["pending"],
+            "jobs_queued": jobs["queued"],
+            "jobs_running": jobs["running"],
+            "rss_mb": None if current is None else round(current, 1),
+            "peak_rss_mb": round(peak, 1),
+        })
+
+    def run(self):
+        started = time.monotonic()
+        next_sample = started
+        pending = list(self.schedule)
+        sequence = 0
+        while time.monotonic() - started < self.timeout:
+            now = time.monotonic()
+            while pending and pending[0][0] <= now - started:
+                self.deliver(pending.pop(0)[1], sequence)
+                sequence += 1
+            if now >= next_sample:
+                self.sample(started)
+                next_sample += self.sample_interval
+            with self._lock:
+                done = not pending and len(self.processed_at) >= len(self.delivered_at)
+            if done:
+                break
+            time.sleep(0.01)
+        self.sample(started)
+        return self.report(time.monotonic() - started)
+
+    def report(self, elapsed):
+        with self._lock:
+            processed = [self.processed_at[i] - self.delivered_at[i] for i in self.processed_at if i in self.delivered_at]
+            alerted = [self.alerted_at[i] - self.delivered_at[i] for i in self.alerted_at if i in self.delivered_at]
+            delivered = len(self.delivered_at)
+        return {
+            "uploads": delivered,
+            "processed": len(processed),
+            "alerts": len(alerted),
+            "unfinished": delivered - len(processed),
+            "elapsed_seconds": round(elapsed, 2),
+            "throughput_per_minute": round(60 * len(processed) / elapsed, 2) if elapsed else None,
+            "processed_latency_seconds": percentiles(processed),
+            "alert_latency_seconds": percentiles(alerted),
+            "max_queue_depth": max((s["backlog_pending"] + s["jobs_queued"] for s in self.samples), default=0),
+            "peak_rss_mb": max((s["peak_rss_mb"] for s in self.samples), default=None),
+            "leases": self.firebase_service.lease_service.stats(),
+            "samples": self.samples,
+        }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Drive the upload pipeline with synthetic snapshot bursts.")
+    parser.add_argument("--video", required=True, help="local video file every upload points to")
+    parser.add_argument("--uploads", type=int, default=200)
+    parser.add_argument("--duration", type=float, default=60.0, help="seconds over which uploads arrive")
+    parser.add_argument("--pattern", choices=["uniform", "poisson", "burst", "spike"], default="poisson")
+    parser.add_argument("--burst-size", type=int, default=20, help="uploads per snapshot for --pattern burst")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--sample-interval", type=float, default=1.0)
+    parser.add_argument("--timeout", type=float, default=1800.0, help="give up on unfinished uploads after this many seconds")
+    parser.add_argument("--workdir", default=None, help="backend/download directory (a temporary one by default)")
+    parser.add_argument("--output", default=None, help="write the JSON report here instead of stdout")
+    args = parser.parse_args(argv)
+
+    schedule = arrival_schedule(args.pattern, args.uploads, args.duration, args.burst_size, args.seed)
+    harness = LoadHarness(os.path.abspath(args.video), schedule, args.sample_interval, args.timeout)
+    with tempfile.TemporaryDirectory() as tmp:
+        harness.setup(args.workdir or tmp)
+        report = harness.run()
+        harness.firebase_service.job_service.shutdown()
+        harness.firebase_service.lease_service.stop()
+        harness.backend.close()
+
+    text = json.dumps(dict(report, pattern=args.pattern), indent=2)
+    if args.output:
+        Path(args.output).write_text(text)
+    else:
+        print(text)
+    return 0 if report["unfinished"] == 0 else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
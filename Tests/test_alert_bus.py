@@ -0,0 +1,73 @@
+import sys
+import threading
+import unittest
+from pathlib import Path
+
+# Add the root directory to Python path to import from parent directory
+sys.path.append(str(Path(__file__).parent.parent))
+
+from Services.AlertBusService import AlertBus, AlertBusFullError, format_sse
+from Services.PersistenceBackend import SERVER_TIMESTAMP
+
+
+def alert(alert_id, alert_type="gun", severity="High", camera_id="1"):
+    return {"id": alert_id, "alertType": alert_type, "severity": severity, "cameraId": camera_id,
+            "timestamp": SERVER_TIMESTAMP}
+
+
+class TestAlertBus(unittest.TestCase):
+
+    def test_subscribers_only_get_matching_alerts(self):
+        bus = AlertBus()
+        guns = bus.subscribe(alert_types={"gun"})
+        camera = bus.subscribe(severities={"Emergency"}, camera_ids={"7"})
+        everything = bus.subscribe()
+
+        bus.publish(alert("a1"))
+        bus.publish(alert("a2", alert_type="knife", severity="Emergency", camera_id="7"))
+
+        self.assertEqual(guns.get(0.1)["alert"]["id"], "a1")
+        self.assertIsNone(guns.get(0.01))
+        self.assertEqual(camera.get(0.1)["alert"]["id"], "a2")
+        first, second = everything.get(0.1), everything.get(0.1)
+        self.assertEqual([first["id"], second["id"]], [1, 2])
+        # The pending server timestamp is replaced by the publish time
+        self.assertIsInstance(first["alert"]["timestamp"], float)
+
+    def test_slow_subscriber_drops_its_oldest_events(self):
+        bus = AlertBus(buffer_size=2)
+        slow = bus.subscribe()
+        for i in range(5):
+            bus.publish(alert(f"a{i}"))
+
+        self.assertEqual(slow.take_dropped(), 3)
+        self.assertEqual([slow.get(0)["alert"]["id"], slow.get(0)["alert"]["id"]], ["a3", "a4"])
+        self.assertEqual(bus.stats()["dropped"], 3)
+
+    def test_reconnect_replays_missed_events_and_close_wakes_reader(self):
+        bus = AlertBus(max_subscribers=1)
+        first = bus.subscribe()
+        with self.assertRaises(AlertBusFullError):
+            bus.subscribe()
+        bus.publish(alert("a1"))
+        self.assertEqual(first.get(0)["id"], 1)
+
+        reader = threading.Thread(target=first.get, args=(10,))
+        reader.start()
+        first.close()
+        reader.join(1)
+        self.assertFalse(reader.is_alive())
+
+        bus.publish(alert("a2"))
+        bus.publish(alert("a3", alert_type="knife"))
+        again = bus.subscribe(alert_types={"knife"}, last_event_id=1)
+        self.assertEqual(again.get(0)["alert"]["id"], "a3")
+        self.assertEqual(bus.stats()["subscribers"], 1)
+
+    def test_format_sse(self):
+        self.assertEqual(format_sse("alert", {"id": "a1"}, 4), 'id: 4\nevent: alert\ndata: {"id": "a1"}\n\n')
+        self.assertEqual(format_sse("overflow", {"dropped": 2}), 'event: overflow\ndata: {"dropped": 2}\n\n')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+import datetime
+import sys
+import unittest
+from pathlib import Path
+
+# Add the root directory to Python path to import from parent directory
+sys.path.append(str(Path(__file__).parent.parent))
+
+from Services.AlertCacheService import AlertCache
+from Services.PersistenceBackend import ChangeType, DocumentChange, DocumentSnapshot
+
+
+def _change(change_type, alert_id, data=None):
+    return DocumentChange(change_type, DocumentSnapshot(alert_id, data))
+
+
+class TestAlertCache(unittest.TestCase):
+
+    def setUp(self):
+        self.cache = AlertCache()
+        self.read_time = datetime.datetime(2024, 7, 25, 12, 0, tzinfo=datetime.timezone.utc)
+        changes = []
+        for i in range(6):
+            changes.append(_change(ChangeType.ADDED, "alert%d" % i, {
+                "alertType": "gun" if i % 2 == 0 else "knife",
+                "severity": "High" if i < 3 else "Low",
+                "timestamp": 1000.0 + i,
+            }))
+        self.cache.on_snapshot([], changes, self.read_time)
+
+    def test_newest_first_with_cursor_pagination(self):
+        """Pages are newest first and the cursor continues where the last page ended"""
+        self.assertTrue(self.cache.ready)
+        first_page, cursor = self.cache.query(limit=4)
+        self.assertEqual([a["id"] for a in first_page], ["alert5", "alert4", "alert3", "alert2"])
+        second_page, last_cursor = self.cache.query(cursor=cursor, limit=4)
+        self.assertEqual([a["id"] for a in second_page], ["alert1", "alert0"])
+        self.assertIsNone(last_cursor)
+
+    def test_filters(self):
+        """Severity, class and time range filters combine"""
+        alerts, _ = self.cache.query(severities={"High"}, alert_types={"gun"})
+        self.assertEqual([a["id"] for a in alerts], ["alert2", "alert0"])
+        alerts, _ = self.cache.query(since=1002, until=1004)
+        self.assertEqual([a["id"] for a in alerts], ["alert4", "alert3", "alert2"])
+
+    def test_snapshot_changes_update_cache(self):
+        """Modified and removed documents are reflected without a reload"""
+        self.cache.on_snapshot([], [
+            _change(ChangeType.MODIFIED, "alert5", {"alertType": "gun", "severity": "Emergency", "timestamp": 1005.0}),
+            _change(ChangeType.REMOVED, "alert4"),
+            _change(ChangeType.ADDED, "pending", {"alertType": "knife", "severity": "Low", "timestamp": None}),
+        ], self.read_time)
+        alerts, _ = self.cache.query(limit=3)
+        self.assertEqual([a["id"] for a in alerts], ["pending", "alert5", "alert3"])
+        self.assertEqual(alerts[1]["severity"], "Emergency")
+        self.assertEqual(len(self.cache), 6)
+
+    def test_invalid_cursor(self):
+        with self.assertRaises(ValueError):
+            self.cache.query(cursor="not-a-cursor")
+
+
+if __name__ == '__main__':
+    unittest.main()
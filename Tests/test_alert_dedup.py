@@ -0,0 +1,87 @@
+import sys
+import unittest
+from pathlib import Path
+
+import numpy as np
+
+# Add the root directory to Python path to import from parent directory
+sys.path.append(str(Path(__file__).parent.parent))
+
+from Services.AlertDeduplicationService import AlertDeduplicator, crop_detection, dhash, hamming
+from Services.AlertManagementService import AlertManagementService, severity_rank
+
+
+class TestPerceptualHash(unittest.TestCase):
+
+    def setUp(self):
+        self.image = self._scene(7)
+
+    def _scene(self, seed):
+        # Smooth shapes rather than pixel noise, like a real crop
+        rng = np.random.default_rng(seed)
+        y, x = np.mgrid[0:120, 0:160]
+        image = np.zeros((120, 160), dtype=float)
+        for _ in range(6):
+            cy, cx, r = rng.uniform(0, 120), rng.uniform(0, 160), rng.uniform(10, 40)
+            image += rng.uniform(20, 80) * ((y - cy) ** 2 + (x - cx) ** 2 < r ** 2)
+        return np.repeat(np.clip(image, 0, 255).astype(np.uint8)[:, :, None], 3, axis=2)
+
+    def test_hash_survives_rescaling_and_noise(self):
+        downscaled = self.image[::2, ::2]
+        noisy = np.clip(self.image.astype(int) + 3, 0, 255).astype(np.uint8)
+        self.assertLessEqual(hamming(dhash(self.image), dhash(downscaled)), 10)
+        self.assertLessEqual(hamming(dhash(self.image), dhash(noisy)), 4)
+
+    def test_different_images_are_far_apart(self):
+        other = self._scene(8)
+        self.assertGreater(hamming(dhash(self.image), dhash(other)), 10)
+
+    def test_tiny_crop_is_hashable(self):
+        crop = crop_detection(self.image, [10, 10, 13, 12], margin=0)
+        self.assertEqual(crop.shape[:2], (2, 3))
+        self.assertIsInstance(dhash(crop), int)
+
+
+class TestAlertDeduplicator(unittest.TestCase):
+
+    def setUp(self):
+        self.dedup = AlertDeduplicator(time_window=60, max_distance_m=100, max_hamming=5)
+        self.dedup.remember("alert-1", "gun", 0b1011, 32.0, 34.8, now=1000)
+
+    def test_matches_same_incident(self):
+        self.assertEqual(self.dedup.find_duplicate("gun", 0b1010, 32.0001, 34.8, now=1030), "alert-1")
+
+    def test_rejects_other_class_place_or_time(self):
+        self.assertIsNone(self.dedup.find_duplicate("knife", 0b1011, 32.0, 34.8, now=1010))
+        self.assertIsNone(self.dedup.find_duplicate("gun", 0b1011, 32.1, 34.8, now=1010))
+        self.assertIsNone(self.dedup.find_duplicate("gun", 0b1011, 32.0, 34.8, now=1100))
+
+    def test_rejects_different_crop(self):
+        self.assertIsNone(self.dedup.find_duplicate("gun", (1 << 64) - 1, 32.0, 34.8, now=1010))
+
+    def test_reupload_without_camera_is_folded(self):
+        # Uploads that name no camera get a random demo location, which must not be compared
+        alerts = AlertManagementService()
+        self.assertIsNone(alerts.camera_location('video'))
+        dedup = AlertDeduplicator(time_window=60, max_distance_m=150, max_hamming=5)
+        dedup.remember("alert-2", "gun", 0b1011, None, None, now=1000, source="video")
+        self.assertEqual(dedup.find_duplicate("gun", 0b1011, None, None, now=1010, source="video"), "alert-2")
+        self.assertIsNone(dedup.find_duplicate("gun", 0b1011, None, None, now=1010, source="live_video"))
+
+        # A registered camera keeps the distance check
+        tel_aviv = alerts.camera_location('video', 4)
+        self.assertEqual(tel_aviv["name"], "Tel Aviv")
+        self.assertIsNone(self.dedup.find_duplicate("gun", 0b1011, tel_aviv["lat"], tel_aviv["lon"], now=1010))
+
+    def test_located_and_unlocated_are_not_duplicates(self):
+        self.dedup.remember("upload", "knife", 0b1011, None, None, now=1000, source="video")
+        self.assertIsNone(self.dedup.find_duplicate("knife", 0b1011, 32.0, 34.8, now=1010, source="video"))
+        self.assertIsNone(self.dedup.find_duplicate("gun", 0b1011, None, None, now=1010, source="video"))
+
+    def test_severity_rank(self):
+        self.assertGreater(severity_rank("High"), severity_rank("Low"))
+        self.assertGreater(severity_rank("Low"), severity_rank(None))
+
+
+if __name__ == '__main__':
+    unittest.main()
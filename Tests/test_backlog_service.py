@@ -0,0 +1,31 @@
+import sys
+import unittest
+from pathlib import Path
+
+# Add the root directory to Python path to import from parent directory
+sys.path.append(str(Path(__file__).parent.parent))
+
+from Services.BacklogService import BacklogService
+
+
+class TestBacklogService(unittest.TestCase):
+
+    def setUp(self):
+        # The feeder thread is only started by start(), so the feed can be inspected directly
+        self.backlog = BacklogService(backend=None, job_service=None, process_fn=None)
+
+    def test_requeue_skips_a_video_still_in_the_feed(self):
+        self.assertTrue(self.backlog.enqueue("v1", {}))
+        self.assertFalse(self.backlog.requeue("v1", {}))
+        self.assertEqual(self.backlog.stats()["pending"], 1)
+
+    def test_requeue_after_submission(self):
+        self.assertTrue(self.backlog.enqueue("v1", {}))
+        self.backlog._feed.popleft()  # handed to the job service
+        self.assertFalse(self.backlog.enqueue("v1", {}))
+        self.assertTrue(self.backlog.requeue("v1", {}))
+        self.assertEqual(self.backlog.stats()["reclaimed"], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,90 @@
+import sys
+import unittest
+from collections import namedtuple
+from pathlib import Path
+
+# Add the root directory to Python path to import from parent directory
+sys.path.append(str(Path(__file__).parent.parent))
+
+from Services.AlertCacheService import AlertCache
+from Services.CameraRegistryService import Camera, CameraRegistry
+from Services.SpatialIndex import GridIndex, distance_m
+
+Doc = namedtuple('Doc', 'id data')
+Change = namedtuple('Change', 'type document')
+ChangeType = namedtuple('ChangeType', 'name')
+
+
+class _Doc(Doc):
+    def to_dict(self):
+        return dict(self.data)
+
+
+class TestGridIndex(unittest.TestCase):
+
+    def test_near_matches_brute_force(self):
+        index = GridIndex(cell_size_m=500)
+        points = {f"p{i}": (32.0 + (i % 20) * 0.003, 34.8 + (i // 20) * 0.003) for i in range(400)}
+        for key, (lat, lon) in points.items():
+            index.insert(key, lat, lon)
+
+        found = index.near(32.02, 34.82, 800)
+        expected = sorted((key, distance_m(32.02, 34.82, lat, lon)) for key, (lat, lon) in points.items()
+                          if distance_m(32.02, 34.82, lat, lon) <= 800)
+        self.assertEqual(sorted(key for key, _ in found), [key for key, _ in expected])
+        self.assertEqual([d for _, d in found], sorted(d for _, d in found))
+
+    def test_remove_and_reinsert(self):
+        index = GridIndex()
+        index.insert("a", 32.0, 34.8)
+        index.insert("a", 31.0, 35.0)
+        self.assertEqual(index.near(32.0, 34.8, 1000), [])
+        index.remove("a")
+        self.assertEqual(len(index), 0)
+
+
+class TestCameraRegistry(unittest.TestCase):
+
+    def setUp(self):
+        self.registry = CameraRegistry.from_json({"cameras": [
+            {"id": 1, "name": "Gate", "lat": 32.1134, "lon": 34.8175},
+            {"id": "lobby", "name": "Lobby", "lat": 32.1136, "lon": 34.8177},
+            {"id": 3, "name": "Jaffa", "lat": 32.0526, "lon": 34.7519},
+        ]})
+
+    def test_lookup_by_source_id(self):
+        self.assertEqual(self.registry.get(1).name, "Gate")
+        self.assertEqual(self.registry.get("1").name, "Gate")
+        self.assertIsNone(self.registry.get(99))
+
+    def test_cameras_near_point(self):
+        near = self.registry.near(32.1135, 34.8176, 100)
+        self.assertEqual({camera.id for camera, _ in near}, {"1", "lobby"})
+        self.registry.remove("lobby")
+        self.assertEqual([camera.id for camera, _ in self.registry.near(32.1135, 34.8176, 100)], ["1"])
+
+    def test_demo_location_visits_every_camera(self):
+        names = {self.registry.demo_location()["name"] for _ in range(3)}
+        self.assertEqual(names, {"Gate", "Lobby", "Jaffa"})
+        self.registry.register(Camera("4", "Port", 32.1001, 34.7745))
+        self.assertEqual(len({self.registry.demo_location()["name"] for _ in range(4)}), 4)
+
+
+class TestAlertsNear(unittest.TestCase):
+
+    def test_alert_cache_near(self):
+        cache = AlertCache()
+        alerts = [("a1", 32.1134, 34.8175, 100), ("a2", 32.0526, 34.7519, 200), ("a3", 32.1135, 34.8176, 300)]
+        cache.on_snapshot(None, [Change(ChangeType('ADDED'), _Doc(alert_id, {"latitude": lat, "longitude": lon, "timestamp": ts}))
+                                 for alert_id, lat, lon, ts in alerts], 400)
+
+        near = cache.near(32.1134, 34.8175, 500)
+        self.assertEqual([alert["id"] for alert in near], ["a1", "a3"])
+        self.assertEqual([alert["id"] for alert in cache.near(32.1134, 34.8175, 500, since=200)], ["a3"])
+
+        cache.on_snapshot(None, [Change(ChangeType('REMOVED'), _Doc("a1", {}))], 500)
+        self.assertEqual([alert["id"] for alert in cache.near(32.1134, 34.8175, 500)], ["a3"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+import sys
+import unittest
+from pathlib import Path
+
+import numpy as np
+
+# Add the root directory to Python path to import from parent directory
+sys.path.append(str(Path(__file__).parent.parent))
+
+from Services.CascadeDetector import CascadeDetector
+
+
+class FakeBoxes:
+    def __init__(self, rows):
+        self.data = self
+        self._rows = np.array(rows, dtype=np.float32).reshape(-1, 6)
+
+    def cpu(self):
+        return self
+
+    def numpy(self):
+        return self._rows
+
+    def __len__(self):
+        return len(self._rows)
+
+
+class FakeResult:
+    def __init__(self, rows, model_name):
+        self.boxes = FakeBoxes(rows)
+        self.model_name = model_name
+
+
+class FakeModel:
+    def __init__(self, name, rows):
+        self.name = name
+        self.rows = rows
+        self.calls = 0
+
+    def predict(self, frame, conf, imgsz, verbose):
+        self.calls += 1
+        return [FakeResult(self.rows, self.name)]
+
+
+class TestCascadeDetector(unittest.TestCase):
+
+    def _cascade(self, screen_rows):
+        self.small = FakeModel("small", screen_rows)
+        self.medium = FakeModel("medium", [[10, 10, 50, 50, 0.9, 0]])
+        return CascadeDetector(self.small, self.medium, band=(0.3, 0.8))
+
+    def test_uncertain_candidate_is_confirmed_by_medium_model(self):
+        cascade = self._cascade([[10, 10, 50, 50, 0.5, 0]])
+        result = cascade.predict(None, 0.6)
+        self.assertEqual(result.model_name, "medium")
+        self.assertEqual((self.small.calls, self.medium.calls), (1, 1))
+
+    def test_confident_or_empty_frames_stay_on_small_model(self):
+        for rows in ([[10, 10, 50, 50, 0.95, 1]], [], [[10, 10, 50, 50, 0.5, 2]]):  # class 2 is a person
+            cascade = self._cascade(rows)
+            self.assertEqual(cascade.predict(None, 0.6).model_name, "small")
+            self.assertEqual(self.medium.calls, 0)
+
+    def test_escalation_rate(self):
+        cascade = self._cascade([[10, 10, 50, 50, 0.5, 0]])
+        cascade.predict(None, 0.6)
+        self.small.rows = []
+        for _ in range(3):
+            cascade.predict(None, 0.6)
+        stats = cascade.stats()
+        self.assertEqual((stats["frames"], stats["escalated"], stats["escalation_rate"]), (4, 1, 0.25))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,70 @@
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+# Add the root directory to Python path to import from parent directory
+sys.path.append(str(Path(__file__).parent.parent))
+
+from Services.CheckpointService import CheckpointService
+from Services.DetectionRecord import DetectionRecord
+from Services.DetectionStoreService import DetectionStore, StreakTracker
+from Services.LocalBackend import LocalBackend
+
+NAMES = {0: 'gun', 1: 'knife', 2: 'person'}
+
+
+class TestCheckpointService(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.backend = LocalBackend(self.tmp_dir.name)
+        self.checkpoints = CheckpointService(self.backend, interval=60)
+
+    def tearDown(self):
+        self.backend.close()
+        self.tmp_dir.cleanup()
+
+    def test_resume_with_the_same_settings_only(self):
+        self.assertIsNone(self.checkpoints.load("video1", "yolov8s|0.6|1"))
+        self.assertFalse(self.checkpoints.due("video1"))
+        self.assertTrue(self.checkpoints.save("video1", {"fingerprint": "yolov8s|0.6|1", "frameIdx": 120}))
+
+        self.assertEqual(self.checkpoints.load("video1", "yolov8s|0.6|1")["frameIdx"], 120)
+        self.assertIsNone(self.checkpoints.load("video1", "yolov8m|0.6|1"))
+        self.checkpoints.clear("video1")
+        self.assertIsNone(self.checkpoints.load("video1", "yolov8s|0.6|1"))
+        self.assertEqual((self.checkpoints.stats()["resumed"], self.checkpoints.stats()["stale"]), (1, 1))
+
+    def test_streak_state_survives_a_round_trip(self):
+        tracker = StreakTracker(required_consistent_frames=2, policy="longest_streak")
+        for frame_idx, conf in enumerate([0.7, 0.9, 0.8]):
+            tracker.update(DetectionRecord(frame_idx, conf, "gun", (10.0, 10.0, 50.0, 60.0), b"jpeg", video_path="old.mp4", frame_number=frame_idx))
+        self.checkpoints.save("video1", {"fingerprint": "f", "tracker": tracker.to_dict(lambda record: record.to_dict())})
+
+        data = self.checkpoints.load("video1", "f")["tracker"]
+        restored = StreakTracker.from_dict(data, lambda record: DetectionRecord.from_dict(record, "new.mp4"))
+        self.assertEqual((restored.streak_length, restored.longest_streak, restored.policy), (3, 3, "longest_streak"))
+        self.assertEqual((restored.best.frame_idx, restored.best.conf, restored.best.video_path), (1, 0.9, "new.mp4"))
+        self.assertIsNone(restored.best.crop_jpeg)  # re-read from the video when the alert is raised
+
+    def test_recorder_resumes_from_partial_detections(self):
+        store = DetectionStore(str(Path(self.tmp_dir.name) / "detections"))
+        recorder = store.recorder("video1", "yolov8s-v5")
+        for frame_idx in range(4):
+            recorder.add(frame_idx, [[0, 0, 10, 10]] * frame_idx, [0.5] * frame_idx, [0] * frame_idx, (480, 640, 3), NAMES)
+        store.save(recorder, partial=True)
+        self.assertEqual(store.versions("video1"), [])
+
+        resumed = store.recorder("video1", "yolov8s-v5")
+        self.assertEqual(resumed.resume(store.load_partial("video1", "yolov8s-v5"), 3), 3)
+        resumed.add(3, [[0, 0, 10, 10]], [0.9], [1], (480, 640, 3), NAMES)
+        store.save(resumed)
+        detections = store.load("video1")
+        self.assertEqual(detections.offsets.tolist(), [0, 0, 1, 3, 4])
+        self.assertAlmostEqual(float(detections.conf[-1]), 0.9, places=5)
+        self.assertIsNone(store.load_partial("video1", "yolov8s-v5"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,91 @@
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+# Add the root directory to Python path to import from parent directory
+sys.path.append(str(Path(__file__).parent.parent))
+
+from Services.DetectionStoreService import DetectionStore, ScoredFrame, StreakTracker, rescore
+from Services.DetectionRecord import is_local_file
+
+NAMES = {0: 'gun', 1: 'knife', 2: 'person'}
+SMALL_BOX = [100, 100, 150, 160]
+
+
+class TestDetectionStore(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.store = DetectionStore(self.tmp.name)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _record(self, frames, video_key="video-1", version="yolov8s-v5"):
+        """frames: list of [(conf, cls), ...] per analysed frame, or None for a frame without boxes"""
+        recorder = self.store.recorder(video_key, version, frame_stride=2, fps=10.0)
+        for frame_idx, boxes in enumerate(frames):
+            if boxes is None:
+                recorder.add(frame_idx)
+                continue
+            recorder.add(frame_idx, [box for box, _, _ in boxes], [conf for _, conf, _ in boxes],
+                         [cls for _, _, cls in boxes], (480, 640, 3), NAMES)
+        self.store.save(recorder)
+        return self.store.load(video_key)
+
+    def test_round_trip(self):
+        detections = self._record([[(SMALL_BOX, 0.7, 0)], None, [(SMALL_BOX, 0.4, 1), (SMALL_BOX, 0.9, 2)]])
+        self.assertEqual(len(detections), 3)
+        self.assertEqual(detections.offsets.tolist(), [0, 1, 1, 3])
+        self.assertEqual(detections.cls.tolist(), [0, 1, 2])
+        # Third analysed frame with stride 2 is source frame 5
+        self.assertAlmostEqual(float(detections.timestamps[2]), 0.5)
+        self.assertEqual(detections.meta["frame_shape"], [480, 640])
+        self.assertEqual(self.store.versions("video-1"), ["yolov8s-v5"])
+
+    def test_rescore_with_other_threshold_and_streak_length(self):
+        frames = [[(SMALL_BOX, 0.65, 0)], [(SMALL_BOX, 0.7, 0)], [(SMALL_BOX, 0.5, 1)],
+                  [(SMALL_BOX, 0.45, 1)], [(SMALL_BOX, 0.55, 1)], None]
+        detections = self._record(frames)
+
+        result = rescore(detections, threshold=0.6, required_consistent_frames=2)
+        self.assertEqual((result["alert"], result["frame_idx"], result["class_name"]), (True, 1, "gun"))
+        self.assertFalse(rescore(detections, threshold=0.6, required_consistent_frames=3)["alert"])
+
+        # A lower threshold makes frames 0-4 one streak; the longest-streak policy still picks its best frame
+        result = rescore(detections, threshold=0.4, required_consistent_frames=5, policy="longest_streak")
+        self.assertEqual((result["alert"], result["frame_idx"]), (True, 1))
+
+    def test_rescore_ignores_people_and_oversized_boxes(self):
+        full_frame = [0, 0, 640, 480]
+        detections = self._record([[(SMALL_BOX, 0.9, 2), (full_frame, 0.95, 0)]] * 3)
+        self.assertFalse(rescore(detections, threshold=0.6, required_consistent_frames=2)["alert"])
+
+    def test_tracker_keeps_the_streak_best_until_it_is_beaten(self):
+        tracker = StreakTracker(required_consistent_frames=2)
+        best = ScoredFrame(0, 0.8, 0, SMALL_BOX)
+        tracker.update(best)
+        self.assertFalse(tracker.would_improve(0.7))
+        tracker.update(ScoredFrame(1, 0.7, 0, SMALL_BOX))
+        self.assertIs(tracker.best, best)
+        tracker.update(None)
+        self.assertTrue(tracker.would_improve(0.1))
+
+    def test_unknown_video_and_unsafe_keys(self):
+        self.assertIsNone(self.store.load("missing"))
+        self.assertNotIn("..", self.store.path("../../etc", "../passwd"))
+        with self.assertRaises(ValueError):
+            rescore(self._record([None]), policy="newest")
+
+    def test_only_local_files_are_re_read_for_alert_frames(self):
+        video = Path(self.tmp.name) / "upload.mp4"
+        video.write_bytes(b"")
+        self.assertTrue(is_local_file(str(video)))
+        self.assertFalse(is_local_file("https://firebasestorage.googleapis.com/v0/b/x/o/upload.mp4?alt=media"))
+        self.assertFalse(is_local_file(self.tmp.name))
+        self.assertFalse(is_local_file(None))
+
+
+if __name__ == '__main__':
+    unittest.main()
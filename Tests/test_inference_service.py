@@ -0,0 +1,130 @@
+import sys
+import time
+import unittest
+from pathlib import Path
+
+import numpy as np
+
+# Add the root directory to Python path to import from parent directory
+sys.path.append(str(Path(__file__).parent.parent))
+
+from Services.InferenceService import InferenceService, ServedModel
+
+
+class FakeBoxes:
+    def __init__(self, conf):
+        self.conf = np.asarray(conf)
+
+
+class FakeResult:
+    def __init__(self, frame, conf):
+        self.frame = frame
+        self.boxes = FakeBoxes(conf)
+
+    def __getitem__(self, keep):
+        return FakeResult(self.frame, self.boxes.conf[keep])
+
+
+class FakeModel:
+    """Returns the frame back with boxes at 0.3 / 0.6 / 0.9, and records the batch sizes."""
+    names = {0: 'gun', 1: 'knife', 2: 'person'}
+
+    def __init__(self, batches, delay=0.0):
+        self.batches = batches
+        self.delay = delay
+
+    def predict(self, frames, conf, imgsz, verbose=False):
+        self.batches.append(len(frames))
+        time.sleep(self.delay)
+        if any(frame == "bad" for frame in frames):
+            raise ValueError("corrupt frame")
+        return [FakeResult(frame, [c for c in (0.3, 0.6, 0.9) if c >= conf]) for frame in frames]
+
+
+class TestInferenceService(unittest.TestCase):
+
+    def _service(self, **kwargs):
+        self.batches = []
+        kwargs.setdefault("cpus", [0])
+        service = InferenceService({"yolov8s": "s.pt"}, lambda path: FakeModel(self.batches, 0.02), **kwargs)
+        self.addCleanup(service.shutdown)
+        return service
+
+    def test_concurrent_requests_share_batches(self):
+        service = self._service(max_batch_size=4, max_wait=0.05)
+        futures = [service.submit("yolov8s", i) for i in range(8)]
+        self.assertEqual([future.result(2).frame for future in futures], list(range(8)))
+        self.assertEqual(self.batches, [4, 4])
+        stats = service.stats()["models"]["yolov8s"]
+        self.assertEqual((stats["requests"], stats["batches"], stats["mean_batch_size"]), (8, 2, 4.0))
+        self.assertGreater(stats["mean_batch_compute_ms"], 0)
+        self.assertIsNotNone(stats["p95_queue_wait_ms"])
+
+    def test_lone_request_waits_at_most_max_wait(self):
+        service = self._service(max_batch_size=8, max_wait=0.02)
+        service.predict("yolov8s", "warm-up", timeout=2)
+        started = time.monotonic()
+        service.predict("yolov8s", "frame", timeout=2)
+        self.assertLess(time.monotonic() - started, 0.5)
+        self.assertEqual(self.batches, [1, 1])
+
+    def test_each_request_keeps_its_own_threshold(self):
+        service = self._service(max_batch_size=2, max_wait=0.05)
+        low, high = service.submit("yolov8s", "a", conf=0.25), service.submit("yolov8s", "b", conf=0.8)
+        self.assertEqual(low.result(2).boxes.conf.tolist(), [0.3, 0.6, 0.9])
+        self.assertEqual(high.result(2).boxes.conf.tolist(), [0.9])
+        self.assertEqual(self.batches, [2])
+
+    def test_failed_batch_fails_its_futures_only(self):
+        service = self._service(max_batch_size=1, max_wait=0.0)
+        with self.assertRaises(ValueError):
+            service.predict("yolov8s", "bad", timeout=2)
+        self.assertEqual(service.predict("yolov8s", "good", timeout=2).frame, "good")
+        self.assertEqual(service.stats()["models"]["yolov8s"]["errors"], 1)
+
+    def test_stream_keeps_order_and_served_model_predicts_lists(self):
+        service = self._service(max_batch_size=3, max_wait=0.01)
+        self.assertEqual([r.frame for r in service.stream("yolov8s", iter(range(7)))], list(range(7)))
+        model = ServedModel(service, "yolov8s", FakeModel.names)
+        self.assertEqual([r.frame for r in model.predict(["x", "y"], conf=0.5)], ["x", "y"])
+        self.assertEqual(model.names[0], 'gun')
+
+    def test_replicas_get_disjoint_cpus(self):
+        self.assertEqual(InferenceService._split_cpus([0, 1, 2, 3, 4], 2), [[0, 1], [2, 3, 4]])
+        self.assertEqual(InferenceService._split_cpus([0], 2), [[0], [0]])
+
+    def test_one_failed_replica_leaves_the_others_serving(self):
+        loads = []
+
+        def loader(path):
+            loads.append(path)
+            if len(loads) == 1:
+                raise OSError("weights unreadable")
+            return FakeModel([])
+        service = InferenceService({"yolov8s": "s.pt"}, loader, replicas=2, cpus=[0, 1])
+        self.addCleanup(service.shutdown)
+        service.warm("yolov8s", timeout=2)
+        self.assertEqual(service.predict("yolov8s", "frame", timeout=2).frame, "frame")
+        self.assertEqual(service.stats()["models"]["yolov8s"]["failed_replicas"], 1)
+
+    def test_model_is_rejected_once_every_replica_failed(self):
+        def loader(path):
+            raise OSError("weights unreadable")
+        service = InferenceService({"yolov8s": "s.pt"}, loader, replicas=2, cpus=[0, 1])
+        self.addCleanup(service.shutdown)
+        with self.assertRaises(RuntimeError):
+            service.warm("yolov8s", timeout=2)
+        with self.assertRaises(RuntimeError):
+            service.submit("yolov8s", "frame")
+
+    def test_unknown_model_and_shutdown(self):
+        service = self._service()
+        with self.assertRaises(KeyError):
+            service.submit("yolov9", "frame")
+        service.shutdown()
+        with self.assertRaises(RuntimeError):
+            service.submit("yolov8s", "frame")
+
+
+if __name__ == '__main__':
+    unittest.main()
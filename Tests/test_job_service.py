@@ -0,0 +1,74 @@
+import sys
+import threading
+import unittest
+from pathlib import Path
+
+# Add the root directory to Python path to import from parent directory
+sys.path.append(str(Path(__file__).parent.parent))
+
+from Services.JobService import Job, JobQueueFullError, JobService
+
+
+class TestJobService(unittest.TestCase):
+
+    def setUp(self):
+        self.job_service = JobService(max_workers=1, max_queued=1)
+        self.release = threading.Event()
+
+    def tearDown(self):
+        self.release.set()
+        self.job_service.shutdown(wait=True)
+
+    def _blocking_job(self, job):
+        job.report_progress(0, 10)
+        for frame in range(10):
+            if job.is_cancelled():
+                return {"cancelled": True}
+            self.release.wait(0.05)
+            job.report_progress(frame + 1)
+        return {"frames": 10}
+
+    def test_job_completes_with_progress_and_result(self):
+        """A finished job reports full progress, throughput and the target's result"""
+        self.release.set()
+        job = self.job_service.submit('video', self._blocking_job, {"video_path": "a.mp4"})
+        job._future.result(timeout=5)
+        status = job.to_dict()
+        self.assertEqual(status["status"], Job.COMPLETED)
+        self.assertEqual(status["progress"], {"frames_done": 10, "total_frames": 10, "percent": 100.0})
+        self.assertEqual(status["result"], {"frames": 10})
+        self.assertGreater(status["throughput_fps"], 0)
+
+    def test_saturation_raises(self):
+        """Submissions beyond workers + queue slots are rejected"""
+        self.job_service.submit('video', self._blocking_job)
+        self.job_service.submit('video', self._blocking_job)
+        with self.assertRaises(JobQueueFullError):
+            self.job_service.submit('video', self._blocking_job)
+
+    def test_cancel_running_and_queued_jobs(self):
+        """Queued jobs are cancelled immediately, running jobs at their next frame"""
+        running = self.job_service.submit('video', self._blocking_job)
+        queued = self.job_service.submit('video', self._blocking_job)
+        while running.status != Job.RUNNING:
+            self.release.wait(0.01)
+        self.assertEqual(self.job_service.cancel(queued.id).status, Job.CANCELLED)
+
+        self.job_service.cancel(running.id)
+        running._future.result(timeout=5)
+        self.assertEqual(running.status, Job.CANCELLED)
+        self.assertEqual(self.job_service.stats()["queued"], 0)
+
+    def test_failed_job_records_error(self):
+        """Exceptions raised by the target mark the job as failed"""
+        def failing_job(job):
+            raise RuntimeError("decoder crashed")
+
+        job = self.job_service.submit('video', failing_job)
+        job._future.result(timeout=5)
+        self.assertEqual(job.status, Job.FAILED)
+        self.assertEqual(job.error, "decoder crashed")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,51 @@
+import sys
+import unittest
+from pathlib import Path
+
+# Add the root directory to Python path to import from parent directory
+sys.path.append(str(Path(__file__).parent.parent))
+
+from Services.LatencyController import DEFAULT_LADDER, LatencyController
+
+
+class TestLatencyController(unittest.TestCase):
+
+    def setUp(self):
+        self.changes = []
+        self.controller = LatencyController("cam-1", slo=0.2, patience=3, recovery=5,
+                                            on_change=lambda stream, previous, level: self.changes.append((previous, level)))
+
+    def test_stays_at_full_quality_within_slo(self):
+        for _ in range(50):
+            level = self.controller.observe(0.15, 0.1)
+        self.assertEqual(level, DEFAULT_LADDER[0])
+        self.assertFalse(self.controller.stats()["degraded"])
+
+    def test_degrades_step_by_step_while_over_slo(self):
+        levels = [self.controller.observe(0.5, 0.45) for _ in range(30)]
+        self.assertEqual(levels[-1], DEFAULT_LADDER[-1])
+        self.assertEqual(levels[-1].model_name, "yolov8s")
+        self.assertEqual(self.changes, [(0, 1), (1, 2), (2, 3), (3, 4)])
+        stats = self.controller.stats()
+        self.assertTrue(stats["degraded"])
+        self.assertEqual(stats["slo_violations"], 30)
+
+    def test_recovers_once_latency_has_headroom(self):
+        for _ in range(4):
+            self.controller.observe(0.5, 0.45)
+        self.assertEqual(self.controller.level, 1)
+        for _ in range(20):
+            self.controller.observe(0.05, 0.03)
+        self.assertEqual(self.controller.level, 0)
+        self.assertEqual(self.controller.stats()["recoveries"], 1)
+
+    def test_single_spike_does_not_degrade(self):
+        self.controller.observe(0.1, 0.05)
+        self.controller.observe(1.0, 0.9)
+        for _ in range(10):
+            self.controller.observe(0.1, 0.05)
+        self.assertEqual(self.controller.level, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,103 @@
+import sys
+import tempfile
+import time
+import unittest
+from pathlib import Path
+
+# Add the root directory to Python path to import from parent directory
+sys.path.append(str(Path(__file__).parent.parent))
+
+from Services.LeaseService import LeaseService
+from Services.LocalBackend import LocalBackend
+
+
+class TestLeaseService(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.backend = LocalBackend(self.tmp_dir.name)
+        self.backend.set_document("videos_from_user", "video1", {"URL": "video1.mp4", "processed": False})
+        self.worker_a = LeaseService(self.backend, "worker-a", lease_seconds=0.2)
+        self.worker_b = LeaseService(self.backend, "worker-b", lease_seconds=0.2)
+
+    def tearDown(self):
+        self.backend.close()
+        self.tmp_dir.cleanup()
+
+    def test_only_one_worker_claims(self):
+        """A live lease blocks other workers and completion marks the video processed"""
+        self.assertTrue(self.worker_a.try_claim("video1"))
+        self.assertFalse(self.worker_b.try_claim("video1"))
+        self.assertTrue(self.worker_a.complete("video1", frames_processed=30))
+        self.assertFalse(self.worker_b.try_claim("video1"))
+
+        data = self.backend.get_document("videos_from_user", "video1").to_dict()
+        self.assertTrue(data["processed"])
+        self.assertEqual(data["processedBy"], "worker-a")
+        self.assertEqual(self.worker_a.stats()["frames_processed"], 30)
+
+    def test_live_lease_is_not_claimed_twice_by_its_owner(self):
+        """A video queued twice on one node is only processed once"""
+        self.assertTrue(self.worker_a.try_claim("video1"))
+        self.assertFalse(self.worker_a.try_claim("video1"))
+
+    def test_expired_lease_is_reclaimed(self):
+        """A dead worker's video shows up as expired and the old owner can no longer complete it"""
+        lost = []
+        self.assertTrue(self.worker_a.try_claim("video1", on_lost=lambda: lost.append("video1")))
+        time.sleep(0.3)
+        self.assertEqual([doc.id for doc in self.worker_b.find_expired()], ["video1"])
+        self.assertTrue(self.worker_b.try_claim("video1"))
+
+        self.worker_a.renew_all()
+        self.assertEqual(lost, ["video1"])
+        self.assertFalse(self.worker_a.complete("video1"))
+        self.assertTrue(self.worker_b.complete("video1"))
+
+    def test_release_lets_another_worker_claim(self):
+        self.assertTrue(self.worker_a.try_claim("video1"))
+        self.assertTrue(self.worker_a.release("video1"))
+        self.assertTrue(self.worker_b.try_claim("video1"))
+
+    def test_released_video_is_found_by_other_workers(self):
+        """A video handed back on shutdown shows up in the other workers' expiry scan right away"""
+        self.worker_a.lease_seconds = 60
+        self.assertTrue(self.worker_a.try_claim("video1"))
+        self.assertEqual(self.worker_b.find_expired(), [])
+        self.worker_a.stop()
+
+        self.assertEqual([doc.id for doc in self.worker_b.find_expired()], ["video1"])
+        self.assertTrue(self.worker_b.try_claim("video1"))
+        self.assertTrue(self.worker_b.complete("video1"))
+        self.assertEqual(self.worker_b.find_expired(), [])
+
+    def test_cancelled_video_is_not_reclaimed(self):
+        self.assertTrue(self.worker_a.try_claim("video1"))
+        self.assertTrue(self.worker_a.cancel("video1"))
+
+        data = self.backend.get_document("videos_from_user", "video1").to_dict()
+        self.assertTrue(data["cancelled"])
+        self.assertEqual(self.worker_b.find_expired(), [])
+        self.assertFalse(self.worker_b.try_claim("video1"))
+
+    def test_cancel_after_lost_lease_changes_nothing(self):
+        self.assertTrue(self.worker_a.try_claim("video1"))
+        time.sleep(0.3)
+        self.assertTrue(self.worker_b.try_claim("video1"))
+        self.assertFalse(self.worker_a.cancel("video1"))
+        self.assertTrue(self.worker_b.complete("video1"))
+
+    def test_video_failing_every_attempt_is_set_aside(self):
+        self.worker_a.max_attempts = 2
+        for _ in range(2):
+            self.assertTrue(self.worker_a.try_claim("video1"))
+            self.assertTrue(self.worker_a.release("video1", failed=True))
+
+        data = self.backend.get_document("videos_from_user", "video1").to_dict()
+        self.assertTrue(data["failed"])
+        self.assertEqual(self.worker_b.find_expired(), [])
+        self.assertFalse(self.worker_b.try_claim("video1"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,30 @@
+import sys
+import unittest
+from pathlib import Path
+
+# Add the root directory to Python path to import from parent directory
+sys.path.append(str(Path(__file__).parent.parent))
+
+from Tests.load_harness import arrival_schedule, percentiles
+
+
+class TestLoadHarness(unittest.TestCase):
+
+    def test_every_pattern_delivers_every_upload_in_order(self):
+        for pattern in ("uniform", "poisson", "burst", "spike"):
+            schedule = arrival_schedule(pattern, 200, 60.0, burst_size=30, seed=1)
+            self.assertEqual(sum(count for _, count in schedule), 200, pattern)
+            self.assertEqual([offset for offset, _ in schedule], sorted(offset for offset, _ in schedule), pattern)
+        self.assertEqual(arrival_schedule("burst", 70, 60.0, burst_size=30),
+                         [(0.0, 30), (20.0, 30), (40.0, 10)])
+        with self.assertRaises(ValueError):
+            arrival_schedule("sawtooth", 10, 10.0)
+
+    def test_percentiles(self):
+        report = percentiles([float(i) for i in range(1, 101)])
+        self.assertEqual((report["count"], report["p50"], report["p99"], report["max"]), (100, 51.0, 100.0, 100.0))
+        self.assertIsNone(percentiles([]))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,78 @@
+import datetime
+import os
+import sys
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+
+# Add the root directory to Python path to import from parent directory
+sys.path.append(str(Path(__file__).parent.parent))
+
+from Services.LocalBackend import LocalBackend
+from Services.PersistenceBackend import SERVER_TIMESTAMP
+
+
+class TestLocalBackend(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.backend = LocalBackend(self.tmp_dir.name)
+
+    def tearDown(self):
+        self.backend.close()
+        self.tmp_dir.cleanup()
+
+    def test_document_round_trip(self):
+        """Documents can be added, read back and updated"""
+        doc_id = self.backend.add_document("alerts", {"alertType": "gun", "timestamp": SERVER_TIMESTAMP})
+        doc = self.backend.get_document("alerts", doc_id)
+        self.assertEqual(doc.to_dict()["alertType"], "gun")
+        self.assertIsInstance(doc.to_dict()["timestamp"], datetime.datetime)
+
+        self.backend.update_document("alerts", doc_id, {"isConfirmed": True, "meta.reviewer": "admin"})
+        data = self.backend.get_document("alerts", doc_id).to_dict()
+        self.assertTrue(data["isConfirmed"])
+        self.assertEqual(data["meta"], {"reviewer": "admin"})
+        self.assertIsNone(self.backend.get_document("alerts", "missing"))
+
+    def test_query_filters_and_pagination(self):
+        """Queries honour filters, skip documents without the field and page with start_after"""
+        for i in range(5):
+            self.backend.set_document("videos_from_user", "video%d" % i, {"processed": i % 2 == 1})
+        self.backend.set_document("videos_from_user", "no_flag", {"URL": "x"})
+
+        first_page = self.backend.query_documents("videos_from_user", filters=[("processed", "==", False)], limit=2)
+        self.assertEqual([doc.id for doc in first_page], ["video0", "video2"])
+
+        second_page = self.backend.query_documents("videos_from_user", filters=[("processed", "==", False)],
+                                                   limit=2, start_after=first_page[-1])
+        self.assertEqual([doc.id for doc in second_page], ["video4"])
+
+    def test_snapshot_listener(self):
+        """Listeners get existing documents as ADDED and later writes in order"""
+        self.backend.set_document("settings", "main", {"threshHold": 0.6})
+        received = []
+        done = threading.Event()
+
+        def on_snapshot(doc_snapshot, changes, read_time):
+            for change in changes:
+                received.append((change.type.name, change.document.to_dict()["threshHold"]))
+            if len(received) == 2:
+                done.set()
+
+        unsubscribe = self.backend.on_snapshot("settings", on_snapshot, document_id="main")
+        self.backend.update_document("settings", "main", {"threshHold": 0.8})
+        self.assertTrue(done.wait(2))
+        self.assertEqual(received, [("ADDED", 0.6), ("MODIFIED", 0.8)])
+        unsubscribe()
+
+    def test_blob_upload(self):
+        """Uploaded blobs are stored under the blob directory"""
+        url = self.backend.upload_blob_bytes(b"jpeg-bytes", "detections/frame.jpg", content_type="image/jpeg")
+        self.assertTrue(url.startswith("file://"))
+        self.assertTrue(os.path.exists(os.path.join(self.tmp_dir.name, "blobs", "detections", "frame.jpg")))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,84 @@
+import datetime
+import os
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+# Add the root directory to Python path to import from parent directory
+sys.path.append(str(Path(__file__).parent.parent))
+
+from Services.OutboxService import Outbox
+from Services.PersistenceBackend import SERVER_TIMESTAMP
+
+
+class TestOutbox(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.forwarded = []
+        self.failures = 0
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def handler(self, key, payload, blobs):
+        if self.failures:
+            self.failures -= 1
+            raise ConnectionError("network is unreachable")
+        self.forwarded.append((key, payload, blobs))
+
+    def open(self, **kwargs):
+        kwargs.setdefault("rate", 0)
+        return Outbox(self.tmp_dir.name, {"alert": self.handler, "error": self.handler}, **kwargs)
+
+    def test_entries_survive_a_restart_and_are_forwarded_in_order(self):
+        outbox = self.open()
+        outbox.put("alert", {"alert": {"id": "a1", "timestamp": SERVER_TIMESTAMP}, "basename": "gun_1"},
+                   {"imageUrl": b"full", "cropUrl": b"crop"}, key="a1")
+        outbox.put("error", {"error_message": "upload failed"})
+        outbox.put("alert", {"alert": {"id": "a2"}}, key="a2")
+        outbox.stop()
+
+        outbox = self.open()
+        self.assertEqual(outbox.drain(), 3)
+        keys = [key for key, _, _ in self.forwarded]
+        self.assertEqual((keys[0], keys[2]), ("a1", "a2"))
+        key, payload, blobs = self.forwarded[0]
+        self.assertIsInstance(payload["alert"]["timestamp"], datetime.datetime)
+        self.assertEqual(blobs, {"cropUrl": b"crop", "imageUrl": b"full"})
+        self.assertEqual(os.listdir(outbox.spool_dir), [])
+        self.assertEqual(outbox.stats()["pending"], 0)
+        outbox.stop()
+
+    def test_failure_stops_the_burst_and_backs_off(self):
+        outbox = self.open(backoff=30.0)
+        for i in range(3):
+            outbox.put("alert", {"alert": {"id": f"a{i}"}}, key=f"a{i}")
+        self.failures = 1
+
+        self.assertEqual(outbox.drain(), 0)
+        stats = outbox.stats()
+        self.assertEqual((stats["pending"], stats["max_attempts_pending"]), (3, 1))
+        self.assertGreater(stats["retry_in_seconds"], 0)
+
+        self.assertEqual(outbox.drain(), 3)
+        self.assertEqual([key for key, _, _ in self.forwarded], ["a0", "a1", "a2"])
+        outbox.stop()
+
+    def test_entry_is_parked_after_max_attempts(self):
+        outbox = self.open(max_attempts=2)
+        outbox.put("alert", {"alert": {"id": "poison"}}, key="poison")
+        outbox.put("alert", {"alert": {"id": "a1"}}, key="a1")
+        self.failures = 2
+
+        outbox.drain()
+        outbox.drain()
+        self.assertEqual(outbox.drain(), 1)
+        self.assertEqual([key for key, _, _ in self.forwarded], ["a1"])
+        self.assertEqual(outbox.stats()["parked_entries"], 1)
+        outbox.stop()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,63 @@
+import sys
+import threading
+import time
+import unittest
+from pathlib import Path
+
+# Add the root directory to Python path to import from parent directory
+sys.path.append(str(Path(__file__).parent.parent))
+
+from Services.ProfilingService import ProfileBusyError, Profiler
+
+
+def busy_analysis_loop(stop):
+    while not stop.is_set():
+        sum(i * i for i in range(2000))
+
+
+class TestProfiler(unittest.TestCase):
+
+    def setUp(self):
+        self.stop = threading.Event()
+        self.worker = threading.Thread(target=busy_analysis_loop, args=(self.stop,), name="AnalysisJob_0")
+        self.worker.start()
+        self.profiler = Profiler()
+
+    def tearDown(self):
+        self.stop.set()
+        self.worker.join()
+
+    def test_samples_only_the_analysis_threads(self):
+        session, torch_result = self.profiler.profile(seconds=0.3, interval=0.002)
+        self.assertIsNone(torch_result)
+        self.assertGreater(session.samples, 10)
+        lines = session.folded().splitlines()
+        self.assertTrue(lines)
+        self.assertTrue(all(line.startswith("AnalysisJob;") for line in lines))
+        self.assertTrue(any("busy_analysis_loop" in line for line in lines))
+        functions = {entry["function"]: entry for entry in session.summary()}
+        self.assertEqual(functions["test_profiling_service.py:busy_analysis_loop"]["total_pct"], 100.0)
+
+    def test_stops_after_the_requested_frames(self):
+        def frames():
+            for _ in range(5):
+                time.sleep(0.02)
+                self.profiler.frame_done()
+        threading.Thread(target=frames).start()
+        started = time.monotonic()
+        session, _ = self.profiler.profile(seconds=5, frames=3)
+        self.assertLess(time.monotonic() - started, 2)
+        self.assertEqual(session.frames_seen, 3)
+
+    def test_one_profile_at_a_time_and_idle_afterwards(self):
+        self.profiler.frame_done()  # no session: nothing happens
+        threading.Thread(target=self.profiler.profile, kwargs={"seconds": 0.3}).start()
+        time.sleep(0.05)
+        with self.assertRaises(ProfileBusyError):
+            self.profiler.profile(seconds=0.1)
+        time.sleep(0.4)
+        self.assertIsNone(self.profiler.session)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,91 @@
+import sys
+import threading
+import unittest
+from pathlib import Path
+
+# Add the root directory to Python path to import from parent directory
+sys.path.append(str(Path(__file__).parent.parent))
+
+from Services.RuntimeConfigService import ModelRegistry, RuntimeConfigService
+
+
+class TestRuntimeConfig(unittest.TestCase):
+
+    def setUp(self):
+        self.loading = threading.Event()
+        self.release = threading.Event()
+
+        def loader(path):
+            if path == "large.pt":
+                self.loading.set()
+                self.release.wait(5)
+            return "model:" + path
+
+        self.registry = ModelRegistry({"yolov8s": "small.pt", "yolov8m": "medium.pt", "yolov8l": "large.pt"}, loader)
+        self.registry.load("yolov8s")
+        self.registry.load("yolov8m")
+        self.config_service = RuntimeConfigService(self.registry)
+
+    def test_settings_fix_threshold_and_per_camera_overrides(self):
+        """The settings threshold reaches the loops and cameras can override it"""
+        self.config_service.apply_settings({"threshHold": 0.7, "sources": {"2": {"threshHold": 0.85, "frameStride": 3}}})
+        config = self.config_service.current()
+        self.assertEqual(config.for_source(None, 'video').confidence_threshold, 0.7)
+        self.assertEqual(config.for_source("1", 'live_video').confidence_threshold, 0.7)
+        camera = config.for_source(2, 'live_video')
+        self.assertEqual((camera.confidence_threshold, camera.frame_stride, camera.model_name), (0.85, 3, "yolov8m"))
+
+    def test_camera_overrides_keep_the_default_of_each_kind(self):
+        """An upload tagged with a camera keeps the video model; only what the camera sets changes"""
+        self.config_service.apply_settings({"threshHold": 0.7, "model": "yolov8s", "liveModel": "yolov8m",
+                                            "sources": {"2": {"frameStride": 3}, "3": {"model": "yolov8m"}}})
+        config = self.config_service.current()
+        video = config.for_source(2, 'video')
+        live = config.for_source(2, 'live_video')
+        self.assertEqual((video.model_name, video.frame_stride, video.confidence_threshold), ("yolov8s", 3, 0.7))
+        self.assertEqual((live.model_name, live.frame_stride, live.confidence_threshold), ("yolov8m", 3, 0.7))
+        self.assertEqual(config.for_source(3, 'video').model_name, "yolov8m")
+
+    def test_tile_size_setting(self):
+        self.config_service.apply_settings({"tileSize": 640, "sources": {"4k": {"tileSize": 0}, "bad": {"tileSize": 32}}})
+        config = self.config_service.current()
+        self.assertEqual(config.for_source(None, 'video').tile_size, 640)
+        self.assertEqual(config.for_source("4k", 'live_video').tile_size, 0)
+        self.assertEqual(config.for_source("bad", 'live_video').tile_size, 640)
+
+    def test_cascade_setting(self):
+        self.config_service.apply_settings({"cascade": True, "sources": {"2": {"cascade": False}, "3": {"cascade": "yes"}}})
+        config = self.config_service.current()
+        self.assertTrue(config.for_source(None, 'video').cascade)
+        self.assertFalse(config.for_source("2", 'live_video').cascade)
+        self.assertTrue(config.for_source("3", 'live_video').cascade)
+
+    def test_invalid_values_fall_back(self):
+        self.config_service.apply_settings({"threshHold": 0.1, "model": "resnet", "frameStride": 0})
+        video = self.config_service.current().for_source(None, 'video')
+        self.assertEqual((video.confidence_threshold, video.model_name, video.frame_stride), (0.6, "yolov8s", 1))
+
+    def test_model_change_swaps_after_background_load(self):
+        """The previous snapshot stays active until the new model is loaded"""
+        loader_thread = self.config_service.apply_settings({"threshHold": 0.8, "liveModel": "yolov8l"})
+        self.assertTrue(self.loading.wait(5))
+        self.assertEqual(self.config_service.current().for_source(None, 'live_video').model_name, "yolov8m")
+
+        self.release.set()
+        loader_thread.join(5)
+        live = self.config_service.current().for_source(None, 'live_video')
+        self.assertEqual((live.model_name, live.confidence_threshold), ("yolov8l", 0.8))
+        self.assertEqual(self.registry.get("yolov8l"), "model:large.pt")
+
+    def test_newer_settings_win_over_pending_load(self):
+        loader_thread = self.config_service.apply_settings({"liveModel": "yolov8l"})
+        self.assertTrue(self.loading.wait(5))
+        self.config_service.apply_settings({"threshHold": 0.9})
+        self.release.set()
+        loader_thread.join(5)
+        live = self.config_service.current().for_source(None, 'live_video')
+        self.assertEqual((live.model_name, live.confidence_threshold), ("yolov8m", 0.9))
+
+
+if __name__ == '__main__':
+    unittest.main()
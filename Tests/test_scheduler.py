@@ -0,0 +1,49 @@
+import os
+import sys
+import threading
+import unittest
+from pathlib import Path
+
+# Add the root directory to Python path to import from parent directory
+sys.path.append(str(Path(__file__).parent.parent))
+
+from Services.SchedulerService import ResourceScheduler
+
+
+class TestResourceScheduler(unittest.TestCase):
+    def test_live_and_batch_cpus_do_not_overlap(self):
+        scheduler = ResourceScheduler(cpus=[0, 1, 2, 3, 4, 5, 6, 7], live_threads=2)
+        self.assertEqual(scheduler.live_cpus, [0, 1])
+        self.assertEqual(scheduler.batch_cpus, [2, 3, 4, 5, 6, 7])
+        self.assertEqual(scheduler.batch_threads_per_job, 3)
+        self.assertEqual(scheduler.batch_workers, 2)
+
+    def test_single_cpu_is_shared(self):
+        scheduler = ResourceScheduler(cpus=[3])
+        self.assertEqual(scheduler.live_cpus, [3])
+        self.assertEqual(scheduler.batch_cpus, [3])
+
+    @unittest.skipUnless(hasattr(os, "sched_setaffinity"), "thread affinity is Linux only")
+    def test_threads_are_pinned_to_their_set(self):
+        cpus = sorted(os.sched_getaffinity(0))
+        if len(cpus) < 2:
+            self.skipTest("needs at least two CPUs")
+        scheduler = ResourceScheduler(cpus=cpus, live_threads=1)
+        seen = {}
+
+        def run(name, configure):
+            configure()
+            seen[name] = sorted(os.sched_getaffinity(threading.get_native_id()))
+
+        for name, configure in (("live", scheduler.configure_live_thread), ("batch", scheduler.configure_batch_thread)):
+            thread = threading.Thread(target=run, args=(name, configure))
+            thread.start()
+            thread.join()
+        self.assertEqual(seen["live"], scheduler.live_cpus)
+        self.assertEqual(seen["batch"], scheduler.batch_cpus)
+        # The calling thread is left alone
+        self.assertEqual(sorted(os.sched_getaffinity(0)), cpus)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,107 @@
+import random
+import sys
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+# Add the root directory to Python path to import from parent directory
+sys.path.append(str(Path(__file__).parent.parent))
+
+from Services.SegmentedAnalysis import segment_bounds, stitch_segments
+from Services.DetectionStoreService import ScoredFrame, StreakTracker
+
+NAMES = {0: 'gun', 1: 'knife', 2: 'person'}
+
+
+def boxes_at(frame_idx):
+    """Deterministic stand-in for the model's boxes on analysed frame frame_idx of a synthetic video."""
+    rng = random.Random(frame_idx)
+    if rng.random() < 0.3:
+        return None
+    count = rng.randint(1, 3)
+    return (np.array([[10.0, 10.0, 50.0, 60.0]] * count), np.array([round(rng.random(), 3) for _ in range(count)]),
+            np.array([float(rng.randint(0, 2)) for _ in range(count)]))
+
+
+def fake_segment(start, end, video_frames):
+    """analyse_segment on the synthetic video, finishing after a random delay so segments complete out of order."""
+    time.sleep(random.uniform(0, 0.02))
+    stop = video_frames if end is None else min(end, video_frames)
+    return {"start": start, "end": end, "frames": [boxes_at(i) for i in range(start, stop)],
+            "names": NAMES, "orig_shape": (480, 640)}
+
+
+def alert_of(frames, required, policy, threshold=0.5):
+    """The alert a pass over per-frame tuples ends on, judged like analyse_video judges frames."""
+    tracker = StreakTracker(required, policy)
+    for frame_idx, (xyxy, confs, classes, _, _, _) in enumerate(frames):
+        threats = [] if xyxy is None else [(float(c), k) for c, k in zip(confs, classes) if c >= threshold and k in (0, 1)]
+        tracker.update(ScoredFrame(frame_idx, *max(threats), None) if threats else None)
+    return tracker.best
+
+
+class TestSegmentedAnalysis(unittest.TestCase):
+
+    def setUp(self):
+        self.pool = ThreadPoolExecutor(max_workers=4)
+
+    def tearDown(self):
+        self.pool.shutdown(wait=False, cancel_futures=True)
+
+    def serial(self, video_frames):
+        return [(None, None, None, (480, 640), NAMES, None) if boxes is None else boxes + ((480, 640), NAMES, None)
+                for boxes in map(boxes_at, range(video_frames))]
+
+    def segmented(self, reported_frames, video_frames, segments=6):
+        def submit(start, end):
+            return self.pool.submit(fake_segment, start, end, video_frames)
+        return list(stitch_segments(submit, segment_bounds(reported_frames, segments), poll=0.01))
+
+    def assertSameFrames(self, segmented, serial):
+        self.assertEqual(len(segmented), len(serial))
+        for got, expected in zip(segmented, serial):
+            if expected[0] is None:
+                self.assertIsNone(got[0])
+            else:
+                for got_array, expected_array in zip(got[:3], expected[:3]):
+                    np.testing.assert_array_equal(got_array, expected_array)
+
+    def test_segments_are_contiguous_and_the_last_is_open(self):
+        self.assertEqual(segment_bounds(10, 3), [(0, 4), (4, 8), (8, None)])
+        self.assertEqual(segment_bounds(1000, 8, min_frames=300), [(0, 334), (334, 668), (668, None)])
+        self.assertEqual(segment_bounds(50, 8, min_frames=300), [(0, None)])
+        self.assertEqual(segment_bounds(0, 4), [(0, None)])
+
+    def test_segmented_pass_matches_a_serial_pass(self):
+        segmented, serial = self.segmented(400, 400), self.serial(400)
+        self.assertSameFrames(segmented, serial)
+        for policy, required in (("best", 2), ("longest_streak", 3)):
+            self.assertIsNotNone(alert_of(serial, required, policy))
+            self.assertEqual(alert_of(segmented, required, policy), alert_of(serial, required, policy), policy)
+
+    def test_video_shorter_than_reported_stops_like_a_serial_pass(self):
+        # 400 frames reported, 300 decodable: the segment holding frame 300 comes back short
+        self.assertSameFrames(self.segmented(400, 300), self.serial(300))
+
+    def test_cancel_stops_waiting_and_cancels_queued_segments(self):
+        pool = ThreadPoolExecutor(max_workers=1)
+        release = threading.Event()
+        futures = []
+
+        def submit(start, end):
+            futures.append(pool.submit(release.wait) if not futures else pool.submit(fake_segment, start, end, 100))
+            return futures[-1]
+        cancelled = threading.Event()
+        threading.Timer(0.05, cancelled.set).start()
+        self.assertEqual(list(stitch_segments(submit, segment_bounds(100, 3), cancelled.is_set, poll=0.01)), [])
+        self.assertTrue(all(future.cancelled() for future in futures[1:]))
+        release.set()
+        pool.shutdown()
+
+
+if __name__ == '__main__':
+    unittest.main()
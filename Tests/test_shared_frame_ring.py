@@ -0,0 +1,96 @@
+import sys
+import unittest
+from pathlib import Path
+
+import numpy as np
+
+# Add the root directory to Python path to import from parent directory
+sys.path.append(str(Path(__file__).parent.parent))
+
+from Services.SharedFrameRing import SharedFrameRing
+
+
+class TestSharedFrameRing(unittest.TestCase):
+
+    def setUp(self):
+        self.ring = SharedFrameRing(slots=4, frame_shape=(4, 6, 3))
+
+    def tearDown(self):
+        self.ring.close()
+
+    def _frame(self, value):
+        return np.full((4, 6, 3), value, dtype=np.uint8)
+
+    def test_reads_frames_in_order(self):
+        for value in (1, 2, 3):
+            self.ring.write(self._frame(value), timestamp=float(value))
+
+        seq, frame, timestamp = self.ring.read(0)
+        self.assertEqual(seq, 1)
+        self.assertEqual(frame[0, 0, 0], 1)
+        self.assertEqual(timestamp, 1.0)
+        self.assertEqual(self.ring.read(seq)[0], 2)
+        self.assertIsNone(self.ring.read(3))
+
+    def test_drops_oldest_frames_when_reader_falls_behind(self):
+        for value in range(1, 11):
+            self.ring.write(self._frame(value))
+
+        # Only the last four frames are still in the ring
+        seq, frame, _ = self.ring.read(0)
+        self.assertEqual(seq, 7)
+        self.assertEqual(frame[0, 0, 0], 7)
+        self.assertEqual(self.ring.read(0, latest=True)[0], 10)
+
+    def test_view_is_invalidated_when_slot_is_reused(self):
+        self.ring.write(self._frame(1))
+        seq, _, _ = self.ring.read(0)
+        self.assertTrue(self.ring.is_valid(seq))
+        for value in range(2, 6):
+            self.ring.write(self._frame(value))
+        self.assertFalse(self.ring.is_valid(seq))
+
+    def test_copy_survives_slot_reuse_mid_use(self):
+        self.ring.write(self._frame(1))
+        seq, frame, _ = self.ring.read_copy(0)
+        _, view, _ = self.ring.read(0)
+        # The writer laps the ring while the frame is still in use (e.g. during inference)
+        for value in range(2, 6):
+            self.ring.write(self._frame(value))
+        self.assertFalse(self.ring.is_valid(seq))
+        self.assertEqual(view[0, 0, 0], 5)
+        self.assertTrue((frame == 1).all())
+
+    def test_copy_torn_by_writer_is_discarded(self):
+        self.ring.write(self._frame(1))
+        view = self.ring.read(0)[1]
+
+        class Racing:
+            # The writer reuses the slot while the reader copies it
+            def copy(inner):
+                for value in range(2, 6):
+                    self.ring.write(self._frame(value))
+                return view.copy()
+
+        read = self.ring.read
+        self.ring.read = lambda after_seq, latest: (1, Racing(), 0.0) if after_seq == 0 else read(after_seq, latest)
+        seq, frame, _ = self.ring.read_copy(0)
+        self.assertEqual(seq, 2)
+        self.assertEqual(frame[0, 0, 0], 2)
+
+    def test_attached_reader_shares_the_buffer(self):
+        reader = SharedFrameRing.attach(self.ring.name)
+        try:
+            self.assertEqual(reader.frame_shape, (4, 6, 3))
+            self.ring.write(self._frame(42))
+            seq, frame, _ = reader.read(0)
+            self.assertEqual(seq, 1)
+            self.assertEqual(frame[3, 5, 2], 42)
+            self.ring.mark_ended()
+            self.assertTrue(reader.has_ended())
+        finally:
+            reader.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,68 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+# Add the root directory to Python path to import from parent directory
+sys.path.append(str(Path(__file__).parent.parent))
+
+from Services.StartupService import StartupService
+
+ROOT_DIR = str(Path(__file__).parent.parent)
+IMPORT_TIME_BUDGET_SECONDS = 1.5
+HEAVY_MODULES = ['torch', 'ultralytics', 'cv2', 'firebase_admin']
+
+
+class TestStartup(unittest.TestCase):
+
+    def _run_python(self, code):
+        """Run code in a fresh interpreter so import costs are measured cold"""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            env = dict(os.environ, PERSISTENCE_BACKEND="local", LOCAL_BACKEND_DIR=tmp_dir)
+            result = subprocess.run([sys.executable, "-c", code], cwd=ROOT_DIR, env=env,
+                                    capture_output=True, text=True, timeout=120, check=True)
+        return result.stdout.strip().splitlines()[-1]
+
+    def test_service_modules_defer_heavy_imports(self):
+        """Importing the services must not pull in torch, ultralytics, cv2 or firebase_admin"""
+        loaded = self._run_python(
+            "import json, sys\n"
+            "import Services.FirebaseService, Services.VideoProcessingService, Services.AlertManagementService\n"
+            "print(json.dumps([m for m in %r if m in sys.modules]))" % HEAVY_MODULES
+        )
+        self.assertEqual(json.loads(loaded), [])
+
+    def test_app_import_time_budget(self):
+        """Importing app.py stays within the import-time budget"""
+        elapsed = float(self._run_python(
+            "import time\n"
+            "start = time.perf_counter()\n"
+            "import app\n"
+            "print(time.perf_counter() - start)"
+        ))
+        self.assertLess(elapsed, IMPORT_TIME_BUDGET_SECONDS)
+
+    def test_readiness_tracks_checks(self):
+        """Readiness flips only after every check passed; a crash fails liveness"""
+        startup = StartupService(checks=('backend', 'models'))
+
+        def init(service):
+            service.mark_ready('backend')
+            self.assertFalse(service.is_ready())
+            service.mark_ready('models')
+
+        startup.start(init)
+        self.assertTrue(startup.wait(5))
+        self.assertEqual(startup.status()["checks"], {"backend": True, "models": True})
+
+        failing = StartupService(checks=('backend',))
+        failing.start(lambda service: 1 / 0)
+        self.assertFalse(failing.wait(5))
+        self.assertFalse(failing.is_alive())
+
+
+if __name__ == '__main__':
+    unittest.main()
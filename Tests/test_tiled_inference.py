@@ -0,0 +1,53 @@
+import sys
+import unittest
+from pathlib import Path
+
+import numpy as np
+
+# Add the root directory to Python path to import from parent directory
+sys.path.append(str(Path(__file__).parent.parent))
+
+from Services.TiledInference import make_tiles, merge_detections
+
+
+class TestTiles(unittest.TestCase):
+
+    def test_tiles_cover_4k_frame_with_overlap(self):
+        tiles = make_tiles(2160, 3840, tile_size=640, overlap=0.2)
+        covered = np.zeros((2160, 3840), dtype=bool)
+        for x0, y0, x1, y1 in tiles:
+            self.assertEqual((x1 - x0, y1 - y0), (640, 640))
+            covered[y0:y1, x0:x1] = True
+        self.assertTrue(covered.all())
+        # Neighbouring tiles overlap by at least 20%
+        xs = sorted({x0 for x0, _, _, _ in tiles})
+        self.assertTrue(all(b - a <= 512 for a, b in zip(xs, xs[1:])))
+
+    def test_small_frame_is_a_single_tile(self):
+        self.assertEqual(make_tiles(480, 640, tile_size=640), [(0, 0, 640, 480)])
+
+
+class TestMergeDetections(unittest.TestCase):
+
+    def test_partial_box_at_tile_edge_is_absorbed(self):
+        detections = np.array([
+            [100, 100, 160, 140, 0.9, 1],  # knife seen whole in one tile
+            [130, 100, 160, 140, 0.7, 1],  # its cut-off half from the neighbouring tile
+            [300, 300, 340, 330, 0.8, 1],  # another knife
+        ], dtype=np.float32)
+        merged = merge_detections(detections)
+        self.assertEqual(merged[:, 4].tolist(), [np.float32(0.9), np.float32(0.8)])
+
+    def test_overlapping_boxes_of_different_classes_are_kept(self):
+        detections = np.array([[0, 0, 50, 50, 0.9, 0], [0, 0, 50, 50, 0.8, 1]], dtype=np.float32)
+        self.assertEqual(len(merge_detections(detections)), 2)
+
+    def test_iou_metric(self):
+        detections = np.array([[0, 0, 100, 100, 0.9, 0], [0, 0, 40, 40, 0.8, 0]], dtype=np.float32)
+        self.assertEqual(len(merge_detections(detections, 0.5, metric="iou")), 2)
+        self.assertEqual(len(merge_detections(detections, 0.5, metric="ios")), 1)
+        self.assertEqual(merge_detections(np.zeros((0, 6))).shape, (0, 6))
+
+
+if __name__ == '__main__':
+    unittest.main()
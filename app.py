@@ -1,8 +1,14 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, stream_with_context
+import functools
+import hmac
 import os
 import signal
-from Services.FirebaseService import FirebaseService
-from Services.VideoProcessingService import VideoProcessingService
+from Services.LoggingService import setup_logging
+from Services.StartupService import StartupService
+from Services.JobService import JobService, JobQueueFullError
+from Services.SchedulerService import ResourceScheduler
+from Services.AlertCacheService import AlertCache, to_epoch
+from Services.AlertManagementService import AlertManagementService
 
 
 #this is a setup for the flask server
@@ -11,29 +17,147 @@ from Services.VideoProcessingService import VideoProcessingService
 
 
 app = Flask(__name__)
+setup_logging()
+
+# CPU split between live streams and batch analysis
+scheduler = ResourceScheduler.from_env()
+# Bounded pools for analysis jobs so request handlers return right away; live streams get
+# their own pool so they never wait behind uploaded videos
+job_service = JobService(max_workers=int(os.getenv("MAX_ANALYSIS_JOBS", scheduler.batch_workers)),
+                         max_queued=int(os.getenv("MAX_QUEUED_JOBS", 8)))
+live_job_service = JobService(max_workers=int(os.getenv("MAX_LIVE_STREAMS", 1)), max_queued=0)
+# In-memory copy of the alerts collection so dashboard polls cost no database reads
+alert_cache = AlertCache(max_size=int(os.getenv("ALERT_CACHE_SIZE", 20000)))
+# Camera positions by source id; the same singleton resolves alert locations
+camera_registry = AlertManagementService().cameras
+
+# Heavy services (torch/ultralytics/cv2/firebase_admin, model weights, listeners) are created
+# on a background thread so the server starts accepting /healthz and /readyz right away.
+firebase_service = None
+video_processing_service = None
+
+
+def initialize_services(startup):
+    global firebase_service, video_processing_service
+    from Services.FirebaseService import FirebaseService
+    from Services.VideoProcessingService import VideoProcessingService
+
+    firebase_service = FirebaseService()
+    startup.mark_ready('backend')
+    video_processing_service = VideoProcessingService(firebase_service, scheduler)
+    startup.mark_ready('models')
+    firebase_service.setVideoProcessingService(video_processing_service, job_service)
+    firebase_service.listen_to_alerts(alert_cache)
+    startup.mark_ready('listeners')
+
+
+startup = StartupService()
+startup.start(initialize_services)
+
+
+def requires_services(view):
+    """Answer 503 until the background initialization has finished."""
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        if not startup.is_ready():
+            response = jsonify({"error": "Service is starting up", "startup": startup.status()})
+            response.headers["Retry-After"] = "5"
+            return response, 503
+        return view(*args, **kwargs)
+    return wrapper
+
+
+def requires_admin(view):
+    """Admin endpoints take ADMIN_TOKEN as a bearer token and are disabled while it is unset."""
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        token = os.getenv("ADMIN_TOKEN")
+        if not token:
+            return jsonify({"error": "Admin endpoints are disabled (ADMIN_TOKEN is not set)"}), 403
+        supplied = request.headers.get("Authorization", "")
+        if not hmac.compare_digest(supplied.encode(), f"Bearer {token}".encode()):
+            return jsonify({"error": "Unauthorized"}), 401
+        return view(*args, **kwargs)
+    return wrapper
+
+
+@app.route('/healthz', methods=['GET'])
+def healthz():
+    if not startup.is_alive():
+        return jsonify({"status": "failed", "error": startup.error}), 500
+    return jsonify({"status": "alive"})
+
+@app.route('/readyz', methods=['GET'])
+def readyz():
+    return jsonify(startup.status()), 200 if startup.is_ready() else 503
 
-# Initialize services
-firebase_service = FirebaseService()
-video_processing_service = VideoProcessingService(firebase_service)
-firebase_service.setVideoProcessingService(video_processing_service)
 #test video analysis
 #video_processing_service.video_analysis('Tests/Test Videos/3392580409-preview.mp4')
 
+def submit_job(kind, target, params, on_cancel=None, service=None):
+    """Queue an analysis job and answer 202 with its id, or 429 when the service is saturated."""
+    try:
+        job = (service or job_service).submit(kind, target, params, on_cancel=on_cancel)
+    except JobQueueFullError as e:
+        response = jsonify({"error": "Analysis capacity exhausted, retry later", "details": str(e)})
+        response.headers["Retry-After"] = "5"
+        return response, 429
+    return jsonify({"status": f"Analysis queued as job {job.id}", "job_id": job.id,
+                    "status_url": f"/jobs/{job.id}"}), 202
+
 @app.route('/run_test_video', methods=['POST'])
+@requires_services
 def run_test_video():
     content = request.json
     video_path = content.get('video_path')
     if video_path:
-        video_processing_service.video_analysis(video_path)
-        return jsonify({"status": f"Analysis started for video {video_path}"})
+        return submit_job('video', lambda job: video_processing_service.video_analysis(video_path, job=job),
+                          {"video_path": video_path})
     else:
         return jsonify({"error": "No video path provided"}), 400
 
 @app.route('/run_live_video', methods=['POST'])
+@requires_services
 def run_live_video():
-    source = request.json.get('source', 1)  # Default to 1 if not provided (Mac os webcam source) (0 for Windows)
-    video_processing_service.live_video_analysis(source)
-    return jsonify({"status": "Live video analysis started"})
+    content = request.json or {}
+    source = content.get('source', 1)  # Default to 1 if not provided (Mac os webcam source) (0 for Windows)
+    show = content.get('show', False)  # cv2 windows only work on the main thread
+    camera_id = content.get('camera_id')  # registered camera the stream comes from, for alert locations
+    return submit_job('live_video', lambda job: video_processing_service.live_video_analysis(source, show=show, job=job, camera_id=camera_id),
+                      {"source": source, "camera_id": camera_id}, on_cancel=video_processing_service.stop_live_video_analysis,
+                      service=live_job_service)
+
+def find_job_service(job_id):
+    return live_job_service if live_job_service.get(job_id) is not None else job_service
+
+@app.route('/jobs', methods=['GET'])
+def list_jobs():
+    jobs = job_service.list_jobs() + live_job_service.list_jobs()
+    return jsonify({"jobs": [job.to_dict() for job in jobs],
+                    "stats": {"batch": job_service.stats(), "live": live_job_service.stats(),
+                              "scheduler": scheduler.stats(),
+                              "live_latency": video_processing_service.live_stats() if video_processing_service else {},
+                              "cascade": video_processing_service.cascade.stats() if video_processing_service else None,
+                              "inference": video_processing_service.inference.stats()
+                              if video_processing_service and video_processing_service.inference else None,
+                              "checkpoints": video_processing_service.checkpoints.stats()
+                              if video_processing_service and video_processing_service.checkpoints else None,
+                              "alert_stream": video_processing_service.alert_bus.stats() if video_processing_service else None,
+                              "outbox": firebase_service.outbox.stats() if firebase_service and firebase_service.outbox else None}})
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    job = find_job_service(job_id).get(job_id)
+    if job is None:
+        return jsonify({"error": f"Job {job_id} not found"}), 404
+    return jsonify(job.to_dict())
+
+@app.route('/jobs/<job_id>/cancel', methods=['POST'])
+def cancel_job(job_id):
+    job = find_job_service(job_id).cancel(job_id)
+    if job is None:
+        return jsonify({"error": f"Job {job_id} not found"}), 404
+    return jsonify(job.to_dict())
 
 @app.route('/stop', methods=['POST'])
 def stop_processing():
@@ -43,18 +167,193 @@ def stop_processing():
 
 @app.route('/get_alerts', methods=['GET'])
 def get_alerts():
-    #TODO: implement
-    pass
+    # Query params: severity, class (comma separated), since/until (ISO 8601 or epoch seconds), limit, cursor
+    if not alert_cache.ready:
+        return jsonify({"error": "Alert cache is still loading"}), 503
+    try:
+        severities = set(request.args['severity'].split(',')) if request.args.get('severity') else None
+        alert_types = set(request.args['class'].split(',')) if request.args.get('class') else None
+        since = to_epoch(request.args.get('since'))
+        until = to_epoch(request.args.get('until'))
+        limit = min(max(int(request.args.get('limit', 50)), 1), 200)
+        alerts, next_cursor = alert_cache.query(severities, alert_types, since, until,
+                                                request.args.get('cursor'), limit)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify({"alerts": alerts, "count": len(alerts), "next_cursor": next_cursor})
+
+
+@app.route('/alerts/stream', methods=['GET'])
+@requires_services
+def alerts_stream():
+    # Server-sent events of new alerts as they are detected.
+    # Query params: severity, class, camera (comma separated). Reconnecting clients send
+    # Last-Event-ID (or ?last_event_id=) and get the events they missed, if still buffered.
+    from Services.AlertBusService import AlertBusFullError, format_sse
+    try:
+        severities = set(request.args['severity'].split(',')) if request.args.get('severity') else None
+        alert_types = set(request.args['class'].split(',')) if request.args.get('class') else None
+        camera_ids = set(request.args['camera'].split(',')) if request.args.get('camera') else None
+        last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+        last_event_id = int(last_event_id) if last_event_id else None
+    except ValueError as e:
+        return jsonify({"error": f"Invalid query: {str(e)}"}), 400
+    try:
+        subscription = video_processing_service.alert_bus.subscribe(severities, alert_types, camera_ids, last_event_id)
+    except AlertBusFullError as e:
+        response = jsonify({"error": str(e)})
+        response.headers["Retry-After"] = "5"
+        return response, 503
+    keepalive = float(os.getenv("ALERT_STREAM_KEEPALIVE", 15))
+
+    def events():
+        try:
+            # Tells the browser's EventSource how long to wait before reconnecting
+            yield "retry: 3000\n\n"
+            while True:
+                event = subscription.get(timeout=keepalive)
+                dropped = subscription.take_dropped()
+                if dropped:
+                    # The client fell behind; it should re-sync through /get_alerts
+                    yield format_sse("overflow", {"dropped": dropped})
+                if event is None:
+                    yield ": keepalive\n\n"
+                else:
+                    yield format_sse(event["type"], event["alert"], event["id"])
+        finally:
+            subscription.close()
+
+    return Response(stream_with_context(events()), mimetype='text/event-stream',
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+def parse_point():
+    """lat, lon and radius (metres, default 1000, at most 50km) from the query string."""
+    lat = float(request.args['lat'])
+    lon = float(request.args['lon'])
+    radius = float(request.args.get('radius', 1000))
+    if not (-90 <= lat <= 90 and -180 <= lon <= 180 and 0 < radius <= 50000):
+        raise ValueError("lat/lon out of range or radius not in (0, 50000]")
+    return lat, lon, radius
+
+
+@app.route('/cameras', methods=['GET'])
+def list_cameras():
+    return jsonify({"cameras": [camera.to_dict() for camera in camera_registry.cameras()]})
+
+
+@app.route('/cameras/near', methods=['GET'])
+def cameras_near():
+    # Query params: lat, lon, radius (metres), limit
+    try:
+        lat, lon, radius = parse_point()
+        limit = min(max(int(request.args.get('limit', 20)), 1), 200)
+    except (KeyError, ValueError) as e:
+        return jsonify({"error": f"Invalid query: {str(e)}"}), 400
+    cameras = [dict(camera.to_dict(), distance_m=round(distance, 1))
+               for camera, distance in camera_registry.near(lat, lon, radius, limit)]
+    return jsonify({"cameras": cameras, "count": len(cameras)})
+
+
+@app.route('/alerts/near', methods=['GET'])
+def alerts_near():
+    # Query params: lat, lon, radius (metres), since (ISO 8601 or epoch seconds), limit
+    if not alert_cache.ready:
+        return jsonify({"error": "Alert cache is still loading"}), 503
+    try:
+        lat, lon, radius = parse_point()
+        since = to_epoch(request.args.get('since'))
+        limit = min(max(int(request.args.get('limit', 50)), 1), 200)
+    except (KeyError, ValueError) as e:
+        return jsonify({"error": f"Invalid query: {str(e)}"}), 400
+    alerts = alert_cache.near(lat, lon, radius, since, limit)
+    return jsonify({"alerts": alerts, "count": len(alerts)})
+
+
+@app.route('/detections/<video_key>', methods=['GET'])
+@requires_services
+def list_detections(video_key):
+    store = video_processing_service.detection_store
+    if store is None:
+        return jsonify({"error": "Detection store is disabled"}), 404
+    return jsonify({"video_key": store.key_for(video_key), "model_versions": store.versions(video_key)})
+
+
+@app.route('/detections/<video_key>/rescore', methods=['POST'])
+@requires_services
+def rescore_detections(video_key):
+    # Body: model_version (default newest), threshold, required_consistent_frames, policy ("best" or "longest_streak")
+    from Services.DetectionStoreService import rescore
+    store = video_processing_service.detection_store
+    if store is None:
+        return jsonify({"error": "Detection store is disabled"}), 404
+    content = request.json or {}
+    detections = store.load(video_key, content.get('model_version'))
+    if detections is None:
+        return jsonify({"error": f"No stored detections for {video_key}"}), 404
+    try:
+        result = rescore(detections,
+                         threshold=float(content.get('threshold', video_processing_service.confidenceThreshold)),
+                         required_consistent_frames=int(content.get('required_consistent_frames', 2)),
+                         policy=content.get('policy', 'best'))
+    except (TypeError, ValueError) as e:
+        return jsonify({"error": str(e)}), 400
+    result.update({"video_key": detections.meta["video_key"], "model_version": detections.meta["model_version"]})
+    return jsonify(result)
+
+
+@app.route('/debug/traces', methods=['GET'])
+@requires_admin
+@requires_services
+def get_traces():
+    # Recent per-frame trace events kept in memory by the analysis loops
+    limit = request.args.get('limit', type=int)
+    return jsonify({"events": video_processing_service.trace_buffer.dump(limit)})
+
+
+@app.route('/debug/profile', methods=['POST'])
+@requires_admin
+@requires_services
+def profile():
+    # Body: seconds, frames (stop early after this many analysed frames), interval_ms,
+    # threads ("analysis", "all" or a list of thread-name prefixes), torch, format ("json" or "folded")
+    from Services.ProfilingService import DEFAULT_THREAD_PREFIXES, ProfileBusyError
+    content = request.json or {}
+    try:
+        seconds = min(float(content.get('seconds', 10)), float(os.getenv("PROFILE_MAX_SECONDS", 120)))
+        frames = int(content['frames']) if content.get('frames') else None
+        interval = max(float(content.get('interval_ms', 5)), 1.0) / 1000.0
+    except (TypeError, ValueError) as e:
+        return jsonify({"error": f"Invalid profile request: {str(e)}"}), 400
+    threads = content.get('threads', 'analysis')
+    if threads == 'analysis':
+        thread_prefixes = DEFAULT_THREAD_PREFIXES
+    elif threads == 'all':
+        thread_prefixes = None
+    elif isinstance(threads, list) and threads:
+        thread_prefixes = tuple(str(prefix) for prefix in threads)
+    else:
+        return jsonify({"error": "threads must be 'analysis', 'all' or a list of thread-name prefixes"}), 400
+    try:
+        session, torch_result = video_processing_service.profiler.profile(
+            seconds, frames, interval, thread_prefixes, torch_trace=bool(content.get('torch')))
+    except ProfileBusyError as e:
+        return jsonify({"error": str(e)}), 409
+    if content.get('format') == 'folded':
+        return app.response_class(session.folded() + "\n", mimetype='text/plain')
+    return jsonify({"seconds": round(session.elapsed, 3), "samples": session.samples, "frames": session.frames_seen,
+                    "functions": session.summary(), "folded": session.folded(), "torch": torch_result})
 
 
-#TODO: check this methud
 @app.route('/analyze_video', methods=['POST'])
+@requires_services
 def analyze_video():
     content = request.json
     video_path = content.get('URL')
+    camera_id = content.get('camera_id')
     if video_path:
-        video_processing_service.video_analysis(video_path)
-        return jsonify({"status": f"Analysis started for video {video_path}"})
+        return submit_job('video', lambda job: video_processing_service.video_analysis(video_path, videoURL=video_path, job=job, source_id=camera_id),
+                          {"URL": video_path, "camera_id": camera_id})
     else:
         return jsonify({"error": "No video path provided"}), 400
 